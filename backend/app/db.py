@@ -1,20 +1,87 @@
 import os
+from functools import lru_cache
+from typing import Dict, Set, Tuple
+from sqlalchemy import Integer
 from sqlalchemy import create_engine
+from sqlalchemy import event
 from sqlalchemy import inspect
 from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 # Prefer SQLite locally unless DATABASE_URL is provided
 DEFAULT_SQLITE_URL = "sqlite:///./expense_tracker.db"
 DATABASE_URL = os.getenv("DATABASE_URL", DEFAULT_SQLITE_URL)
 
-engine_kwargs = {"pool_pre_ping": True}
-if DATABASE_URL.startswith("sqlite"):
-    # Needed for SQLite when used with FastAPI in threaded servers
-    engine_kwargs["connect_args"] = {"check_same_thread": False}
+# SQLITE_PROFILE=production: WAL with the pragmas below, a pool of read-only
+# connections and a single writer connection (see create_engines)
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "default").lower()
+SQLITE_PRAGMAS = {
+	"journal_mode": "WAL",
+	# Durable at checkpoints rather than every commit; safe with WAL
+	"synchronous": "NORMAL",
+	"mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+	# Negative: KiB rather than pages
+	"cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", 64 * 1024)),
+	"busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+	"temp_store": "MEMORY",
+}
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", 8))
+# Seconds a write waits for the writer connection before failing
+SQLITE_WRITE_TIMEOUT = float(os.getenv("SQLITE_WRITE_TIMEOUT", 30))
 
-engine = create_engine(DATABASE_URL, **engine_kwargs)
+# How transactions.amount is stored: "decimal" (NUMERIC(12, 2)) or "cents"
+# (BIGINT minor units, see app.models.Cents). An existing database is
+# converted with `python -m app.db migrate-money`.
+MONEY_STORAGE = os.getenv("MONEY_STORAGE", "decimal").lower()
+
+
+def _apply_pragmas(pragmas: Dict, autocommit: bool = False):
+	def on_connect(dbapi_connection, connection_record):
+		if autocommit:
+			# Transactions are begun explicitly (BEGIN IMMEDIATE, below)
+			dbapi_connection.isolation_level = None
+		cursor = dbapi_connection.cursor()
+		for name, value in pragmas.items():
+			cursor.execute(f"PRAGMA {name}={value}")
+		cursor.close()
+	return on_connect
+
+
+def create_engines(url: str, profile: str = "default") -> Tuple[Engine, Engine]:
+	"""(write engine, read engine) for a database URL.
+
+	Only SQLite with profile "production" gets two engines: the writer is a
+	pool of one connection, so writes from all threads queue for it (for up
+	to SQLITE_WRITE_TIMEOUT) and start with BEGIN IMMEDIATE instead of
+	failing to upgrade a read lock; readers are query_only connections that
+	WAL lets run alongside the writer. Otherwise both are the same engine.
+	"""
+	kwargs = {"pool_pre_ping": True}
+	if url.startswith("sqlite"):
+		# Needed for SQLite when used with FastAPI in threaded servers
+		kwargs["connect_args"] = {"check_same_thread": False}
+	in_memory = url in ("sqlite://", "sqlite:///:memory:")
+	if not url.startswith("sqlite") or profile != "production" or in_memory:
+		engine = create_engine(url, **kwargs)
+		return engine, engine
+
+	writer = create_engine(url, pool_size=1, max_overflow=0, pool_timeout=SQLITE_WRITE_TIMEOUT, **kwargs)
+	event.listen(writer, "connect", _apply_pragmas(SQLITE_PRAGMAS, autocommit=True))
+	event.listen(writer, "begin", lambda conn: conn.exec_driver_sql("BEGIN IMMEDIATE"))
+
+	# journal_mode is a property of the file, set by the writer
+	read_pragmas = {k: v for k, v in SQLITE_PRAGMAS.items() if k != "journal_mode"}
+	reader = create_engine(url, pool_size=SQLITE_READ_POOL_SIZE, max_overflow=0, **kwargs)
+	event.listen(reader, "connect", _apply_pragmas({**read_pragmas, "query_only": "ON"}))
+	return writer, reader
+
+
+engine, read_engine = create_engines(DATABASE_URL, SQLITE_PROFILE)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# Sessions that only read; with the production profile they never wait for the writer
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
 def get_db():
@@ -25,13 +92,24 @@ def get_db():
 		db.close()
 
 
-def ensure_sqlite_schema():
-	"""Quick migration for SQLite to add missing columns when upgrading schema."""
+def get_read_db():
+	"""get_db for endpoints that do not write"""
+	db = ReadSessionLocal()
+	try:
+		yield db
+	finally:
+		db.close()
+
+
+def ensure_sqlite_schema() -> Set[str]:
+	"""Quick migration for SQLite to add missing columns when upgrading schema.
+	Returns the names of the columns added to transactions (init_db backfills them)."""
 	if not DATABASE_URL.startswith("sqlite"):
-		return
+		return set()
 
-	inspector = inspect(engine)
 	with engine.begin() as conn:
+		# Inspect through this connection: the production writer pool has only one
+		inspector = inspect(conn)
 		# Ensure users table exists
 		if "users" not in inspector.get_table_names():
 			conn.execute(text(
@@ -48,7 +126,182 @@ def ensure_sqlite_schema():
 		cols = [c['name'] for c in inspector.get_columns('transactions')]
 		if 'user_id' not in cols:
 			conn.execute(text("ALTER TABLE transactions ADD COLUMN user_id INTEGER NOT NULL DEFAULT 1"))
+		added = set()
+		for name, ddl in (
+			('fingerprint', "VARCHAR(64)"), ('year', "INTEGER"), ('year_month', "INTEGER"), ('year_week', "INTEGER"),
+		):
+			if name not in cols:
+				conn.execute(text(f"ALTER TABLE transactions ADD COLUMN {name} {ddl}"))
+				added.add(name)
+	return added
+
+
+def init_db(migrate_money: bool = False):
+	"""Create missing tables and apply the SQLite column migrations.
+
+	Runs once at application startup (see app.main; disable with
+	DB_INIT_ON_STARTUP=false) or ahead of time with `python -m app.db`.
+	With `migrate_money`, amounts are converted to MONEY_STORAGE if needed.
+	"""
+	import app.models  # noqa: F401  registers the tables on Base
+	Base.metadata.create_all(bind=engine)
+	added = ensure_sqlite_schema()
+	ensure_money_storage(convert=migrate_money)
+	from app.services.transaction_store import backfill_date_buckets, backfill_fingerprints
+	if "fingerprint" in added:
+		# Once amounts are read in the right unit, and before ensure_indexes()
+		# builds the unique index over them
+		backfill_fingerprints(engine)
+	if "year_month" in added:
+		backfill_date_buckets(engine)
+	ensure_indexes()
+	ensure_search_index()
+
+
+def _stores_cents(bind) -> bool:
+	amount = next(c for c in inspect(bind).get_columns("transactions") if c["name"] == "amount")
+	return isinstance(amount["type"], Integer)
+
+
+def ensure_money_storage(convert: bool = False, bind=None) -> bool:
+	"""Check that transactions.amount is stored as MONEY_STORAGE says, or with
+	`convert`, rewrite it (cents = ROUND(amount * 100), and back). Returns
+	True if it was converted.
+
+	Reading decimal amounts as cents (or the reverse) would be off by a
+	factor of 100, so a mismatch stops the application from starting.
+	"""
+	from app.models import Transaction
+	bind = bind or engine
+	want_cents = MONEY_STORAGE == "cents"
+	with bind.begin() as conn:
+		if _stores_cents(conn) == want_cents:
+			return False
+		if not convert:
+			stored = "decimal" if want_cents else "cents"
+			raise RuntimeError(
+				f"transactions.amount is stored as {stored} but MONEY_STORAGE={MONEY_STORAGE}; "
+				f"convert it with `MONEY_STORAGE={MONEY_STORAGE} python -m app.db migrate-money`"
+			)
+		if want_cents:
+			converted = "CAST(ROUND(amount * 100) AS BIGINT)"
+		else:
+			converted = "amount / 100.0"
+		if bind.dialect.name == "postgresql":
+			target = "BIGINT" if want_cents else "NUMERIC(12, 2)"
+			conn.execute(text(f"ALTER TABLE transactions ALTER COLUMN amount TYPE {target} USING {converted}"))
+			return True
+		_rebuild_sqlite_transactions(conn, Transaction.__table__, converted)
+	return True
+
+
+def _rebuild_sqlite_transactions(conn, table, amount_expression: str) -> None:
+	"""SQLite cannot change a column's type: copy the rows into a new
+	transactions table (ids kept, so the FTS index stays valid) and drop the old one."""
+	old_indexes = [i["name"] for i in inspect(conn).get_indexes("transactions")]
+	conn.execute(text("ALTER TABLE transactions RENAME TO transactions_old"))
+	# Index names are per database; the new table reuses them
+	for name in old_indexes:
+		conn.execute(text(f"DROP INDEX {name}"))
+	table.create(conn)
+	old_columns = {c["name"] for c in inspect(conn).get_columns("transactions_old")}
+	columns = [c.name for c in table.columns if c.name in old_columns]
+	values = [amount_expression if name == "amount" else name for name in columns]
+	conn.execute(text(
+		f"INSERT INTO transactions ({', '.join(columns)}) SELECT {', '.join(values)} FROM transactions_old"
+	))
+	# Drops the search triggers too, which the rename moved to the old table
+	conn.execute(text("DROP TABLE transactions_old"))
+	if "transactions_fts" in inspect(conn).get_table_names():
+		for ddl in SQLITE_SEARCH_DDL[1:4]:
+			conn.execute(text(ddl))
+
+
+# Indexes replaced by a wider one in the models
+SUPERSEDED_INDEXES = ["ix_transactions_user_amount"]
+
+
+def ensure_indexes():
+	"""Create indexes added to the models after their table was created
+	(create_all only creates indexes together with a new table)."""
+	for table in Base.metadata.sorted_tables:
+		for index in table.indexes:
+			index.create(bind=engine, checkfirst=True)
+	with engine.begin() as conn:
+		for name in SUPERSEDED_INDEXES:
+			conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+# Full-text search over Transaction.description (see app.services.search).
+# SQLite: a contentless FTS5 table kept in sync by triggers. Besides the
+# description it indexes an owner token ("u<user_id>"), so a search only
+# reads the postings of one user's rows. PostgreSQL: a GIN expression index.
+SQLITE_SEARCH_DDL = [
+	"""
+	CREATE VIRTUAL TABLE transactions_fts USING fts5(
+		description, owner, content='', tokenize='unicode61 remove_diacritics 2'
+	)
+	""",
+	"""
+	CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions BEGIN
+		INSERT INTO transactions_fts(rowid, description, owner) VALUES (new.id, new.description, 'u' || new.user_id);
+	END
+	""",
+	"""
+	CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions BEGIN
+		INSERT INTO transactions_fts(transactions_fts, rowid, description, owner)
+		VALUES ('delete', old.id, old.description, 'u' || old.user_id);
+	END
+	""",
+	"""
+	CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE OF description, user_id ON transactions BEGIN
+		INSERT INTO transactions_fts(transactions_fts, rowid, description, owner)
+		VALUES ('delete', old.id, old.description, 'u' || old.user_id);
+		INSERT INTO transactions_fts(rowid, description, owner) VALUES (new.id, new.description, 'u' || new.user_id);
+	END
+	""",
+	# Index the rows that predate the table
+	"INSERT INTO transactions_fts(rowid, description, owner) SELECT id, description, 'u' || user_id FROM transactions",
+]
+POSTGRES_SEARCH_DDL = [
+	"CREATE INDEX IF NOT EXISTS ix_transactions_description_fts "
+	"ON transactions USING GIN (to_tsvector('simple', description))",
+]
+
+
+@lru_cache(maxsize=None)
+def search_backend() -> str:
+	"""How /api/transactions/search finds matches: "fts5", "postgres" or "like" (a scan)"""
+	if engine.dialect.name == "postgresql":
+		return "postgres"
+	if engine.dialect.name == "sqlite" and "transactions_fts" in inspect(read_engine).get_table_names():
+		return "fts5"
+	return "like"
+
+
+def ensure_search_index(bind=None):
+	"""Create the full-text index (and fill it, the first time)"""
+	bind = bind or engine
+	if bind.dialect.name == "postgresql":
+		with bind.begin() as conn:
+			for ddl in POSTGRES_SEARCH_DDL:
+				conn.execute(text(ddl))
+		return
+	if bind.dialect.name != "sqlite" or "transactions_fts" in inspect(bind).get_table_names():
+		return
+	try:
+		with bind.begin() as conn:
+			for ddl in SQLITE_SEARCH_DDL:
+				conn.execute(text(ddl))
+	except OperationalError as e:
+		# SQLite built without FTS5: search falls back to scanning with LIKE
+		print(f"Warning: full-text search index not available ({e}); search will scan")
+	search_backend.cache_clear()
 
 
-# Run lightweight schema ensure on import
-ensure_sqlite_schema()
+if __name__ == "__main__":
+	import sys
+	# Run via the importable module so the models register on the same Base
+	from app import db
+	db.init_db(migrate_money="migrate-money" in sys.argv[1:])
+	print(f"Database ready: {db.DATABASE_URL} (money stored as {db.MONEY_STORAGE})")
@@ -1,5 +1,9 @@
-from fastapi import FastAPI
+from app import startup  # first, so the import phase covers everything below
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import uvicorn
 from dotenv import load_dotenv
 import os
@@ -8,16 +12,37 @@ import os
 from app.routes import base, upload
 from app.routes import transactions as transactions_routes
 from app.routes import auth as auth_routes
+from app.routes.upload import MAX_FILE_SIZE, MAX_BATCH_SIZE
+from app.services.statement_import import MAX_IMPORT_SIZE
+from app.services.ocr_jobs import ocr_jobs
+from app.services.ocr_service import ocr_service
+from app.db import init_db
 
 # Load environment variables
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Schema checks (skip with DB_INIT_ON_STARTUP=false after `python -m app.db`)
+    and, with OCR_EAGER_INIT=true, loading the OCR stack before the first upload.
+    The OCR worker processes stop with the server.
+    """
+    if os.getenv("DB_INIT_ON_STARTUP", "True").lower() == "true":
+        with startup.timed_phase("db"):
+            init_db()
+    if os.getenv("OCR_EAGER_INIT", "False").lower() == "true":
+        ocr_service.ensure_ready()
+    yield
+    ocr_jobs.shutdown()
+    ocr_service.shutdown()
+
 # Create FastAPI application
 app = FastAPI(
     title=os.getenv("APP_NAME", "Expense Tracker API"),
     description="AI-powered personal expense tracker with OCR capabilities",
     version=os.getenv("APP_VERSION", "1.0.0"),
-    debug=os.getenv("DEBUG", "False").lower() == "true"
+    debug=os.getenv("DEBUG", "False").lower() == "true",
+    lifespan=lifespan,
 )
 
 # CORS middleware for frontend communication
@@ -27,14 +52,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Reject oversized uploads from Content-Length before the body is read.
+# Allow some headroom for multipart boundaries and headers.
+MAX_UPLOAD_BODY = MAX_FILE_SIZE + 64 * 1024
+MAX_BATCH_BODY = MAX_BATCH_SIZE + 64 * 1024
+MAX_IMPORT_BODY = MAX_IMPORT_SIZE + 64 * 1024
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    content_length = request.headers.get("content-length")
+    if request.url.path.startswith("/api/upload") and content_length and content_length.isdigit():
+        is_batch = request.url.path.startswith("/api/upload/batch")
+        if int(content_length) > (MAX_BATCH_BODY if is_batch else MAX_UPLOAD_BODY):
+            return JSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={"detail": "Batch too large" if is_batch else "File too large. Max 10MB"}
+            )
+    if request.url.path == "/api/transactions/import" and content_length and content_length.isdigit():
+        if int(content_length) > MAX_IMPORT_BODY:
+            return JSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={"detail": "Statement too large"}
+            )
+    return await call_next(request)
+
 # Include route modules
 app.include_router(base.router)
 app.include_router(auth_routes.router)
 app.include_router(upload.router, prefix="/api/upload", tags=["upload"])
 app.include_router(transactions_routes.router, prefix="/api/transactions", tags=["transactions"])
 
+startup.record("import", time.perf_counter() - startup.IMPORT_STARTED)
+
 if __name__ == "__main__":
     uvicorn.run(
         "app.main:app",
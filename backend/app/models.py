@@ -1,7 +1,59 @@
-from sqlalchemy import Column, Integer, String, Date, Numeric, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Date, Numeric, Text, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
-from datetime import datetime
-from app.db import Base
+from sqlalchemy.types import TypeDecorator
+from typing import Dict
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+from app.db import Base, MONEY_STORAGE
+
+_CENT = Decimal("0.01")
+
+class Cents(TypeDecorator):
+	"""Money stored as a BIGINT number of cents and handled as a 2-place Decimal,
+	so SUM/MIN/MAX run on integers in the database and come back exact."""
+	impl = BigInteger
+	cache_ok = True
+
+	def process_bind_param(self, value, dialect):
+		if value is None:
+			return None
+		if not isinstance(value, Decimal):
+			# A float's exact value, so it rounds to the cent as NUMERIC(12, 2) rounds it
+			value = Decimal(value)
+		return int(value.scaleb(2).to_integral_value(ROUND_HALF_UP))
+
+	def process_result_value(self, value, dialect):
+		if value is None:
+			return None
+		return Decimal(value) * _CENT
+
+class CentsAverage(TypeDecorator):
+	"""AVG() of a Cents column (a fractional number of cents) as a float in currency units"""
+	impl = Float
+	cache_ok = True
+
+	def process_result_value(self, value, dialect):
+		return None if value is None else float(value) / 100
+
+# MONEY_STORAGE=cents stores amounts as integer cents (see app.db.ensure_money_storage
+# for converting an existing database). AMOUNT_AVG_TYPE is the type_ for func.avg(),
+# which would otherwise return the stored unit.
+if MONEY_STORAGE == "cents":
+	AMOUNT_TYPE, AMOUNT_AVG_TYPE = Cents(), CentsAverage()
+else:
+	AMOUNT_TYPE, AMOUNT_AVG_TYPE = Numeric(12, 2), Float()
+
+def date_buckets(value: date) -> Dict[str, int]:
+	"""The stored date buckets of a transaction date: year, year_month (202410)
+	and ISO year_week (202441, of the ISO week-numbering year)"""
+	iso_year, iso_week, _ = value.isocalendar()
+	return {"year": value.year, "year_month": value.year * 100 + value.month, "year_week": iso_year * 100 + iso_week}
+
+def _date_bucket(name: str):
+	# Column default filled in from the inserted date; transactions are never re-dated
+	def default(context):
+		return date_buckets(context.get_current_parameters()["date"])[name]
+	return default
 
 class User(Base):
 	__tablename__ = "users"
@@ -19,9 +71,46 @@ class Transaction(Base):
 	date = Column(Date, nullable=False, index=True)
 	description = Column(Text, nullable=False)
 	category = Column(String(100), nullable=True, index=True)
-	amount = Column(Numeric(12, 2), nullable=False)
+	amount = Column(AMOUNT_TYPE, nullable=False)
 	source = Column(String(50), nullable=False, default="receipt_upload")
 	user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+	# See app.services.transaction_store.add_fingerprints; saving a row twice is a no-op
+	fingerprint = Column(String(64), nullable=True)
+	# Derived from date (see date_buckets), so month and week filters and
+	# groupings are plain column comparisons the indexes below can serve
+	year = Column(Integer, nullable=True, default=_date_bucket("year"))
+	year_month = Column(Integer, nullable=True, default=_date_bucket("year_month"))
+	year_week = Column(Integer, nullable=True, default=_date_bucket("year_week"))
 
 	# Relationships
 	user = relationship("User", back_populates="transactions")
+
+class IdempotencyKey(Base):
+	"""The response to a write sent with an Idempotency-Key header, replayed on retries"""
+	__tablename__ = "idempotency_keys"
+	id = Column(Integer, primary_key=True)
+	user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+	key = Column(String(255), nullable=False)
+	request_hash = Column(String(64), nullable=False)
+	status_code = Column(Integer, nullable=False)
+	response_body = Column(Text, nullable=False)
+	created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+# Listing is always per user, newest first (date desc, id desc), so these
+# serve both the ORDER BY and the keyset cursor without a sort step.
+Index("ix_transactions_user_date_id", Transaction.user_id, Transaction.date.desc(), Transaction.id.desc())
+Index(
+	"ix_transactions_user_category_date_id",
+	Transaction.user_id, Transaction.category, Transaction.date.desc(), Transaction.id.desc(),
+)
+# Amount ranges of /filter, and same-amount, nearby-date duplicate candidates
+Index("ix_transactions_user_amount_date", Transaction.user_id, Transaction.amount, Transaction.date)
+# /analytics/by-month and /analytics/categories-by-month: one month, or the same
+# month of every year. Covering (category, amount), so the month's rows are
+# summed from the index alone and the planner does not prefer the category index.
+Index(
+	"ix_transactions_user_year_month",
+	Transaction.user_id, Transaction.year_month, Transaction.category, Transaction.amount,
+)
+Index("ux_transactions_fingerprint", Transaction.fingerprint, unique=True)
+Index("ux_idempotency_keys_user_key", IdempotencyKey.user_id, IdempotencyKey.key, unique=True)
@@ -7,18 +7,17 @@ from sqlalchemy.orm import Session
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 
-from app.db import get_db, engine, Base
+from app.db import get_db, get_read_db
 from app.models import User
 from app.schemas import UserSignup, UserLogin, TokenResponse
 
 
-Base.metadata.create_all(bind=engine)
-
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 # Security config (use PBKDF2 to avoid bcrypt native issues & 72-byte limit)
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 # In production, set via env
 JWT_SECRET = "CHANGE_ME_DEV_SECRET"
@@ -60,7 +59,7 @@ def signup(payload: UserSignup, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_read_db)):
     user = db.query(User).filter(User.email == form_data.username.lower()).first()
     if not user or not verify_password(form_data.password, user.password_hash):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
@@ -69,7 +68,7 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     return TokenResponse(access_token=token)
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_read_db)) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -90,3 +89,14 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     return user
 
 
+def get_optional_user_id(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[int]:
+    """User id from a bearer token if one is sent, else None. Checks only the
+    token itself (no database lookup), so use it for personalisation, not access control.
+    """
+    if not token:
+        return None
+    try:
+        sub = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG]).get("sub")
+        return int(sub) if sub is not None else None
+    except (JWTError, ValueError):
+        return None
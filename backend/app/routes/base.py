@@ -1,5 +1,7 @@
 from fastapi import APIRouter
 
+from app import startup
+
 # Create a base router for common endpoints
 router = APIRouter()
 
@@ -19,3 +21,13 @@ async def health_check():
         "database": "connected",  # We'll implement this later
         "ocr": "ready"  # We'll implement this later
     }
+
+@router.get("/health/startup")
+async def startup_timings():
+    """Seconds spent in each startup phase (import, db, ocr_probe)"""
+    phases = startup.timings()
+    return {
+        "phases": phases,
+        "total": round(sum(phases.values()), 4),
+        "ocr_loaded": "ocr_probe" in phases,
+    }
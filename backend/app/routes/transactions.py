@@ -1,61 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, File, Header, HTTPException, status, Query, Response, UploadFile
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List
-from app.db import get_db, engine
-from app.db import Base
-from app.models import Transaction
-from app.schemas import TransactionCreate, TransactionResponse, TransactionBatchCreate
-import re
-from typing import Dict, List
+from sqlalchemy import desc, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from collections import Counter
+from typing import List, Optional, Tuple
+import base64
+import json
+import os
+import shutil
+import tempfile
+import time
+from app.db import ReadSessionLocal, SessionLocal, get_db, get_read_db, search_backend
+from app.models import AMOUNT_AVG_TYPE, Transaction
+from app.schemas import TransactionCreate, TransactionResponse, TransactionBatchCreate, TransactionFilterResponse, TransactionSaveResponse, TransactionSearchResponse
+from app.services.search import apply_search, search_terms
+from app.services import idempotency
+from app.services.count_cache import count_cache
+from app.services.export import EXPORT_BATCH_SIZE, EXPORT_FORMATS, iter_export
+from app.services.statement_import import (
+	IMPORT_CHUNK_SIZE, IMPORT_FORMATS, IMPORT_MAX_ERRORS, MAX_IMPORT_SIZE, StatementError, StatementReader,
+)
+from app.services.transaction_store import add_fingerprints, find_by_fingerprint, insert_transactions
+from app.services.user_categorizer import user_categorizer
 from datetime import date as _date, datetime as _datetime
 
-# Create tables on import
-Base.metadata.create_all(bind=engine)
-
-_CLEAN_RX = re.compile(r"[^a-z0-9\s]+")
-
-def _normalize(s: str) -> str:
-	s = s.lower()
-	s = _CLEAN_RX.sub(" ", s)
-	return " ".join(s.split())
-
-# Add as many synonyms as you like; use simple words that often appear in receipts
-_RULES: Dict[str, List[str]] = {
-	"Food": [
-		"pizza","burger","restaurant","nugget","milk","banana","chicken","date","spice",
-		"bread","butter","egg","curd","paneer","cheese","yogurt","chapathi","dal"
-	],
-	"Groceries": [
-		"costco","kroger","walmart","vegetable","oil","blueberry","peanut","flour","rice","lentil",
-		"tindora","spinach","onion","tomato","banana","fruit","greens"
-	],
-	"Transport": ["uber","lyft","gas","fuel","ride","toll","parking"],
-	"Household": ["detergent","tide","spray","nexxus","shampoo","cleaner","soap","paper","tissue"],
-	"Health": ["protein","iq bar","ks protein","vitamin","supplement","whey","electrolyte"],
-}
-
-# Build flattened keyword list for fast matching
-_FLAT: List[tuple[str, str]] = [(cat, _normalize(k)) for cat, kws in _RULES.items() for k in kws]
-
-def suggest_category(description: str) -> str:
-	desc = _normalize(description)
-	if not desc:
-		return "Uncategorized"
-
-	# score each category by number of keyword hits (substring match)
-	scores: Dict[str, int] = {}
-	for cat, kw in _FLAT:
-		if kw and kw in desc:
-			scores[cat] = scores.get(cat, 0) + 1
-
-	if not scores:
-		return "Uncategorized"
-
-	# pick the category with the highest score (ties broken by lexicographic order)
-	best = max(scores.items(), key=lambda x: (x[1], x[0]))[0]
-	return best
-
 router = APIRouter()
 
 # Dependency to get current user id from auth (to be implemented in auth module)
@@ -96,54 +67,206 @@ def _normalize_date_field(value) -> _date:
     raise HTTPException(status_code=400, detail=f"Invalid date format: {value}")
 
 
-@router.post("/", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED)
-def create_transaction(txn: TransactionCreate, db: Session = Depends(get_db), user_id: int = get_current_user_id()):
+def _encode_cursor(row) -> str:
+	"""Opaque token for the position after `row` in (date desc, id desc) order"""
+	raw = f"{row.date.isoformat()}|{row.id}"
+	return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[_date, int]:
+	try:
+		raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+		day, txn_id = raw.split("|")
+		return _date.fromisoformat(day), int(txn_id)
+	except ValueError:
+		raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _keyset_page(query, cursor: Optional[str], skip: int, limit: int) -> Tuple[list, Optional[str]]:
+	"""One page of `query` newest first, plus the cursor for the next page (None on the last).
+
+	With a cursor the page starts right after the row it encodes, which the
+	(user_id, date, id) indexes find directly, so deep pages cost the same
+	as the first. skip still works but scans the rows it skips.
+	"""
+	if cursor:
+		day, txn_id = _decode_cursor(cursor)
+		# date <= day leads so the index range scan starts at the cursor; the OR alone is not sargable
+		query = query.filter(Transaction.date <= day, or_(Transaction.date < day, Transaction.id < txn_id))
+	# One extra row tells whether there is a next page
+	rows = query.order_by(desc(Transaction.date), desc(Transaction.id)).offset(skip).limit(limit + 1).all()
+	if limit and len(rows) > limit:
+		return rows[:limit], _encode_cursor(rows[limit - 1])
+	return rows[:limit], None
+
+
+def _planner_estimate(db: Session, query) -> Optional[int]:
+	"""PostgreSQL's row estimate for the query, from EXPLAIN (no scan); None elsewhere"""
+	bind = db.get_bind()
+	if bind.dialect.name != "postgresql":
+		return None
+	compiled = query.statement.compile(dialect=bind.dialect)
+	plan = db.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()
+	if isinstance(plan, str):
+		plan = json.loads(plan)
+	return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _total_count(db: Session, query, user_id: int, filters: Tuple, mode: str) -> Tuple[Optional[int], bool]:
+	"""(total_count, exact) for a filtered listing.
+
+	Counts are cached per user and filter until the user's next write, so
+	paging through one filter runs COUNT once. A cached count is reported as
+	not exact: writes made through another worker process do not invalidate
+	it. mode "estimated" uses the planner's estimate instead of counting
+	(PostgreSQL only), "none" skips it.
+	"""
+	if mode == "none":
+		return None, True
+	cached = count_cache.get(user_id, filters)
+	if cached is not None:
+		return cached, False
+	if mode == "estimated":
+		estimate = _planner_estimate(db, query)
+		if estimate is not None:
+			return estimate, False
+	version = count_cache.version(user_id)
+	total = query.count()
+	count_cache.put(user_id, filters, total, version)
+	return total, True
+
+
+def _save_transactions(db: Session, items: List[dict]) -> Tuple[List[dict], list]:
+	"""Insert items whose fingerprint is not stored yet. Returns the stored row
+	for every item, in order and flagged `deduplicated` if it already existed,
+	plus the rows actually inserted. O(items): one bulk INSERT ... ON CONFLICT
+	DO NOTHING and one indexed lookup per chunk."""
+	add_fingerprints(items)
+	inserted = insert_transactions(db, items)
+	new = {r.fingerprint: r for r in inserted}
+	existing = find_by_fingerprint(db, [i["fingerprint"] for i in items if i["fingerprint"] not in new])
+	saved = []
+	for item in items:
+		row = new.get(item["fingerprint"])
+		fields = {k: v for k, v in (row or existing[item["fingerprint"]])._mapping.items() if k != "fingerprint"}
+		saved.append({**fields, "deduplicated": row is None})
+	return saved, inserted
+
+def _replay(db: Session, user_id: int, key: str, req_hash: str) -> Optional[JSONResponse]:
+	try:
+		saved = idempotency.lookup(db, user_id, key, req_hash)
+	except idempotency.IdempotencyKeyReused:
+		raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+	if saved is None:
+		return None
+	status_code, body = saved
+	return JSONResponse(status_code=status_code, content=body, headers={"Idempotent-Replayed": "true"})
+
+def _commit_saved(db: Session, user_id: int, body, inserted: list, key: Optional[str], req_hash: Optional[str], status_code: int):
+	"""`body` is the response as returned (response models), so a replay is identical to it"""
+	if key:
+		idempotency.remember(db, user_id, key, req_hash, status_code, jsonable_encoder(body))
+	try:
+		db.commit()
+	except IntegrityError:
+		# A concurrent request with the same key committed first: answer as it did
+		db.rollback()
+		replayed = _replay(db, user_id, key, req_hash) if key else None
+		if replayed is None:
+			raise
+		return replayed
+	if inserted:
+		count_cache.invalidate(user_id)
+		user_categorizer.learn(user_id, [(r.description, r.category) for r in inserted])
+	return None
+
+@router.post("/", response_model=TransactionSaveResponse, status_code=status.HTTP_201_CREATED)
+def create_transaction(
+	txn: TransactionCreate,
+	response: Response,
+	db: Session = Depends(get_db),
+	user_id: int = get_current_user_id(),
+	idempotency_key: Optional[str] = Header(None, max_length=255),
+):
+	"""201 with the new row, or 200 with the stored one (deduplicated=true)
+	when the same transaction was saved before."""
 	payload = txn.dict()
+	req_hash = None
+	if idempotency_key:
+		req_hash = idempotency.request_hash("POST /api/transactions/", payload)
+		replayed = _replay(db, user_id, idempotency_key, req_hash)
+		if replayed is not None:
+			return replayed
 	# Normalize date field to proper YYYY-MM-DD
 	payload["date"] = _normalize_date_field(payload.get("date"))
 	if not payload.get("category"):
 		payload["category"] = "Uncategorized"
-	row = Transaction(**payload, user_id=user_id)
-	db.add(row); db.commit(); db.refresh(row)
-	return row
-
-@router.post("/batch", response_model=List[TransactionResponse], status_code=status.HTTP_201_CREATED)
-def create_transactions(payload: TransactionBatchCreate, db: Session = Depends(get_db), user_id: int = get_current_user_id()):
+	payload["user_id"] = user_id
+	saved, inserted = _save_transactions(db, [payload])
+	if saved[0]["deduplicated"]:
+		response.status_code = status.HTTP_200_OK
+	body = TransactionSaveResponse(**saved[0])
+	replayed = _commit_saved(db, user_id, body, inserted, idempotency_key, req_hash, response.status_code or status.HTTP_201_CREATED)
+	return replayed or body
+
+@router.post("/batch", response_model=List[TransactionSaveResponse], status_code=status.HTTP_201_CREATED)
+def create_transactions(
+	payload: TransactionBatchCreate,
+	db: Session = Depends(get_db),
+	user_id: int = get_current_user_id(),
+	idempotency_key: Optional[str] = Header(None, max_length=255),
+):
+	"""Items already saved (same date, amount, description and source) are
+	not inserted again; they come back with deduplicated=true. With an
+	Idempotency-Key header, a retry gets the first response replayed."""
 	if not payload.items:
 		raise HTTPException(status_code=400, detail="No items provided")
-
-	rows = []
+	req_hash = None
+	if idempotency_key:
+		req_hash = idempotency.request_hash("POST /api/transactions/batch", payload.dict())
+		replayed = _replay(db, user_id, idempotency_key, req_hash)
+		if replayed is not None:
+			return replayed
+
+	# accept category if provided; else use suggested_category if present; else compute
+	items = []
 	for i in payload.items:
 		data = i.dict()
+		if not data.get("category"):
+			data["category"] = getattr(i, "suggested_category", None)
+		items.append(data)
+	# categories still missing are computed together
+	missing = [data for data in items if not data["category"]]
+	computed = user_categorizer.suggest_many(user_id, [data["description"] for data in missing])
+	for data, category in zip(missing, computed):
+		data["category"] = category or "Uncategorized"
+
+	for data in items:
 		# Normalize date if needed
 		data["date"] = _normalize_date_field(data.get("date"))
-		# accept category if provided; else use suggested_category if present; else compute
-		if not data.get("category"):
-			suggested = getattr(i, "suggested_category", None)
-			if suggested:
-				data["category"] = suggested
-			else:
-				from app.services.categorizer import suggest_category
-				data["category"] = suggest_category(data["description"]) or "Uncategorized"
-
-		row = Transaction(**data, user_id=user_id)
-		db.add(row)
-		rows.append(row)
-
-	db.commit()
-	for r in rows:
-		db.refresh(r)
-	return rows
+		data["user_id"] = user_id
+
+	# Chunked multi-row INSERT ... RETURNING, committed once
+	saved, inserted = _save_transactions(db, items)
+	body = [TransactionSaveResponse(**row) for row in saved]
+	replayed = _commit_saved(db, user_id, body, inserted, idempotency_key, req_hash, status.HTTP_201_CREATED)
+	return replayed or body
 
 @router.get("/", response_model=List[TransactionResponse])
-def list_transactions(skip: int = 0, limit: int = Query(100, le=500), db: Session = Depends(get_db), user_id: int = get_current_user_id()):
-    return db.query(Transaction).filter(Transaction.user_id == user_id).order_by(desc(Transaction.date), desc(Transaction.id)).offset(skip).limit(limit).all()
+def list_transactions(response: Response, skip: int = 0, limit: int = Query(100, le=500), cursor: Optional[str] = Query(None), db: Session = Depends(get_read_db), user_id: int = get_current_user_id()):
+    """Newest first. Pass the X-Next-Cursor header of a page as `cursor` to get the next one."""
+    rows, next_cursor = _keyset_page(db.query(Transaction).filter(Transaction.user_id == user_id), cursor, skip, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
 
 @router.delete("/")
 def delete_all_transactions(db: Session = Depends(get_db), user_id: int = get_current_user_id()):
     """Delete all transactions in the database."""
     deleted = db.query(Transaction).filter(Transaction.user_id == user_id).delete()
     db.commit()
+    count_cache.invalidate(user_id)
+    user_categorizer.drop(user_id)
     return {"deleted": int(deleted)}
 
 @router.delete("/{txn_id}")
@@ -151,14 +274,17 @@ def delete_transaction(txn_id: int, db: Session = Depends(get_db), user_id: int
     row = db.query(Transaction).filter(Transaction.id == txn_id, Transaction.user_id == user_id).first()
     if not row:
         raise HTTPException(status_code=404, detail="Transaction not found")
+    learned = (row.description, row.category)
     db.delete(row)
     db.commit()
+    count_cache.invalidate(user_id)
+    user_categorizer.forget(user_id, [learned])
     return {"deleted": True, "id": txn_id}
 
 @router.get("/analytics/weekly")
-def get_weekly_analytics(weeks: int = Query(4, ge=1, le=52), db: Session = Depends(get_db), user_id: int = get_current_user_id()):
-	"""Get weekly spending analytics for the last N weeks"""
-	from sqlalchemy import func, extract
+def get_weekly_analytics(weeks: int = Query(4, ge=1, le=52), db: Session = Depends(get_read_db), user_id: int = get_current_user_id()):
+	"""Get weekly spending analytics for the last N weeks (ISO weeks)"""
+	from sqlalchemy import func
 	from datetime import datetime, timedelta
 	
 	# Calculate start date for the requested number of weeks
@@ -167,8 +293,7 @@ def get_weekly_analytics(weeks: int = Query(4, ge=1, le=52), db: Session = Depen
 	
 	# Query weekly spending
 	weekly_data = db.query(
-		extract('year', Transaction.date).label('year'),
-		extract('week', Transaction.date).label('week'),
+		Transaction.year_week,
 		func.sum(Transaction.amount).label('total_amount'),
 		func.count(Transaction.id).label('transaction_count')
 	).filter(
@@ -176,19 +301,17 @@ def get_weekly_analytics(weeks: int = Query(4, ge=1, le=52), db: Session = Depen
 		Transaction.date <= end_date,
 		Transaction.user_id == user_id
 	).group_by(
-		extract('year', Transaction.date),
-		extract('week', Transaction.date)
+		Transaction.year_week
 	).order_by(
-		extract('year', Transaction.date),
-		extract('week', Transaction.date)
+		Transaction.year_week
 	).all()
 	
 	# Format response
 	result = []
 	for row in weekly_data:
 		result.append({
-			"year": int(row.year),
-			"week": int(row.week),
+			"year": row.year_week // 100,
+			"week": row.year_week % 100,
 			"total_amount": float(row.total_amount),
 			"transaction_count": int(row.transaction_count)
 		})
@@ -201,9 +324,9 @@ def get_weekly_analytics(weeks: int = Query(4, ge=1, le=52), db: Session = Depen
 	}
 
 @router.get("/analytics/monthly")
-def get_monthly_analytics(months: int = Query(12, ge=1, le=24), db: Session = Depends(get_db), user_id: int = get_current_user_id()):
+def get_monthly_analytics(months: int = Query(12, ge=1, le=24), db: Session = Depends(get_read_db), user_id: int = get_current_user_id()):
 	"""Get monthly spending analytics for the last N months"""
-	from sqlalchemy import func, extract
+	from sqlalchemy import func
 	from datetime import datetime, timedelta
 	
 	# Calculate start date for the requested number of months
@@ -212,8 +335,8 @@ def get_monthly_analytics(months: int = Query(12, ge=1, le=24), db: Session = De
 	
 	# Query monthly spending
 	monthly_data = db.query(
-		extract('year', Transaction.date).label('year'),
-		extract('month', Transaction.date).label('month'),
+		Transaction.year,
+		Transaction.year_month,
 		func.sum(Transaction.amount).label('total_amount'),
 		func.count(Transaction.id).label('transaction_count')
 	).filter(
@@ -221,11 +344,10 @@ def get_monthly_analytics(months: int = Query(12, ge=1, le=24), db: Session = De
 		Transaction.date <= end_date,
 		Transaction.user_id == user_id
 	).group_by(
-		extract('year', Transaction.date),
-		extract('month', Transaction.date)
+		Transaction.year,
+		Transaction.year_month
 	).order_by(
-		extract('year', Transaction.date),
-		extract('month', Transaction.date)
+		Transaction.year_month
 	).all()
 	
 	# Format response
@@ -233,7 +355,7 @@ def get_monthly_analytics(months: int = Query(12, ge=1, le=24), db: Session = De
 	for row in monthly_data:
 		result.append({
 			"year": int(row.year),
-			"month": int(row.month),
+			"month": row.year_month % 100,
 			"total_amount": float(row.total_amount),
 			"transaction_count": int(row.transaction_count)
 		})
@@ -246,7 +368,7 @@ def get_monthly_analytics(months: int = Query(12, ge=1, le=24), db: Session = De
 	}
 
 @router.get("/analytics/categories")
-def get_category_analytics(period_days: int = Query(30, ge=1, le=365), db: Session = Depends(get_db), user_id: int = get_current_user_id()):
+def get_category_analytics(period_days: int = Query(30, ge=1, le=365), db: Session = Depends(get_read_db), user_id: int = get_current_user_id()):
 	"""Get spending analytics by category for the last N days"""
 	from sqlalchemy import func
 	from datetime import datetime, timedelta
@@ -260,7 +382,7 @@ def get_category_analytics(period_days: int = Query(30, ge=1, le=365), db: Sessi
 		Transaction.category,
 		func.sum(Transaction.amount).label('total_amount'),
 		func.count(Transaction.id).label('transaction_count'),
-		func.avg(Transaction.amount).label('avg_amount')
+		func.avg(Transaction.amount, type_=AMOUNT_AVG_TYPE).label('avg_amount')
 	).filter(
 		Transaction.date >= start_date,
 		Transaction.date <= end_date,
@@ -294,33 +416,50 @@ def get_category_analytics(period_days: int = Query(30, ge=1, le=365), db: Sessi
 		"category_data": result
 	}
 
+# Category of the month analytics. Grouping on this expression rather than the
+# column also keeps SQLite off the (user_id, category, ...) index, which it
+# would otherwise walk over all of the user's rows to skip the GROUP BY sort.
+_category_label = func.coalesce(Transaction.category, "Uncategorized")
+
+
+def _month_filter(query, db: Session, user_id: int, mm: int, year: Optional[int]):
+	"""Restrict a query to month mm of `year`, or of every year with transactions
+	of the user, as year_month equality / IN over the (user_id, year_month) index"""
+	from sqlalchemy import false, func
+
+	if year is not None:
+		return query.filter(Transaction.year_month == year * 100 + mm)
+	# Both ends come from the (user_id, date) index without a scan
+	first = db.query(func.min(Transaction.date)).filter(Transaction.user_id == user_id).scalar()
+	last = db.query(func.max(Transaction.date)).filter(Transaction.user_id == user_id).scalar()
+	if first is None:
+		return query.filter(false())
+	return query.filter(Transaction.year_month.in_([y * 100 + mm for y in range(first.year, last.year + 1)]))
+
 	
 @router.get("/analytics/categories-by-month")
-def get_categories_by_month(mm: int = Query(..., ge=1, le=12), year: int = Query(None), db: Session = Depends(get_db), user_id: int = get_current_user_id()):
+def get_categories_by_month(mm: int = Query(..., ge=1, le=12), year: int = Query(None), db: Session = Depends(get_read_db), user_id: int = get_current_user_id()):
 	"""Get category-wise totals for a given month number.
 	If year is not provided, aggregate across all years.
 	"""
-	from sqlalchemy import func, extract
+	from sqlalchemy import func
 
 	query = db.query(
-		Transaction.category.label('category'),
+		_category_label.label('category'),
 		func.sum(Transaction.amount).label('total_amount'),
 		func.count(Transaction.id).label('transaction_count')
 	).filter(
-		extract('month', Transaction.date) == mm,
 		Transaction.user_id == user_id
 	)
+	query = _month_filter(query, db, user_id, mm, year)
 
-	if year is not None:
-		query = query.filter(extract('year', Transaction.date) == year)
-
-	query = query.group_by(Transaction.category).order_by(func.sum(Transaction.amount).desc())
+	query = query.group_by(_category_label).order_by(func.sum(Transaction.amount).desc())
 
 	rows = query.all()
 	result = []
 	for row in rows:
 		result.append({
-			"category": row.category or "Uncategorized",
+			"category": row.category,
 			"total_amount": float(row.total_amount or 0),
 			"transaction_count": int(row.transaction_count or 0)
 		})
@@ -332,7 +471,7 @@ def get_categories_by_month(mm: int = Query(..., ge=1, le=12), year: int = Query
 	}
 
 @router.get("/analytics/summary")
-def get_spending_summary(period_days: int = Query(30, ge=1, le=365), db: Session = Depends(get_db), user_id: int = get_current_user_id()):
+def get_spending_summary(period_days: int = Query(30, ge=1, le=365), db: Session = Depends(get_read_db), user_id: int = get_current_user_id()):
 	"""Get overall spending summary for the last N days"""
 	from sqlalchemy import func
 	from datetime import datetime, timedelta
@@ -345,7 +484,7 @@ def get_spending_summary(period_days: int = Query(30, ge=1, le=365), db: Session
 	summary = db.query(
 		func.sum(Transaction.amount).label('total_spent'),
 		func.count(Transaction.id).label('total_transactions'),
-		func.avg(Transaction.amount).label('avg_transaction'),
+		func.avg(Transaction.amount, type_=AMOUNT_AVG_TYPE).label('avg_transaction'),
 		func.min(Transaction.amount).label('min_transaction'),
 		func.max(Transaction.amount).label('max_transaction')
 	).filter(
@@ -370,7 +509,7 @@ def get_spending_summary(period_days: int = Query(30, ge=1, le=365), db: Session
 	}
 
 @router.get("/analytics/calendar")
-def get_calendar_data(year: int = Query(None), month: int = Query(None), db: Session = Depends(get_db), user_id: int = get_current_user_id()):
+def get_calendar_data(year: int = Query(None), month: int = Query(None), db: Session = Depends(get_read_db), user_id: int = get_current_user_id()):
 	"""Get calendar data for a specific month with daily spending"""
 	from sqlalchemy import func, extract
 	from datetime import datetime, date
@@ -431,22 +570,19 @@ def get_calendar_data(year: int = Query(None), month: int = Query(None), db: Ses
 	}
 
 @router.get("/analytics/by-month")
-def get_by_month(mm: int = Query(..., ge=1, le=12), year: int = Query(None), db: Session = Depends(get_db), user_id: int = get_current_user_id()):
+def get_by_month(mm: int = Query(..., ge=1, le=12), year: int = Query(None), db: Session = Depends(get_read_db), user_id: int = get_current_user_id()):
     """Get total amount and transaction count for a given month number.
     If year is not provided, aggregate across all years.
     """
-    from sqlalchemy import func, extract
+    from sqlalchemy import func
 
     query = db.query(
         func.sum(Transaction.amount).label('total_amount'),
         func.count(Transaction.id).label('transaction_count')
     ).filter(
-        extract('month', Transaction.date) == mm,
         Transaction.user_id == user_id
     )
-
-    if year is not None:
-        query = query.filter(extract('year', Transaction.date) == year)
+    query = _month_filter(query, db, user_id, mm, year)
 
     row = query.first()
     return {
@@ -456,24 +592,9 @@ def get_by_month(mm: int = Query(..., ge=1, le=12), year: int = Query(None), db:
         "transaction_count": int(row.transaction_count or 0)
     }
 
-@router.get("/filter")
-def filter_transactions(
-	start_date: str = Query(None),
-	end_date: str = Query(None),
-	category: str = Query(None),
-	min_amount: float = Query(None),
-	max_amount: float = Query(None),
-	skip: int = Query(0, ge=0),
-	limit: int = Query(100, le=500),
-	db: Session = Depends(get_db),
-	user_id: int = get_current_user_id()
-):
-	"""Filter transactions with various criteria"""
+def _apply_filters(query, start_date, end_date, category, min_amount, max_amount):
 	from datetime import datetime
-	
-	query = db.query(Transaction).filter(Transaction.user_id == user_id)
-	
-	# Apply filters
+
 	if start_date:
 		query = query.filter(Transaction.date >= datetime.strptime(start_date, "%Y-%m-%d").date())
 	if end_date:
@@ -484,13 +605,83 @@ def filter_transactions(
 		query = query.filter(Transaction.amount >= min_amount)
 	if max_amount is not None:
 		query = query.filter(Transaction.amount <= max_amount)
+	return query
+
+@router.get("/search", response_model=TransactionSearchResponse)
+def search_transactions(
+	q: str = Query(..., min_length=1, max_length=200),
+	start_date: str = Query(None),
+	end_date: str = Query(None),
+	category: str = Query(None),
+	min_amount: float = Query(None),
+	max_amount: float = Query(None),
+	skip: int = Query(0, ge=0),
+	limit: int = Query(50, le=500),
+	db: Session = Depends(get_read_db),
+	user_id: int = get_current_user_id()
+):
+	"""Search descriptions: every word of `q` must start a word of the
+	description ("star cof" finds "Starbucks Coffee"). Best matches first,
+	then newest; the /filter criteria narrow the results further."""
+	terms = search_terms(q)
+	transactions = []
+	if terms:
+		query = db.query(Transaction).filter(Transaction.user_id == user_id)
+		query = _apply_filters(query, start_date, end_date, category, min_amount, max_amount)
+		query = apply_search(query, search_backend(), user_id, terms)
+		transactions = query.offset(skip).limit(limit).all()
+
+	return {
+		"query": q,
+		"transactions": transactions,
+		"filters": {
+			"start_date": start_date,
+			"end_date": end_date,
+			"category": category,
+			"min_amount": min_amount,
+			"max_amount": max_amount
+		},
+		"pagination": {
+			"skip": skip,
+			"limit": limit
+		}
+	}
+
+@router.get("/filter", response_model=TransactionFilterResponse)
+def filter_transactions(
+	start_date: str = Query(None),
+	end_date: str = Query(None),
+	category: str = Query(None),
+	min_amount: float = Query(None),
+	max_amount: float = Query(None),
+	skip: int = Query(0, ge=0),
+	limit: int = Query(100, le=500),
+	cursor: str = Query(None),
+	count: str = Query("exact", pattern="^(exact|estimated|none)$"),
+	db: Session = Depends(get_read_db),
+	user_id: int = get_current_user_id()
+):
+	"""Filter transactions with various criteria. Page with `cursor`: pass the
+	previous response's pagination.next_cursor. `count` picks how total_count
+	is computed: exact (cached per filter until the next write), estimated
+	(query planner estimate on PostgreSQL) or none."""
+	query = db.query(Transaction).filter(Transaction.user_id == user_id)
+	query = _apply_filters(query, start_date, end_date, category, min_amount, max_amount)
 	
 	# Apply pagination and ordering
-	transactions = query.order_by(desc(Transaction.date), desc(Transaction.id)).offset(skip).limit(limit).all()
+	transactions, next_cursor = _keyset_page(query, cursor, skip, limit)
+	
+	if not cursor and next_cursor is None and (transactions or not skip):
+		# The page reached the end of the results, so it holds the count already
+		total_count, exact = skip + len(transactions), True
+	else:
+		filters = (start_date, end_date, category, min_amount, max_amount)
+		total_count, exact = _total_count(db, query, user_id, filters, count)
 	
 	return {
 		"transactions": transactions,
-		"total_count": query.count(),
+		"total_count": total_count if count != "none" else None,
+		"total_count_exact": exact,
 		"filters": {
 			"start_date": start_date,
 			"end_date": end_date,
@@ -500,6 +691,198 @@ def filter_transactions(
 		},
 		"pagination": {
 			"skip": skip,
-			"limit": limit
+			"limit": limit,
+			"cursor": cursor,
+			"next_cursor": next_cursor
 		}
 	}
+
+_EXPORT_COLUMNS = [
+	Transaction.id, Transaction.date, Transaction.description,
+	Transaction.category, Transaction.amount, Transaction.source,
+]
+
+def _export_stream(stmt, fmt: str, compress: bool):
+	# get_db's session is closed before a StreamingResponse body runs, so the
+	# stream owns one. yield_per fetches in batches (a server-side cursor on
+	# PostgreSQL); executing on the connection keeps rows plain Core tuples.
+	db = ReadSessionLocal()
+	try:
+		rows = db.connection().execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+		yield from iter_export(rows, [c.key for c in _EXPORT_COLUMNS], fmt, compress)
+	finally:
+		db.close()
+
+@router.get("/export")
+def export_transactions(
+	format: str = Query("csv", pattern="^(csv|ndjson)$"),
+	gzip: bool = Query(False),
+	start_date: str = Query(None),
+	end_date: str = Query(None),
+	category: str = Query(None),
+	min_amount: float = Query(None),
+	max_amount: float = Query(None),
+	user_id: int = get_current_user_id()
+):
+	"""Download the user's transactions, newest first, as CSV or NDJSON
+	(gzipped with gzip=true). Takes the /filter criteria. Rows are streamed
+	as they are read, so memory does not grow with the account size."""
+	stmt = select(*_EXPORT_COLUMNS).filter(Transaction.user_id == user_id)
+	try:
+		stmt = _apply_filters(stmt, start_date, end_date, category, min_amount, max_amount)
+	except ValueError:
+		raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+	stmt = stmt.order_by(desc(Transaction.date), desc(Transaction.id))
+
+	media_type, extension = EXPORT_FORMATS[format]
+	filename = f"transactions.{extension}"
+	if gzip:
+		media_type, filename = "application/gzip", filename + ".gz"
+	return StreamingResponse(
+		_export_stream(stmt, format, gzip),
+		media_type=media_type,
+		headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+	)
+
+def _prepare_import_chunk(records: List[dict], user_id: int, seen: Counter) -> None:
+	# Statement categories win; the rest are categorized together
+	missing = [r for r in records if not r["category"]]
+	for record, category in zip(missing, user_categorizer.suggest_many(user_id, [r["description"] for r in missing])):
+		record["category"] = category or "Uncategorized"
+	for record in records:
+		record["user_id"] = user_id
+		record["source"] = "statement_import"
+	# Occurrences are counted over the whole statement, so re-importing it adds nothing
+	add_fingerprints(records, seen)
+
+
+def _insert_import_chunk(records: List[dict]) -> int:
+	"""Insert one prepared chunk in its own short write transaction"""
+	db = SessionLocal()
+	try:
+		inserted = len(insert_transactions(db, records))
+		db.commit()
+		return inserted
+	except Exception:
+		db.rollback()
+		raise
+	finally:
+		db.close()
+
+def _import_stream(reader: StatementReader, spool, user_id: int):
+	"""NDJSON events: "row_error" per rejected row (the first IMPORT_MAX_ERRORS),
+	"progress" after each committed chunk, then "summary", or "error"."""
+	started = time.perf_counter()
+	imported = deduplicated = failed = rows = 0
+	pending: List[dict] = []
+	seen: Counter = Counter()
+
+	def progress(kind: str) -> str:
+		return json.dumps({
+			"type": kind,
+			"rows": rows,
+			"imported": imported,
+			"deduplicated": deduplicated,
+			"failed": failed,
+			"elapsed": round(time.perf_counter() - started, 4),
+		}) + "\n"
+
+	def flush() -> None:
+		nonlocal imported, deduplicated, pending
+		_prepare_import_chunk(pending, user_id, seen)
+		inserted = _insert_import_chunk(pending)
+		imported += inserted
+		deduplicated += len(pending) - inserted
+		pending = []
+
+	# The writer is held only while a parsed chunk is inserted, never while
+	# the client reads the stream. Each chunk commits on its own; a failed
+	# import is completed by importing the statement again, since rows
+	# already stored are deduplicated by fingerprint.
+	try:
+		for row, record, error in reader:
+			rows = row
+			if error is None:
+				try:
+					record["date"] = _normalize_date_field(record["date"])
+				except HTTPException as e:
+					error = e.detail
+			if error is not None:
+				failed += 1
+				if failed <= IMPORT_MAX_ERRORS:
+					yield json.dumps({"type": "row_error", "row": row, "error": error}) + "\n"
+				continue
+			pending.append(record)
+			if len(pending) >= IMPORT_CHUNK_SIZE:
+				flush()
+				yield progress("progress")
+		if pending:
+			flush()
+	except Exception as e:
+		yield json.dumps({
+			"type": "error", "success": False, "error": f"Error: {str(e)}", "imported": imported,
+		}) + "\n"
+		return
+	finally:
+		spool.close()
+		if imported:
+			count_cache.invalidate(user_id)
+			# Retrain from the newest rows on next use rather than learn every imported row
+			user_categorizer.drop(user_id)
+	yield progress("summary")
+
+@router.post("/import")
+def import_statement(
+	file: UploadFile = File(...),
+	format: str = Query(None, pattern="^(csv|ofx)$"),
+	date_column: str = Query(None),
+	description_column: str = Query(None),
+	amount_column: str = Query(None),
+	debit_column: str = Query(None),
+	credit_column: str = Query(None),
+	category_column: str = Query(None),
+	has_header: bool = Query(True),
+	delimiter: str = Query(None, min_length=1, max_length=1),
+	date_format: str = Query(None),
+	decimal: str = Query(".", pattern="^[.,]$"),
+	negate: bool = Query(False),
+	user_id: int = get_current_user_id()
+):
+	"""Import a bank statement (CSV or OFX), streaming NDJSON progress.
+
+	CSV columns are found by header name (date, description/payee, amount or
+	debit/credit, category) unless mapped with the *_column parameters, which
+	take a header name, or a 0-based column number with has_header=false.
+	Rows are parsed as they are read and inserted IMPORT_CHUNK_SIZE at a time,
+	each chunk in its own short transaction; rows that cannot be read are
+	reported and skipped. Importing the same statement again adds only the
+	rows that are not stored yet.
+	"""
+	if format is None:
+		format = IMPORT_FORMATS.get(os.path.splitext(file.filename or "")[1].lower())
+		if format is None:
+			raise HTTPException(status_code=400, detail="Pass format=csv or format=ofx")
+	if file.size is not None and file.size > MAX_IMPORT_SIZE:
+		raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Statement too large")
+
+	# The form file is closed before the response body runs; read from a private copy
+	spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+	try:
+		shutil.copyfileobj(file.file, spool)
+		spool.seek(0)
+		columns = {
+			"date": date_column, "description": description_column, "amount": amount_column,
+			"debit": debit_column, "credit": credit_column, "category": category_column,
+		}
+		reader = StatementReader(
+			spool, format, {k: v for k, v in columns.items() if v is not None},
+			has_header=has_header, delimiter=delimiter, date_format=date_format,
+			decimal=decimal, negate=negate,
+		)
+	except StatementError as e:
+		spool.close()
+		raise HTTPException(status_code=400, detail=str(e))
+	except BaseException:
+		spool.close()
+		raise
+	return StreamingResponse(_import_stream(reader, spool, user_id), media_type="application/x-ndjson")
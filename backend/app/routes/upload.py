@@ -1,65 +1,510 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, status
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+import asyncio
+import hashlib
+import json
 import os
-from app.services.ocr_service import ocr_service
-from app.services.categorizer import suggest_category
+import tempfile
+import time
+import zipfile
+from typing import Dict, List, Optional, Tuple
+from app.routes.auth import get_optional_user_id
+from app.services.ocr_jobs import ocr_jobs, process_document, process_documents, JobQueueFull
+from app.services.duplicates import mark_duplicates
+from app.services.ocr_cache import ocr_cache
+from app.services.ocr_service import PREPROCESS_TIERS, ocr_service
+from app.services import categorizer, receipt_parser
+from app.services.user_categorizer import user_categorizer
 
 # Create router for upload endpoints
 router = APIRouter()
 
-@router.post("/")
-async def upload_file(file: UploadFile = File(...)):
-    """Upload and process a file to extract transactions"""
-    
+ALLOWED_EXTENSIONS = {'.pdf', '.png', '.jpg', '.jpeg'}
+MAX_FILE_SIZE = 10 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 256 * 1024
+SPOOL_MEMORY_LIMIT = 1024 * 1024
+
+# Batch uploads: file count, total request size and files OCRed at once
+MAX_BATCH_FILES = int(os.getenv("UPLOAD_MAX_BATCH_FILES", 100))
+MAX_BATCH_SIZE = int(os.getenv("UPLOAD_MAX_BATCH_SIZE", 200 * 1024 * 1024))
+BATCH_CONCURRENCY = int(os.getenv("UPLOAD_BATCH_CONCURRENCY", os.cpu_count() or 2))
+# Images OCRed together in one tesseract call within a batch
+BATCH_IMAGE_GROUP = int(os.getenv("UPLOAD_BATCH_IMAGE_GROUP", 4))
+
+
+def _validate_upload(file: UploadFile) -> str:
+    """Check filename and extension, returning the lowercased extension"""
     # Check if file was provided
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
-    
+
     # Check file type
-    allowed_extensions = {'.pdf', '.png', '.jpg', '.jpeg'}
     file_extension = os.path.splitext(file.filename.lower())[1]
-    
-    if file_extension not in allowed_extensions:
+
+    if file_extension not in ALLOWED_EXTENSIONS:
         raise HTTPException(
-            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, 
-            detail=f"File type not supported. Allowed: {', '.join(allowed_extensions)}"
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"File type not supported. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
         )
-    
-    try:
-        # Read file content
-        file_content = await file.read()
-        
+    return file_extension
+
+
+def _validate_tier(tier: str) -> str:
+    if tier is not None and tier not in PREPROCESS_TIERS:
+        raise HTTPException(status_code=400, detail=f"Unknown tier. Allowed: {', '.join(PREPROCESS_TIERS)}")
+    return tier
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File too large. Max 10MB")
+
+
+async def _read_upload(file: UploadFile) -> Tuple[int, str]:
+    """Stream the (already spooled) upload in chunks, enforcing the size limit
+    and hashing as we go. Returns (size, sha256) and rewinds the file so it
+    can be handed to the OCR service without copying it into memory.
+    """
+    # Multipart parsing already recorded the size; reject before reading anything
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise _too_large()
+
+    sha = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
         # Check file size (10MB limit)
-        if len(file_content) > 10 * 1024 * 1024:
-            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File too large. Max 10MB")
-        
-        # Extract text based on file type
-        if file_extension == '.pdf':
-            text = ocr_service.extract_text_from_pdf(file_content)
-        else:
-            text = ocr_service.extract_text_from_image(file_content)
-        
-        # Parse transactions from extracted text
-        transactions = ocr_service.parse_transactions(text)
-        for t in transactions:
-	        t["suggested_category"] = suggest_category(t["description"])
-        
+        if size > MAX_FILE_SIZE:
+            raise _too_large()
+        sha.update(chunk)
+
+    await file.seek(0)
+    return size, sha.hexdigest()
+
+
+@router.post("/")
+async def upload_file(
+    file: UploadFile = File(...),
+    tier: str = Query(None),
+    user_id: Optional[int] = Depends(get_optional_user_id),
+):
+    """Upload and process a file to extract transactions.
+    tier selects the image preprocessing tier (fast, balanced, accurate).
+    Signed-in users get categories learned from their own transactions, and
+    possible_duplicate_of: the id of a similar saved transaction (same amount,
+    a few days apart) that this one may repeat.
+    """
+    file_extension = _validate_upload(file)
+    tier = _validate_tier(tier)
+
+    try:
+        file_size, digest = await _read_upload(file)
+
+        # OCR is blocking; keep it off the event loop
+        result = await run_in_threadpool(process_document, file.file, file_extension, digest, tier)
+        await _load_categorizer(user_id)
+        text = result["text"]
+        transactions = result["transactions"]
+        _add_suggestions(transactions, user_id)
+        await _mark_duplicates(transactions, user_id)
+
         return {
             "success": True,
             "filename": file.filename,
             "file_type": file_extension,
-            "file_size": len(file_content),
+            "file_size": file_size,
+            "cached": result["cached"],
+            "stage_timings": result["stage_timings"],
             "transactions": transactions,
             "transaction_count": len(transactions),
             "raw_text": text[:200] + "..." if len(text) > 200 else text
         }
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+def _spool_stream(source, limit: int) -> Tuple[tempfile.SpooledTemporaryFile, int, str]:
+    """Copy a stream into a private spooled file, enforcing limit and hashing as it goes"""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_LIMIT)
+    sha = hashlib.sha256()
+    size = 0
+    try:
+        for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b""):
+            size += len(chunk)
+            if size > limit:
+                raise _too_large()
+            sha.update(chunk)
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool, size, sha.hexdigest()
+
+
+def _collect_batch(files: List[UploadFile]) -> List[Dict]:
+    """Validate the uploads (or the members of a single ZIP) and copy each into
+    a private spooled file. FastAPI closes the request's upload files before a
+    streaming response body runs, so the batch needs its own copies.
+    """
+    items: List[Dict] = []
+    try:
+        if len(files) == 1 and files[0].filename and files[0].filename.lower().endswith(".zip"):
+            archive, _, _ = _spool_stream(files[0].file, MAX_BATCH_SIZE)
+            with archive, zipfile.ZipFile(archive) as zf:
+                members = [m for m in zf.infolist() if not m.is_dir()]
+                if len(members) > MAX_BATCH_FILES:
+                    raise HTTPException(status_code=400, detail=f"Too many files. Max {MAX_BATCH_FILES}")
+                for member in members:
+                    item = {"filename": member.filename}
+                    item["file_type"] = os.path.splitext(member.filename.lower())[1]
+                    if item["file_type"] not in ALLOWED_EXTENSIONS:
+                        item["error"] = "File type not supported"
+                    elif member.file_size > MAX_FILE_SIZE:
+                        item["error"] = "File too large. Max 10MB"
+                    else:
+                        with zf.open(member) as source:
+                            item["file"], item["file_size"], item["digest"] = _spool_stream(source, MAX_FILE_SIZE)
+                    items.append(item)
+        else:
+            if len(files) > MAX_BATCH_FILES:
+                raise HTTPException(status_code=400, detail=f"Too many files. Max {MAX_BATCH_FILES}")
+            for file in files:
+                item = {"filename": file.filename}
+                try:
+                    item["file_type"] = _validate_upload(file)
+                    item["file"], item["file_size"], item["digest"] = _spool_stream(file.file, MAX_FILE_SIZE)
+                except HTTPException as e:
+                    item["error"] = e.detail
+                items.append(item)
+    except zipfile.BadZipFile:
+        _close_batch(items)
+        raise HTTPException(status_code=400, detail="Invalid ZIP file")
+    except BaseException:
+        _close_batch(items)
+        raise
+    return items
+
+
+def _close_batch(items: List[Dict]) -> None:
+    for item in items:
+        if "file" in item:
+            item["file"].close()
+
+
+def _batch_groups(items: List[Dict]) -> List[List[int]]:
+    """Split item indexes into work units: each PDF alone, images in small groups"""
+    groups, images = [], []
+    for index, item in enumerate(items):
+        if "error" in item:
+            continue
+        if item["file_type"] == ".pdf":
+            groups.append([index])
+        else:
+            images.append(index)
+    groups.extend(images[i:i + BATCH_IMAGE_GROUP] for i in range(0, len(images), BATCH_IMAGE_GROUP))
+    return groups
+
+
+def _add_suggestions(transactions: List[Dict], user_id: Optional[int]) -> List[Dict]:
+    """Set suggested_category on each transaction, categorizing the batch in one call"""
+    categories = user_categorizer.suggest_many(user_id, [t["description"] for t in transactions])
+    for t, category in zip(transactions, categories):
+        t["suggested_category"] = category
+    return transactions
+
+
+async def _mark_duplicates(transactions: List[Dict], user_id: Optional[int]) -> None:
+    """Set possible_duplicate_of against the user's saved transactions (a query, so off the loop)"""
+    await run_in_threadpool(mark_duplicates, user_id, transactions)
+
+
+async def _load_categorizer(user_id: Optional[int]) -> None:
+    """Train the user's category model off the event loop, so suggest_many() stays in memory"""
+    if user_id is not None:
+        await run_in_threadpool(user_categorizer.load, user_id)
+
+
+def _batch_record(index: int, item: Dict, result: Dict, elapsed: float, user_id: Optional[int] = None) -> Dict:
+    record = {
+        "type": "file",
+        "index": index,
+        "filename": item["filename"],
+        "file_type": item.get("file_type"),
+        "file_size": item.get("file_size"),
+    }
+    error = item.get("error") or result.get("error")
+    if error:
+        record.update({"success": False, "error": error})
+        return record
+
+    text = result["text"]
+    transactions = _add_suggestions(result["transactions"], user_id)
+    record.update({
+        "success": True,
+        "cached": result["cached"],
+        "transactions": transactions,
+        "transaction_count": len(transactions),
+        "raw_text": text[:200] + "..." if len(text) > 200 else text,
+        "timings": {
+            "total": round(elapsed, 4),
+            "stages": result["stage_timings"],
+            "batched_with": result.get("batched_with", 1),
+        },
+    })
+    return record
+
+
+def _encode_event(record: Dict, stream: str) -> str:
+    payload = json.dumps(record)
+    if stream == "sse":
+        return f"event: {record['type']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+async def _stream_batch(items: List[Dict], tier: str, stream: str, user_id: Optional[int] = None):
+    """Yield one record per file as soon as its work unit finishes, then a summary"""
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, BATCH_CONCURRENCY))
+
+    async def run(group: List[int]):
+        async with semaphore:
+            group_start = time.perf_counter()
+            documents = [(items[i]["file"], items[i]["file_type"], items[i]["digest"]) for i in group]
+            results = await run_in_threadpool(process_documents, documents, tier)
+            return group, results, time.perf_counter() - group_start
+
+    tasks = [asyncio.create_task(run(group)) for group in _batch_groups(items)]
+    succeeded = 0
+    try:
+        # Files rejected up front are reported immediately
+        for index, item in enumerate(items):
+            if "error" in item:
+                yield _encode_event(_batch_record(index, item, {}, 0.0), stream)
+
+        await _load_categorizer(user_id)
+        for next_done in asyncio.as_completed(tasks):
+            group, results, elapsed = await next_done
+            for index, result in zip(group, results):
+                record = _batch_record(index, items[index], result, elapsed, user_id)
+                if record["success"]:
+                    await _mark_duplicates(record["transactions"], user_id)
+                succeeded += record["success"]
+                yield _encode_event(record, stream)
+
+        yield _encode_event({
+            "type": "summary",
+            "file_count": len(items),
+            "succeeded": succeeded,
+            "failed": len(items) - succeeded,
+            "elapsed": round(time.perf_counter() - started, 4),
+        }, stream)
+    finally:
+        # Client went away or we finished: stop pending work and drop the spools
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        _close_batch(items)
+
+
+@router.post("/batch")
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    tier: str = Query(None),
+    stream: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    user_id: Optional[int] = Depends(get_optional_user_id),
+):
+    """Upload many files (or a single ZIP of receipts) and stream one result
+    record per file as it finishes, followed by a summary record.
+    """
+    tier = _validate_tier(tier)
+    items = await run_in_threadpool(_collect_batch, files)
+    media_type = "text/event-stream" if stream == "sse" else "application/x-ndjson"
+    return StreamingResponse(_stream_batch(items, tier, stream, user_id), media_type=media_type)
+
+def _image_pages(file_content, tier: str, timings: Dict[str, float]):
+    """An image as a one-page document, shaped like OCRService.iter_pdf_pages"""
+    yield 1, 1, ocr_service.extract_text_from_image(file_content, tier, timings), "ocr"
+
+
+async def _stream_pages(spool, filename: str, file_type: str, file_size: int, digest: str, tier: str, stream: str,
+                        user_id: Optional[int] = None):
+    """Yield each page's transactions as soon as the page is read or OCRed,
+    then a summary carrying the full transaction list dated with the
+    document-wide date. Page events use the best date seen so far.
+    """
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+    first_transaction = None
+    pages = None
+
+    try:
+        await _load_categorizer(user_id)
+        cached = await run_in_threadpool(ocr_cache.get, digest, tier)
+        if cached is not None:
+            text, transactions = cached["text"], cached["transactions"]
+            page_count = None
+        else:
+            if file_type == ".pdf":
+                pages = ocr_service.iter_pdf_pages(spool, tier, timings)
+            else:
+                pages = _image_pages(spool, tier, timings)
+
+            document_date = receipt_parser.DocumentDate()
+            fallback_date = receipt_parser.today()
+            seen = set()
+            texts: List[str] = []
+            transactions = []
+            page_count = 0
+            while True:
+                # Blocking OCR runs in the threadpool one page at a time
+                page = await run_in_threadpool(next, pages, None)
+                if page is None:
+                    break
+                page_number, page_count, page_text, source = page
+                if page_text:
+                    texts.append(page_text)
+                txn_date = document_date.feed(page_text) or fallback_date
+                page_transactions = receipt_parser.parse_lines(page_text, txn_date, seen)
+                transactions.extend(page_transactions)
+
+                elapsed = time.perf_counter() - started
+                if page_transactions and first_transaction is None:
+                    first_transaction = elapsed
+                yield _encode_event({
+                    "type": "page",
+                    "page": page_number,
+                    "page_count": page_count,
+                    "source": source,
+                    "transactions": _add_suggestions([dict(t) for t in page_transactions], user_id),
+                    "elapsed": round(elapsed, 4),
+                    "stage_timings": {stage: round(seconds, 4) for stage, seconds in timings.items()},
+                }, stream)
+
+            # Same text and transactions as the non-streaming upload, so the cache is shared
+            text = "\n".join(texts).strip()
+            final_date = receipt_parser.extract_global_date(text) or fallback_date
+            transactions = [{**t, "date": final_date} for t in transactions]
+            await run_in_threadpool(ocr_cache.put, digest, text, transactions, tier)
+
+        _add_suggestions(transactions, user_id)
+        await _mark_duplicates(transactions, user_id)
+        yield _encode_event({
+            "type": "summary",
+            "success": True,
+            "filename": filename,
+            "file_type": file_type,
+            "file_size": file_size,
+            "cached": cached is not None,
+            "page_count": page_count,
+            "date": transactions[0]["date"] if transactions else None,
+            "transactions": transactions,
+            "transaction_count": len(transactions),
+            "raw_text": text[:200] + "..." if len(text) > 200 else text,
+            "timings": {
+                "total": round(time.perf_counter() - started, 4),
+                "first_transaction": round(first_transaction, 4) if first_transaction is not None else None,
+                "stages": {stage: round(seconds, 4) for stage, seconds in timings.items()},
+            },
+        }, stream)
+    except Exception as e:
+        yield _encode_event({"type": "error", "success": False, "error": f"Error: {str(e)}"}, stream)
+    finally:
+        # Also runs when the client disconnects: stop OCR workers and drop the spool
+        if pages is not None:
+            await run_in_threadpool(pages.close)
+        spool.close()
+
+
+@router.post("/stream")
+async def upload_file_stream(
+    file: UploadFile = File(...),
+    tier: str = Query(None),
+    stream: str = Query("sse", pattern="^(ndjson|sse)$"),
+    user_id: Optional[int] = Depends(get_optional_user_id),
+):
+    """Upload a file and stream its transactions page by page ("page" events
+    with progress and stage timings), followed by a "summary" event whose
+    transactions carry the date resolved over the whole document.
+    """
+    file_extension = _validate_upload(file)
+    tier = _validate_tier(tier)
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise _too_large()
+
+    # The form file is closed before the response body runs; stream from a private copy
+    spool, file_size, digest = await run_in_threadpool(_spool_stream, file.file, MAX_FILE_SIZE)
+    media_type = "text/event-stream" if stream == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_pages(spool, file.filename, file_extension, file_size, digest, tier, stream, user_id),
+        media_type=media_type,
+    )
+
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_upload_job(
+    file: UploadFile = File(...),
+    tier: str = Query(None),
+    user_id: Optional[int] = Depends(get_optional_user_id),
+):
+    """Queue a file for OCR in the worker pool and return its job id immediately"""
+    file_extension = _validate_upload(file)
+    tier = _validate_tier(tier)
+    file_size, digest = await _read_upload(file)
+
+    try:
+        job = await run_in_threadpool(ocr_jobs.submit, file.file, file_size, digest, file.filename, file_extension, tier,
+                                     user_id)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/upload/jobs/{job.id}"
+    }
+
+@router.get("/jobs")
+async def get_upload_job_stats():
+    """Queue depth, per-status job counts and average processing time"""
+    return ocr_jobs.stats()
+
+@router.get("/jobs/{job_id}")
+async def get_upload_job(job_id: str, user_id: Optional[int] = Depends(get_optional_user_id)):
+    """Get status, timings and (when done) the extracted transactions of a job.
+    Jobs of other users are reported as not found."""
+    job = ocr_jobs.get(job_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@router.delete("/jobs/{job_id}")
+async def cancel_upload_job(job_id: str, user_id: Optional[int] = Depends(get_optional_user_id)):
+    """Cancel a queued or running job of the caller"""
+    job = ocr_jobs.cancel(job_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@router.get("/cache")
+async def get_ocr_cache_stats():
+    """OCR result cache hit/miss counters and size"""
+    return ocr_cache.stats()
+
+@router.get("/categorizer")
+async def get_categorizer_stats():
+    """Suggestion cache hit rate and loaded per-user models"""
+    return {"rules_cache": categorizer.cache_stats(), "user_models": user_categorizer.stats()}
+
 @router.get("/formats")
 async def get_supported_formats():
     """Get list of supported file formats"""
     return {
         "supported_formats": [".pdf", ".png", ".jpg", ".jpeg"],
-        "max_file_size": "10MB"
+        "max_file_size": "10MB",
+        "preprocessing_tiers": list(PREPROCESS_TIERS)
     }
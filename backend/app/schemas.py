@@ -18,9 +18,41 @@ class TransactionResponse(TransactionBase):
 	class Config:
 		from_attributes = True
 
+class TransactionSaveResponse(TransactionResponse):
+	# True when the item was already stored and nothing was inserted
+	deduplicated: bool = False
+
 class TransactionBatchCreate(BaseModel):
 	items: List[TransactionCreate]
 
+class TransactionFilters(BaseModel):
+	start_date: Optional[str] = None
+	end_date: Optional[str] = None
+	category: Optional[str] = None
+	min_amount: Optional[float] = None
+	max_amount: Optional[float] = None
+
+class Pagination(BaseModel):
+	skip: int
+	limit: int
+	cursor: Optional[str] = None
+	next_cursor: Optional[str] = None
+
+class TransactionSearchResponse(BaseModel):
+	query: str
+	transactions: List[TransactionResponse]
+	filters: TransactionFilters
+	pagination: Pagination
+
+class TransactionFilterResponse(BaseModel):
+	transactions: List[TransactionResponse]
+	# None when count=none; total_count_exact is False for planner estimates and
+	# cached counts (another worker process may have written since)
+	total_count: Optional[int] = None
+	total_count_exact: bool = True
+	filters: TransactionFilters
+	pagination: Pagination
+
 
 # Auth related schemas
 class UserSignup(BaseModel):
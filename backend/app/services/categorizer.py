@@ -1,5 +1,8 @@
+import os
 import re
-from typing import Dict, List
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
 
 _CLEAN_RX = re.compile(r"[^a-z0-9\s]+")
 
@@ -23,23 +26,162 @@ _RULES: Dict[str, List[str]] = {
 	"Health": ["protein","iq bar","ks protein","vitamin","supplement","whey","electrolyte"],
 }
 
-# Build flattened keyword list for fast matching
-_FLAT: List[tuple[str, str]] = [(cat, _normalize(k)) for cat, kws in _RULES.items() for k in kws]
+# Match keywords only as whole words ("gas" in "gas station" but not in "vegas")
+WORD_BOUNDARY = os.getenv("CATEGORIZER_WORD_BOUNDARY", "False").lower() == "true"
 
-def suggest_category(description: str) -> str:
-	desc = _normalize(description)
-	if not desc:
-		return "Uncategorized"
+# Suggestions remembered per normalized description; statements repeat merchants a lot
+CATEGORY_CACHE_SIZE = int(os.getenv("CATEGORY_CACHE_SIZE", 4096))
+
+
+class KeywordAutomaton:
+	"""Aho-Corasick automaton over normalized keywords.
+
+	One left-to-right pass over the description finds every keyword it
+	contains, so matching cost depends on the description length, not on
+	the number of keywords.
+	"""
+
+	def __init__(self, keywords: Iterable[Tuple[str, str]], word_boundary: bool = False):
+		self.word_boundary = word_boundary
+		# Distinct keyword -> categories listing it (once per listing, as scored)
+		self.keywords: List[str] = []
+		self.categories: List[List[str]] = []
+		index: Dict[str, int] = {}
+		for cat, kw in keywords:
+			if not kw:
+				continue
+			if kw not in index:
+				index[kw] = len(self.keywords)
+				self.keywords.append(kw)
+				self.categories.append([])
+			self.categories[index[kw]].append(cat)
+
+		# Trie: goto[state][char] -> state; out[state] holds keyword ids ending there
+		self._goto: List[Dict[str, int]] = [{}]
+		self._out: List[List[int]] = [[]]
+		for kw_id, kw in enumerate(self.keywords):
+			state = 0
+			for ch in kw:
+				nxt = self._goto[state].get(ch)
+				if nxt is None:
+					nxt = len(self._goto)
+					self._goto[state][ch] = nxt
+					self._goto.append({})
+					self._out.append([])
+				state = nxt
+			self._out[state].append(kw_id)
+		# Without digits in any keyword, which digit sits where cannot change a match
+		self.digit_free = not any(ch.isdigit() for kw in self.keywords for ch in kw)
 
-	# score each category by number of keyword hits (substring match)
-	scores: Dict[str, int] = {}
-	for cat, kw in _FLAT:
-		if kw and kw in desc:
-			scores[cat] = scores.get(cat, 0) + 1
+		# Failure links, breadth first; outputs inherit those of their fail state
+		self._fail = [0] * len(self._goto)
+		queue = deque(self._goto[0].values())
+		while queue:
+			state = queue.popleft()
+			for ch, nxt in self._goto[state].items():
+				queue.append(nxt)
+				fail = self._fail[state]
+				while fail and ch not in self._goto[fail]:
+					fail = self._fail[fail]
+				self._fail[nxt] = self._goto[fail].get(ch, 0)
+				self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
 
+	def matches(self, text: str) -> set:
+		"""Ids of the keywords occurring in text"""
+		goto, fail, out = self._goto, self._fail, self._out
+		found = set()
+		state = 0
+		for end, ch in enumerate(text, start=1):
+			while state and ch not in goto[state]:
+				state = fail[state]
+			state = goto[state].get(ch, 0)
+			if out[state]:
+				if self.word_boundary:
+					if end < len(text) and text[end] != " ":
+						continue
+					for kw_id in out[state]:
+						start = end - len(self.keywords[kw_id])
+						if start == 0 or text[start - 1] == " ":
+							found.add(kw_id)
+				else:
+					found.update(out[state])
+		return found
+
+	def scores(self, text: str) -> Dict[str, int]:
+		"""Number of matching keywords per category"""
+		scores: Dict[str, int] = {}
+		for kw_id in self.matches(text):
+			for cat in self.categories[kw_id]:
+				scores[cat] = scores.get(cat, 0) + 1
+		return scores
+
+
+def build_automaton(rules: Dict[str, List[str]], word_boundary: bool = WORD_BOUNDARY) -> KeywordAutomaton:
+	return KeywordAutomaton(((cat, _normalize(k)) for cat, kws in rules.items() for k in kws), word_boundary)
+
+
+_AUTOMATON = build_automaton(_RULES)
+
+
+def _best_category(desc: str, automaton: KeywordAutomaton) -> str:
+	# score each category by number of keyword hits
+	scores = automaton.scores(desc)
 	if not scores:
 		return "Uncategorized"
 
 	# pick the category with the highest score (ties broken by lexicographic order)
-	best = max(scores.items(), key=lambda x: (x[1], x[0]))[0]
-	return best
\ No newline at end of file
+	return max(scores.items(), key=lambda x: (x[1], x[0]))[0]
+
+
+# Keyed on the automaton too, so results computed under replaced rules never hit
+_cached_category = lru_cache(maxsize=CATEGORY_CACHE_SIZE)(_best_category)
+
+# Dates, store and card numbers make most statement lines distinct; "starbucks 1234"
+# and "starbucks 0871" share a cache entry when the rules contain no digits
+_FOLD_DIGITS = str.maketrans("123456789", "000000000")
+
+
+def _lookup(desc: str, automaton: KeywordAutomaton) -> str:
+	if automaton.digit_free:
+		desc = desc.translate(_FOLD_DIGITS)
+	return _cached_category(desc, automaton)
+
+
+def suggest_category(description: str, automaton: KeywordAutomaton = None) -> str:
+	"""Category for one description. An explicit automaton bypasses the cache."""
+	desc = _normalize(description)
+	if not desc:
+		return "Uncategorized"
+	if automaton is not None:
+		return _best_category(desc, automaton)
+	return _lookup(desc, _AUTOMATON)
+
+
+def suggest_categories(descriptions: Iterable[str]) -> List[str]:
+	"""suggest_category for many descriptions, in order"""
+	automaton = _AUTOMATON
+	return [
+		_lookup(desc, automaton) if desc else "Uncategorized"
+		for desc in map(_normalize, descriptions)
+	]
+
+
+def set_rules(rules: Dict[str, List[str]], word_boundary: Optional[bool] = None) -> None:
+	"""Replace the keyword rules and drop every cached suggestion"""
+	global _RULES, _AUTOMATON
+	_AUTOMATON = build_automaton(rules, WORD_BOUNDARY if word_boundary is None else word_boundary)
+	_RULES = rules
+	_cached_category.cache_clear()
+
+
+def cache_stats() -> Dict:
+	"""Hit/miss counters and size of the suggestion cache"""
+	info = _cached_category.cache_info()
+	lookups = info.hits + info.misses
+	return {
+		"hits": info.hits,
+		"misses": info.misses,
+		"hit_rate": round(info.hits / lookups, 4) if lookups else None,
+		"size": info.currsize,
+		"max_size": info.maxsize,
+	}
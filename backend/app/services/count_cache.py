@@ -0,0 +1,72 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+
+class CountCache:
+    """Row counts per (user, filter), so paging through one filter counts once.
+
+    Each user has a version number that invalidate() bumps on every write,
+    and entries are keyed on it, so a count never outlives a change in this
+    process. Other worker processes do not see the bump, so callers must
+    treat a hit as possibly stale (by up to the TTL).
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_entries = max_entries or int(os.getenv("COUNT_CACHE_MAX_ENTRIES", 1024))
+        self.ttl = ttl or float(os.getenv("COUNT_CACHE_TTL", 300))
+        # (user_id, version, key) -> (count, time stored)
+        self._entries: OrderedDict = OrderedDict()
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, user_id: int) -> int:
+        """Take before running a count; pass to put() so a count raced by a write is not served"""
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def get(self, user_id: int, key: Hashable) -> Optional[int]:
+        with self._lock:
+            entry_key = (user_id, self._versions.get(user_id, 0), key)
+            entry = self._entries.get(entry_key)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, user_id: int, key: Hashable, count: int, version: int) -> None:
+        with self._lock:
+            self._entries[(user_id, version, key)] = (count, time.monotonic())
+            self._entries.move_to_end((user_id, version, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        """Call after committing any change to the user's transactions"""
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            # Old entries can no longer be hit; drop them rather than wait for the LRU
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+# Create a singleton instance
+count_cache = CountCache()
@@ -0,0 +1,126 @@
+import os
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db import ReadSessionLocal
+from app.models import Transaction
+from app.services.categorizer import _normalize
+
+# A stored row is a possible duplicate if it has the same amount, is at most
+# DUPLICATE_WINDOW_DAYS away and its description is similar enough (0.3 is
+# pg_trgm's default similarity threshold)
+DUPLICATE_WINDOW_DAYS = int(os.getenv("DUPLICATE_WINDOW_DAYS", 3))
+DUPLICATE_MIN_SIMILARITY = float(os.getenv("DUPLICATE_MIN_SIMILARITY", 0.3))
+TRIGRAM_CACHE_SIZE = int(os.getenv("TRIGRAM_CACHE_SIZE", 65536))
+# Distinct amounts per candidate query
+MAX_AMOUNTS_PER_QUERY = 500
+
+
+@lru_cache(maxsize=TRIGRAM_CACHE_SIZE)
+def trigrams(description: str) -> FrozenSet[str]:
+    """Trigrams of each word, padded like PostgreSQL's pg_trgm ("  ab", " ab", "ab ")"""
+    grams = set()
+    for word in _normalize(description).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def similarity(a: str, b: str) -> float:
+    """Shared trigrams over all trigrams of both descriptions (pg_trgm's similarity())"""
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    shared = len(grams_a & grams_b)
+    return shared / (len(grams_a) + len(grams_b) - shared)
+
+
+def _parse_date(value) -> Optional[date]:
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def find_duplicates(db: Session, user_id: int, transactions: List[Dict],
+                    window_days: Optional[int] = None, min_similarity: Optional[float] = None) -> List[Optional[int]]:
+    """For each parsed transaction, the id of the most similar stored row of
+    the user with the same amount within the date window, or None.
+
+    Candidates come from the (user_id, amount, date) index, one query per
+    group of transactions whose date windows overlap (a receipt is one
+    group), so the cost depends on how many rows share an amount within the
+    window, not on the size of the account.
+    """
+    window = timedelta(days=DUPLICATE_WINDOW_DAYS if window_days is None else window_days)
+    threshold = DUPLICATE_MIN_SIMILARITY if min_similarity is None else min_similarity
+
+    wanted = []
+    for index, t in enumerate(transactions):
+        txn_date = _parse_date(t.get("date"))
+        if txn_date is not None and t.get("amount") is not None and t.get("description"):
+            wanted.append((index, txn_date, round(float(t["amount"]), 2)))
+    found: List[Optional[int]] = [None] * len(transactions)
+    if not wanted:
+        return found
+
+    # One IN (amounts) AND date BETWEEN ... range scan per group of overlapping windows
+    groups: List[List] = []
+    for item in sorted(wanted, key=lambda w: w[1]):
+        if groups and item[1] - groups[-1][-1][1] <= 2 * window:
+            groups[-1].append(item)
+        else:
+            groups.append([item])
+
+    candidates: Dict[float, Dict[int, object]] = {}
+    for group in groups:
+        amounts = sorted({amount for _, _, amount in group})
+        for start in range(0, len(amounts), MAX_AMOUNTS_PER_QUERY):
+            rows = db.execute(
+                select(Transaction.id, Transaction.date, Transaction.amount, Transaction.description)
+                .where(Transaction.user_id == user_id)
+                .where(Transaction.amount.in_(amounts[start:start + MAX_AMOUNTS_PER_QUERY]))
+                .where(Transaction.date.between(group[0][1] - window, group[-1][1] + window))
+            )
+            for row in rows:
+                candidates.setdefault(round(float(row.amount), 2), {})[row.id] = row
+
+    for index, txn_date, amount in wanted:
+        description = transactions[index]["description"]
+        best = None
+        for row in candidates.get(amount, {}).values():
+            distance = abs((row.date - txn_date).days)
+            if distance > window.days:
+                continue
+            score = similarity(description, row.description)
+            # Most similar first, then the nearest date, then the oldest row
+            rank = (score, -distance, -row.id)
+            if score >= threshold and (best is None or rank > best[0]):
+                best = (rank, row.id)
+        if best is not None:
+            found[index] = best[1]
+    return found
+
+
+def mark_duplicates(user_id: Optional[int], transactions: List[Dict]) -> List[Dict]:
+    """Set possible_duplicate_of on each parsed transaction (None for anonymous
+    uploads). Call from a worker thread: it queries the database.
+    """
+    if user_id is None or not transactions:
+        for t in transactions:
+            t["possible_duplicate_of"] = None
+        return transactions
+    db = ReadSessionLocal()
+    try:
+        duplicates = find_duplicates(db, user_id, transactions)
+    finally:
+        db.close()
+    for t, duplicate_of in zip(transactions, duplicates):
+        t["possible_duplicate_of"] = duplicate_of
+    return transactions
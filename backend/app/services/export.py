@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+import os
+import zlib
+from decimal import Decimal
+from typing import Iterable, Iterator, Sequence
+
+# Rows fetched from the database per round trip while exporting
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 2000))
+# Bytes buffered before a chunk is sent to the client
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+
+def _json_default(value):
+    # Amounts as numbers, like the JSON API
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Cannot export {type(value).__name__}")
+
+
+def _encode(rows: Iterable[Sequence], columns: Sequence[str], fmt: str) -> Iterator[str]:
+    """Text chunks of about EXPORT_CHUNK_BYTES characters"""
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        # csv calls str(): ISO dates, exact decimal amounts ("12.50"), None as ""
+        write = writer.writerow
+    else:
+        write = lambda row: buffer.write(json.dumps(dict(zip(columns, row)), default=_json_default) + "\n")
+
+    for row in rows:
+        write(row)
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_export(rows: Iterable[Sequence], columns: Sequence[str], fmt: str, compress: bool = False) -> Iterator[bytes]:
+    """Encode result rows as CSV or NDJSON bytes, optionally gzipped, one chunk at
+    a time. Memory stays at one chunk plus whatever `rows` buffers.
+    """
+    if not compress:
+        for chunk in _encode(rows, columns, fmt):
+            yield chunk.encode("utf-8")
+        return
+
+    # wbits=31: a gzip container, compressed as the chunks go by
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in _encode(rows, columns, fmt):
+        compressed = compressor.compress(chunk.encode("utf-8"))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
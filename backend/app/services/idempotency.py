@@ -0,0 +1,58 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import IdempotencyKey
+
+# How long a key's response is replayed
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", 24 * 3600))
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a different request"""
+
+
+def request_hash(scope: str, payload: Any) -> str:
+    """Identifies a request body, so a key cannot replay the answer to another request"""
+    body = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(f"{scope}\n{body}".encode()).hexdigest()
+
+
+def lookup(db: Session, user_id: int, key: str, req_hash: str) -> Optional[Tuple[int, Any]]:
+    """(status code, JSON body) of the earlier response to this key, if still kept"""
+    saved = (
+        db.query(IdempotencyKey)
+        .filter(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        .first()
+    )
+    if saved is None or saved.created_at < _cutoff():
+        return None
+    if saved.request_hash != req_hash:
+        raise IdempotencyKeyReused(key)
+    return saved.status_code, json.loads(saved.response_body)
+
+
+def remember(db: Session, user_id: int, key: str, req_hash: str, status_code: int, body: Any) -> None:
+    """Store a response in the caller's transaction, so it commits with the write.
+    A concurrent request with the same key then fails the commit with an
+    IntegrityError instead of writing twice.
+    """
+    # Expired keys of this user (including this key) make way
+    db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id, IdempotencyKey.created_at < _cutoff()
+    ).delete(synchronize_session=False)
+    db.add(IdempotencyKey(
+        user_id=user_id,
+        key=key,
+        request_hash=req_hash,
+        status_code=status_code,
+        response_body=json.dumps(body),
+    ))
+
+
+def _cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=IDEMPOTENCY_KEY_TTL)
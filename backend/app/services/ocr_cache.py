@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from app.services import receipt_parser
+from app.services.ocr_service import ocr_service, PARSER_VERSION
+
+
+class OCRCache:
+    """Content-addressed cache of OCR text and parsed transactions.
+
+    Entries are keyed by the SHA-256 of the uploaded bytes plus the OCR
+    configuration, and live in a size-bounded SQLite file (LRU by last
+    access) fronted by a small in-process LRU. The SQLite file is shared by
+    the API process and the OCR worker processes.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None,
+                 hot_entries: Optional[int] = None, enabled: Optional[bool] = None):
+        self.path = path or os.getenv("OCR_CACHE_PATH", "./ocr_cache.db")
+        self.max_bytes = max_bytes or int(os.getenv("OCR_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+        self.hot_entries = hot_entries or int(os.getenv("OCR_CACHE_HOT_ENTRIES", 256))
+        if enabled is None:
+            enabled = os.getenv("OCR_CACHE_ENABLED", "True").lower() == "true"
+        self.enabled = enabled
+
+        self._hot: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._schema_ready = False
+        self._counters = {"hot_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            self._ensure_schema(conn)
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _ensure_schema(self, conn: sqlite3.Connection) -> None:
+        if not self._schema_ready:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ocr_cache (
+                    key TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    transactions TEXT NOT NULL,
+                    parser_version TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_ocr_cache_last_access ON ocr_cache (last_access)")
+            conn.commit()
+            self._schema_ready = True
+
+    def key(self, digest: str, tier: Optional[str] = None) -> str:
+        """Cache key for a file digest under the current OCR and parser configuration"""
+        fingerprint = f"{digest}|{ocr_service.cache_fingerprint(tier)}|parser={PARSER_VERSION}"
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+    def get(self, digest: str, tier: Optional[str] = None) -> Optional[Dict]:
+        """Return {"text", "transactions"} for a previously processed file, or None.
+
+        Transactions of a document without a date of its own were stored with
+        the day it was first parsed; they are re-dated to today on every hit.
+        """
+        if not self.enabled:
+            return None
+        key = self.key(digest, tier)
+
+        with self._lock:
+            entry = self._hot.get(key)
+            if entry is not None:
+                self._hot.move_to_end(key)
+                self._counters["hot_hits"] += 1
+
+        if entry is None:
+            with self._connect() as conn:
+                row = conn.execute("SELECT text, transactions FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE ocr_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+            with self._lock:
+                if row is None:
+                    self._counters["misses"] += 1
+                    return None
+                self._counters["disk_hits"] += 1
+                entry = (row[0], row[1])
+                self._remember(key, entry)
+
+        # Decode on every hit so callers can mutate the transactions freely
+        text, transactions = entry[0], json.loads(entry[1])
+        if transactions and receipt_parser.extract_global_date(text) is None:
+            fallback_date = receipt_parser.today()
+            for transaction in transactions:
+                transaction["date"] = fallback_date
+        return {"text": text, "transactions": transactions}
+
+    def put(self, digest: str, text: str, transactions: List[Dict], tier: Optional[str] = None) -> None:
+        if not self.enabled:
+            return
+        key = self.key(digest, tier)
+        entry = (text, json.dumps(transactions))
+        size = len(entry[0].encode("utf-8")) + len(entry[1])
+        now = time.time()
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (key, text, transactions, parser_version, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, entry[0], entry[1], PARSER_VERSION, size, now, now),
+            )
+            evicted = self._evict(conn)
+
+        with self._lock:
+            self._counters["stores"] += 1
+            self._counters["evictions"] += evicted
+            self._remember(key, entry)
+
+    def _remember(self, key: str, entry: Tuple[str, str]) -> None:
+        self._hot[key] = entry
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.hot_entries:
+            self._hot.popitem(last=False)
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        """Drop least recently used entries until the store fits in max_bytes"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+        evicted = 0
+        while total > self.max_bytes:
+            rows = conn.execute("SELECT key, size FROM ocr_cache ORDER BY last_access LIMIT 50").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                conn.execute("DELETE FROM ocr_cache WHERE key = ?", (key,))
+                total -= size
+                evicted += 1
+                if total <= self.max_bytes:
+                    break
+        return evicted
+
+    def invalidate(self, stale_only: bool = False) -> int:
+        """Drop cached results. Call after changing the parser or OCR pipeline.
+
+        With stale_only, only entries written by another PARSER_VERSION are removed.
+        """
+        with self._lock:
+            self._hot.clear()
+        with self._connect() as conn:
+            if stale_only:
+                cur = conn.execute("DELETE FROM ocr_cache WHERE parser_version != ?", (PARSER_VERSION,))
+            else:
+                cur = conn.execute("DELETE FROM ocr_cache")
+            return cur.rowcount
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            hot_size = len(self._hot)
+        lookups = counters["hot_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["hot_hits"] + counters["disk_hits"]
+
+        entries, total_bytes = 0, 0
+        if self.enabled:
+            with self._connect() as conn:
+                entries, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()
+
+        return {
+            "enabled": self.enabled,
+            **counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "hot_entries": hot_size,
+            "entries": entries,
+            "bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# Create a singleton instance
+ocr_cache = OCRCache()
+
+
+if __name__ == "__main__":
+    import sys
+    # Shared by every user, so not exposed over HTTP; run after a parser change
+    removed = ocr_cache.invalidate(stale_only="--stale-only" in sys.argv[1:])
+    print(f"Removed {removed} cached OCR results from {ocr_cache.path}")
@@ -0,0 +1,378 @@
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from app.services.duplicates import mark_duplicates
+from app.services.ocr_service import ocr_service, Document, open_document
+from app.services.ocr_cache import ocr_cache
+from app.services.user_categorizer import user_categorizer
+
+
+def document_digest(file_content: Document) -> str:
+    """SHA-256 of a document, reading streams in chunks"""
+    if isinstance(file_content, (bytes, bytearray)):
+        return hashlib.sha256(file_content).hexdigest()
+    sha = hashlib.sha256()
+    stream = open_document(file_content)
+    for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+        sha.update(chunk)
+    return sha.hexdigest()
+
+
+def process_document(file_content: Document, file_extension: str, digest: Optional[str] = None,
+                     tier: Optional[str] = None) -> Dict:
+    """Run OCR and transaction parsing for a single uploaded document.
+
+    Results are served from / stored in the OCR cache. stage_timings holds
+    seconds spent per pipeline stage (decode, resize, ocr, ...).
+    """
+    started_at = time.time()
+    digest = digest or document_digest(file_content)
+    timings: Dict[str, float] = {}
+
+    cached = ocr_cache.get(digest, tier)
+    if cached is not None:
+        text, transactions = cached["text"], cached["transactions"]
+    else:
+        if file_extension == '.pdf':
+            text = ocr_service.extract_text_from_pdf(file_content, tier, timings)
+        else:
+            text = ocr_service.extract_text_from_image(file_content, tier, timings)
+        parse_start = time.perf_counter()
+        transactions = ocr_service.parse_transactions(text)
+        timings["parse"] = time.perf_counter() - parse_start
+        ocr_cache.put(digest, text, transactions, tier)
+
+    return {
+        "text": text,
+        "transactions": transactions,
+        "cached": cached is not None,
+        "stage_timings": {stage: round(seconds, 4) for stage, seconds in timings.items()},
+        "started_at": started_at,
+        "finished_at": time.time(),
+        "worker_pid": os.getpid(),
+    }
+
+
+def process_documents(documents: List[Tuple[Document, str, str]], tier: Optional[str] = None) -> List[Dict]:
+    """Process several (file, extension, digest) documents, e.g. one slice of a
+    batch upload. Uncached images share a single tesseract call; PDFs go
+    through process_document. Failures are reported per document as
+    {"error": ...} instead of raising.
+    """
+    results: List[Optional[Dict]] = [None] * len(documents)
+    images = []
+    for index, (file_content, file_extension, digest) in enumerate(documents):
+        if file_extension != '.pdf' and ocr_cache.get(digest, tier) is None:
+            images.append(index)
+            continue
+        results[index] = _process_or_error(file_content, file_extension, digest, tier)
+
+    if len(images) > 1:
+        started_at = time.time()
+        timings: Dict[str, float] = {}
+        try:
+            texts = ocr_service.extract_text_batch([documents[i][0] for i in images], tier, timings)
+        except Exception:
+            # One unreadable image should not fail its neighbours; retry them individually
+            texts = None
+        if texts is not None:
+            stage_timings = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+            for index, text in zip(images, texts):
+                transactions = ocr_service.parse_transactions(text)
+                ocr_cache.put(documents[index][2], text, transactions, tier)
+                results[index] = {
+                    "text": text,
+                    "transactions": transactions,
+                    "cached": False,
+                    "stage_timings": stage_timings,
+                    "batched_with": len(images),
+                    "started_at": started_at,
+                    "finished_at": time.time(),
+                    "worker_pid": os.getpid(),
+                }
+            images = []
+
+    for index in images:
+        file_content, file_extension, digest = documents[index]
+        results[index] = _process_or_error(file_content, file_extension, digest, tier)
+    return results
+
+
+def _process_or_error(file_content: Document, file_extension: str, digest: str, tier: Optional[str]) -> Dict:
+    try:
+        return process_document(file_content, file_extension, digest, tier)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def process_document_file(path: str, file_extension: str, digest: str, tier: Optional[str] = None) -> Dict:
+    """Worker entry point: process a staged upload and remove it afterwards.
+
+    Kept at module level so it can be pickled into the worker processes;
+    only the path crosses the process boundary, not the file bytes.
+    """
+    try:
+        with open(path, "rb") as f:
+            return process_document(f, file_extension, digest, tier)
+    finally:
+        _remove_quietly(path)
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class JobQueueFull(Exception):
+    """Raised when too many OCR jobs are already waiting for a worker"""
+
+
+class OCRJob:
+    def __init__(self, filename: str, file_extension: str, file_size: int, user_id: Optional[int] = None):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.filename = filename
+        self.file_extension = file_extension
+        self.file_size = file_size
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.cancel_requested = False
+        self.future = None
+
+    @property
+    def status(self) -> str:
+        if self.cancel_requested or (self.future is not None and self.future.cancelled()):
+            return "cancelled"
+        if self.error is not None:
+            return "failed"
+        if self.result is not None:
+            return "done"
+        if self.future is not None and (self.future.running() or self.future.done()):
+            return "running"
+        return "queued"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def timings(self) -> Dict:
+        """Queue wait, processing and end-to-end time in seconds"""
+        timings = {"queue_wait": None, "processing": None, "total": None, "stages": {}}
+        if self.started_at is not None:
+            timings["queue_wait"] = round(self.started_at - self.submitted_at, 4)
+        if self.finished_at is not None:
+            timings["total"] = round(self.finished_at - self.submitted_at, 4)
+            if self.started_at is not None:
+                timings["processing"] = round(self.finished_at - self.started_at, 4)
+        if self.result is not None:
+            timings["stages"] = self.result["stage_timings"]
+        return timings
+
+    def to_dict(self) -> Dict:
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "filename": self.filename,
+            "file_type": self.file_extension,
+            "file_size": self.file_size,
+            "submitted_at": self.submitted_at,
+            "timings": self.timings(),
+        }
+        if self.status == "done":
+            text = self.result["text"]
+            transactions = self.result["transactions"]
+            data.update({
+                "cached": self.result["cached"],
+                "transactions": transactions,
+                "transaction_count": len(transactions),
+                "raw_text": text[:200] + "..." if len(text) > 200 else text,
+            })
+        elif self.status == "failed":
+            data["error"] = self.error
+        return data
+
+
+def _init_worker(page_workers: int) -> None:
+    """Runs once in each pool process before it takes jobs"""
+    ocr_service.page_workers = page_workers
+    if "OCR_MAX_PAGES_IN_MEMORY" not in os.environ:
+        ocr_service.max_pages_in_memory = page_workers
+
+
+class OCRJobQueue:
+    """Bounded process pool running OCR jobs off the event loop.
+
+    Jobs are kept in memory; finished jobs are pruned once more than
+    `max_finished_jobs` accumulate.
+
+    Each of the `max_workers` (OCR_WORKERS) processes OCRs the pages of a
+    scanned PDF with `page_workers` threads, each driving a tesseract
+    process, so up to max_workers * page_workers run at once. Unless
+    OCR_PAGE_WORKERS is set, page_workers splits the CPUs between the
+    workers (cpu_count // max_workers, at least 1).
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 max_finished_jobs: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("OCR_WORKERS", os.cpu_count() or 2))
+        self.page_workers = int(os.getenv("OCR_PAGE_WORKERS", max(1, (os.cpu_count() or 2) // self.max_workers)))
+        self.max_pending = max_pending or int(os.getenv("OCR_MAX_PENDING_JOBS", 100))
+        self.max_finished_jobs = max_finished_jobs or int(os.getenv("OCR_JOB_RETENTION", 500))
+        self._jobs: "OrderedDict[str, OCRJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Finishes jobs (database reads) off the executor's result-handling thread
+        self._finisher: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn rather than fork: the API server is multi-threaded
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.page_workers,),
+            )
+        return self._executor
+
+    def _get_finisher(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._finisher is None:
+                self._finisher = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ocr-finish")
+            return self._finisher
+
+    def submit(self, stream: BinaryIO, file_size: int, digest: str, filename: str, file_extension: str,
+               tier: Optional[str] = None, user_id: Optional[int] = None) -> OCRJob:
+        cached = ocr_cache.get(digest, tier)
+
+        with self._lock:
+            if cached is None and self._pending_count() >= self.max_pending:
+                raise JobQueueFull(f"OCR queue is full ({self.max_pending} jobs pending)")
+            job = OCRJob(filename, file_extension, file_size, user_id)
+            self._jobs[job.id] = job
+            self._prune()
+
+        if cached is not None:
+            # Repeat upload: skip the OCR pool, but still finish (database reads) off the caller's thread
+            now = time.time()
+            result = {**cached, "cached": True, "stage_timings": {}, "started_at": now, "finished_at": now}
+            job.future = self._get_finisher().submit(self._finish, job, result)
+            return job
+
+        # Stage the upload on disk so workers read it from there
+        with tempfile.NamedTemporaryFile(prefix="ocr-job-", suffix=file_extension, delete=False) as staged:
+            shutil.copyfileobj(open_document(stream), staged)
+
+        job.future = self._get_executor().submit(process_document_file, staged.name, file_extension, digest, tier)
+        job.future.add_done_callback(lambda fut, job=job, path=staged.name: self._on_done(job, fut, path))
+        return job
+
+    def _on_done(self, job: OCRJob, future, path: str) -> None:
+        if future.cancelled():
+            # Never reached a worker, so the staged file is still ours to clean up
+            _remove_quietly(path)
+            job.finished_at = time.time()
+            return
+        error = future.exception()
+        if error is not None:
+            job.error = str(error)
+            job.finished_at = time.time()
+            return
+
+        # This callback runs on the thread that handles every job's results,
+        # so the database work of finishing is done elsewhere
+        try:
+            self._get_finisher().submit(self._finish, job, future.result())
+        except RuntimeError as e:
+            # Shutting down
+            job.error = str(e)
+            job.finished_at = time.time()
+
+    def _finish(self, job: OCRJob, result: Dict) -> None:
+        """Suggest categories and flag possible duplicates, then publish the result.
+        A failure here fails the job rather than leaving it running."""
+        job.started_at = result["started_at"]
+        try:
+            transactions = result["transactions"]
+            categories = user_categorizer.suggest_many(job.user_id, [t["description"] for t in transactions])
+            for t, category in zip(transactions, categories):
+                t["suggested_category"] = category
+            mark_duplicates(job.user_id, transactions)
+        except Exception as e:
+            job.error = f"Could not finish processing: {e}"
+            job.finished_at = time.time()
+            return
+        job.finished_at = result["finished_at"]
+        if not job.cancel_requested:
+            job.result = result
+
+    def get(self, job_id: str, user_id: Optional[int] = None) -> Optional[OCRJob]:
+        """The job, or None when there is no such job or it was submitted by another user"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return job
+
+    def cancel(self, job_id: str, user_id: Optional[int] = None) -> Optional[OCRJob]:
+        """Cancel a job of `user_id`. Queued jobs never start; results of running jobs are discarded."""
+        job = self.get(job_id, user_id)
+        if job is None or job.is_finished:
+            return job
+        if job.future is not None and not job.future.cancel():
+            job.cancel_requested = True
+        return job
+
+    def _pending_count(self) -> int:
+        return sum(1 for j in self._jobs.values() if j.status == "queued")
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, j in self._jobs.items() if j.is_finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            jobs: List[OCRJob] = list(self._jobs.values())
+
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0, "cancelled": 0}
+        processing = []
+        for j in jobs:
+            counts[j.status] += 1
+            t = j.timings()
+            if j.status == "done" and t["processing"] is not None:
+                processing.append(t["processing"])
+
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "queue_depth": counts["queued"],
+            "jobs": counts,
+            "avg_processing_seconds": round(sum(processing) / len(processing), 4) if processing else None,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._finisher is not None:
+            self._finisher.shutdown(wait=False)
+            self._finisher = None
+
+
+# Create a singleton instance
+ocr_jobs = OCRJobQueue()
@@ -1,40 +1,198 @@
-import pdfplumber
-import pytesseract
-from PIL import Image, ImageEnhance, ImageFilter
-import pdf2image
+from __future__ import annotations
+
 import io
-import re
-from datetime import datetime
-from typing import List, Dict
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import TYPE_CHECKING, List, Dict, Iterable, Iterator, Tuple, Union, BinaryIO
 import os
 import platform
 import shutil
+import tempfile
+import threading
+import time
+
+from app import startup
+from app.services import receipt_parser
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# The OCR libraries take a good share of a second to import, so they are
+# loaded on first use (OCRService.ensure_ready) rather than with this module
+pdfplumber = pytesseract = pdf2image = None
+Image = ImageEnhance = ImageFilter = ImageOps = None
+_pdfium = False  # not imported yet
+
+
+def _import_ocr_libraries() -> None:
+    global pdfplumber, pytesseract, pdf2image, Image, ImageEnhance, ImageFilter, ImageOps
+    import pdfplumber
+    import pytesseract
+    import pdf2image
+    from PIL import Image, ImageEnhance, ImageFilter, ImageOps
+
+
+def _get_pdfium():
+    """pypdfium2, or None when it is not installed"""
+    global _pdfium
+    if _pdfium is False:
+        try:
+            import pypdfium2 as pdfium
+        except ImportError:
+            # Optional: without it the text layer is read with pdfplumber
+            pdfium = None
+        _pdfium = pdfium
+    return _pdfium
+
+# Bump when _preprocess_image / receipt_parser change so cached
+# results produced by the old code are no longer served
+PREPROCESS_VERSION = "1"
+PARSER_VERSION = "1"
+
+# Image preprocessing tiers. max_side caps the longest edge handed to
+# tesseract (None keeps the original resolution); fast uses a single
+# autocontrast pass instead of contrast + sharpen + median.
+PREPROCESS_TIERS = {
+    "fast": {"max_side": 1600, "autocontrast": True, "sharpen": False, "median": False},
+    "balanced": {"max_side": 2400, "autocontrast": False, "sharpen": False, "median": True},
+    "accurate": {"max_side": None, "autocontrast": False, "sharpen": True, "median": True},
+}
+
+# Uploaded documents arrive either as bytes or as a (spooled) binary file
+Document = Union[bytes, BinaryIO]
+
+
+def open_document(file_content: Document) -> BinaryIO:
+    """Return a readable stream positioned at the start of the document"""
+    if isinstance(file_content, (bytes, bytearray)):
+        return io.BytesIO(file_content)
+    file_content.seek(0)
+    return file_content
+
+
+@contextmanager
+def _pdf_on_disk(file_content: Document):
+    """Write the PDF to one temp file shared by pdfium, pdftoppm and the workers"""
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+        shutil.copyfileobj(open_document(file_content), pdf_file)
+        pdf_file.flush()
+        yield pdf_file.name
+
+
+def _read_text_layer(pdf, start: int, stop: int) -> List[str]:
+    texts = []
+    for index in range(start, stop):
+        page = pdf[index]
+        textpage = page.get_textpage()
+        try:
+            text = textpage.get_text_bounded()
+        finally:
+            textpage.close()
+            page.close()
+        # pdfium reports CRLF line endings
+        texts.append(text.replace("\r\n", "\n").replace("\r", "\n"))
+    return texts
+
+
+def _text_layer_worker(pdf_path: str, start: int, stop: int) -> List[str]:
+    pdf = _get_pdfium().PdfDocument(pdf_path)
+    try:
+        return _read_text_layer(pdf, start, stop)
+    finally:
+        pdf.close()
+
+
+_text_layer_pool = None
+_text_layer_pool_lock = threading.Lock()
+
+
+def _get_text_layer_pool(workers: int) -> ProcessPoolExecutor:
+    global _text_layer_pool
+    with _text_layer_pool_lock:
+        if _text_layer_pool is None:
+            _text_layer_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _text_layer_pool
+
+
+def _shutdown_text_layer_pool() -> None:
+    global _text_layer_pool
+    with _text_layer_pool_lock:
+        if _text_layer_pool is not None:
+            _text_layer_pool.shutdown(wait=False, cancel_futures=True)
+            _text_layer_pool = None
+
+
+_timings_lock = threading.Lock()
+
+
+@contextmanager
+def _timed(timings: Dict[str, float], stage: str):
+    """Add the wall time of the block to timings[stage] (seconds), if collecting"""
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _timings_lock:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
 
 class OCRService:
     def __init__(self):
         # Configure Tesseract for better receipt reading
         self.tesseract_config = '--psm 6'
+
+        # Scanned PDF pipeline: rasterization DPI, OCR threads and how many
+        # rasterized pages may be alive at once
+        self.pdf_dpi = int(os.getenv("OCR_PDF_DPI", 300))
+        self.page_workers = int(os.getenv("OCR_PAGE_WORKERS", os.cpu_count() or 2))
+        self.max_pages_in_memory = int(os.getenv("OCR_MAX_PAGES_IN_MEMORY", self.page_workers))
+        # A page with less text-layer text than this is treated as scanned; by
+        # default only pages with no text at all (a short "Total 16.76" page is real text)
+        self.min_page_text_chars = int(os.getenv("OCR_MIN_PAGE_TEXT_CHARS", 1))
+        # Read the text layer in worker processes from this many pages up
+        self.parallel_text_min_pages = int(os.getenv("PDF_PARALLEL_TEXT_MIN_PAGES", 32))
+        # Images handed to a single tesseract process
+        self.ocr_batch_size = int(os.getenv("OCR_BATCH_SIZE", 4))
+
+        # Default preprocessing tier and the effective DPI images are normalized to
+        self.preprocess_tier = os.getenv("OCR_PREPROCESS_TIER", "accurate")
+        self.target_dpi = int(os.getenv("OCR_TARGET_DPI", 300))
         
-        # Define word categories for smart amount selection
-        self.NEG_WORDS = {"refund","credit","reversal","cashback","returned","reimbursed"}
-        self.TOTAL_WORDS = {"grand total","amount due","balance due","total"}
-        self.AVOID_WORDS = {"subtotal","tax","tip","fee","surcharge"}
-        
-        # More precise amount regex with named groups
-        self.AMOUNT_TOKEN = re.compile(r"""
-            (?P<open>\()?                 # (
-            (?P<sign>-)?                  # -
-            \s*
-            (?P<curr>[$€₹])?              # optional currency
-            \s*
-            (?P<num>\d{1,3}(?:,\d{3})*(?:\.\d{2})|\d+\.\d{2})  # require decimals
-            \s*
-            (?(open)\))                   # )
-        """, re.VERBOSE)
-        
-        # Set up Tesseract and Poppler paths for cross-platform support
-        self._setup_ocr_paths()
+        self._ready = False
+        self._ready_lock = threading.Lock()
     
+    def cache_fingerprint(self, tier: str = None) -> str:
+        """Identify every setting that changes the extracted text"""
+        return (
+            f"config={self.tesseract_config}|dpi={self.pdf_dpi}|target_dpi={self.target_dpi}"
+            f"|min_text={self.min_page_text_chars}"
+            f"|preprocess={PREPROCESS_VERSION}|tier={tier or self.preprocess_tier}"
+        )
+
+    def ensure_ready(self) -> None:
+        """Import the OCR libraries and set up Tesseract and Poppler paths for
+        cross-platform support. Runs once per process, on first use.
+        """
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            with startup.timed_phase("ocr_probe"):
+                _import_ocr_libraries()
+                self._setup_ocr_paths()
+            self._ready = True
+
+    def shutdown(self) -> None:
+        """Stop the worker processes that read large PDFs' text layers"""
+        _shutdown_text_layer_pool()
+
     def _setup_ocr_paths(self):
         """Set up Tesseract and Poppler paths for different operating systems"""
         system = platform.system()
@@ -178,212 +336,292 @@ class OCRService:
         if not poppler_found:
             print("Warning: Poppler not found. Please install with: sudo apt-get install poppler-utils")
     
-    def extract_text_from_pdf(self, file_content: bytes) -> str:
-        """Extract text from PDF using pdfplumber, with OCR fallback for scanned PDFs"""
+    def extract_text_from_pdf(self, file_content: Document, tier: str = None, timings: Dict[str, float] = None) -> str:
+        """Extract text from PDF page by page: text layer where present, OCR for scanned pages"""
         try:
-            # First try: Extract text directly from PDF
-            with pdfplumber.open(io.BytesIO(file_content)) as pdf:
-                text = ""
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-                
-                # If we got meaningful text, return it
-                if text.strip() and len(text.strip()) > 50:
-                    return text.strip()
-            
-            # Fallback: Convert PDF to images and OCR
-            print("PDF has no extractable text, using OCR fallback...")
-            return self._extract_text_from_pdf_images(file_content)
-            
+            texts = [page_text for _, _, page_text, _ in self.iter_pdf_pages(file_content, tier, timings) if page_text]
+            return "\n".join(texts).strip()
         except Exception as e:
             raise Exception(f"Error extracting text from PDF: {str(e)}")
-    
-    def _extract_text_from_pdf_images(self, file_content: bytes) -> str:
+
+    def iter_pdf_pages(self, file_content: Document, tier: str = None,
+                       timings: Dict[str, float] = None) -> Iterator[Tuple[int, int, str, str]]:
+        """Yield (page_number, page_count, text, source) in page order, source being "text" or "ocr".
+
+        Each page's text layer is read first; only pages with fewer than
+        `min_page_text_chars` characters of usable text (by default, blank
+        pages) are rasterized and OCRed. If OCR fails, pages that have some
+        text-layer text keep it; the error is raised only for pages with none.
+        """
+        self.ensure_ready()
+        with _pdf_on_disk(file_content) as pdf_path:
+            with _timed(timings, "text_layer"):
+                layer = self._extract_text_layer(pdf_path)
+
+            ocr_pages = [i + 1 for i, text in enumerate(layer) if len(text.strip()) < self.min_page_text_chars]
+            if ocr_pages:
+                print(f"{len(ocr_pages)} of {len(layer)} PDF pages have no extractable text, using OCR fallback...")
+            ocr_results = self._iter_ocr_pdf_path(pdf_path, ocr_pages, tier, timings)
+            ocr_page_set = set(ocr_pages)
+            ocr_error = None
+
+            for page_number, text in enumerate(layer, start=1):
+                if page_number in ocr_page_set and ocr_error is None:
+                    try:
+                        _, page_text = next(ocr_results)
+                    except Exception as e:
+                        # The generator is finished after an error; later pages fall back too
+                        ocr_error = e
+                    else:
+                        yield page_number, len(layer), page_text, "ocr"
+                        continue
+                if page_number in ocr_page_set:
+                    if not text.strip():
+                        raise ocr_error
+                    print(f"Warning: OCR failed on PDF page {page_number} ({ocr_error}); using its text layer")
+                yield page_number, len(layer), text, "text"
+
+    def _extract_text_layer(self, pdf_path: str) -> List[str]:
+        """Text layer of every page. Long documents are split across processes."""
+        self.ensure_ready()
+        pdfium = _get_pdfium()
+        if pdfium is None:
+            with pdfplumber.open(pdf_path) as pdf:
+                return [page.extract_text() or "" for page in pdf.pages]
+
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            page_count = len(pdf)
+            if page_count < self.parallel_text_min_pages:
+                return _read_text_layer(pdf, 0, page_count)
+        finally:
+            pdf.close()
+
+        # pdfium is not thread-safe, so parallelism means processes
+        chunk = -(-page_count // self.page_workers)
+        ranges = [(start, min(start + chunk, page_count)) for start in range(0, page_count, chunk)]
+        futures = [_get_text_layer_pool(self.page_workers).submit(_text_layer_worker, pdf_path, a, b) for a, b in ranges]
+        return [text for future in futures for text in future.result()]
+
+    def _extract_text_from_pdf_images(self, file_content: Document, tier: str = None, timings: Dict[str, float] = None) -> str:
         """Convert PDF pages to images and OCR them"""
         try:
-            # Convert PDF to images
-            images = pdf2image.convert_from_bytes(file_content, dpi=300)
-            
-            text = ""
-            for image in images:
-                # Preprocess image for better OCR
-                processed_image = self._preprocess_image(image)
-                
-                # Extract text with optimized config
-                page_text = pytesseract.image_to_string(
-                    processed_image, 
-                    config=self.tesseract_config
-                )
-                if page_text:
-                    text += page_text + "\n"
-            
-            return text.strip()
+            pages = self.iter_ocr_pdf_pages(file_content, tier=tier, timings=timings)
+            texts = [page_text for _, page_text in pages if page_text]
+            return "\n".join(texts).strip()
         except Exception as e:
             raise Exception(f"Error in PDF OCR fallback: {str(e)}")
-    
-    def extract_text_from_image(self, file_content: bytes) -> str:
+
+    def iter_ocr_pdf_pages(self, file_content: Document, page_numbers: Iterable[int] = None, tier: str = None,
+                           timings: Dict[str, float] = None) -> Iterator[Tuple[int, str]]:
+        """OCR PDF pages in parallel, yielding (page_number, text) in page order."""
+        self.ensure_ready()
+        with _pdf_on_disk(file_content) as pdf_path:
+            yield from self._iter_ocr_pdf_path(pdf_path, page_numbers, tier, timings)
+
+    def _iter_ocr_pdf_path(self, pdf_path: str, page_numbers: Iterable[int] = None, tier: str = None,
+                           timings: Dict[str, float] = None) -> Iterator[Tuple[int, str]]:
+        """Pages are grouped into batches of `ocr_batch_size` that share one
+        tesseract process. Each batch rasterizes its pages one at a time and
+        at most `max_pages_in_memory` batches are in flight, so memory stays
+        bounded regardless of document length.
+        """
+        window = max(1, self.max_pages_in_memory)
+        workers = max(1, min(self.page_workers, window))
+        batch_size = max(1, self.ocr_batch_size)
+
+        if page_numbers is None:
+            page_count = pdf2image.pdfinfo_from_path(pdf_path)["Pages"]
+            page_numbers = range(1, page_count + 1)
+
+        pages = iter(page_numbers)
+
+        def submit_next():
+            batch = list(islice(pages, batch_size))
+            if batch:
+                in_flight.append((batch, pool.submit(self._ocr_pdf_batch, pdf_path, batch, tier, timings)))
+            return bool(batch)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            in_flight = deque()
+            while len(in_flight) < window and submit_next():
+                pass
+
+            while in_flight:
+                batch, future = in_flight.popleft()
+                texts = future.result()
+                submit_next()
+                for page_number, page_text in zip(batch, texts):
+                    yield page_number, page_text
+
+    def _ocr_pdf_batch(self, pdf_path: str, page_numbers: List[int], tier: str = None,
+                       timings: Dict[str, float] = None) -> List[str]:
+        """Rasterize a batch of PDF pages and OCR them in one tesseract call"""
+        with tempfile.TemporaryDirectory(prefix="ocr-pages-") as tmp:
+            paths = []
+            for page_number in page_numbers:
+                with _timed(timings, "rasterize"):
+                    images = pdf2image.convert_from_path(
+                        pdf_path, dpi=self.pdf_dpi, first_page=page_number, last_page=page_number
+                    )
+                # Preprocess image for better OCR
+                image = images[0] if images else Image.new('L', (1, 1), 255)
+                paths.append(self._save_for_ocr(self._preprocess_image(image, tier, timings), tmp, timings))
+            return self._ocr_image_files(paths, tmp, timings)
+
+    def extract_text_batch(self, images: List[Union[Image.Image, Document]], tier: str = None,
+                           timings: Dict[str, float] = None) -> List[str]:
+        """OCR many images with a single tesseract process, one text per image.
+
+        Accepts PIL images or raw image files. Tesseract reads a text file
+        listing the image paths and separates each page's output with a form
+        feed, so process start-up and language-model loading are paid once
+        per batch instead of once per image.
+        """
+        if not images:
+            return []
+        self.ensure_ready()
+        settings = self._tier_settings(tier)
+        with tempfile.TemporaryDirectory(prefix="ocr-batch-") as tmp:
+            paths = []
+            for image in images:
+                if not isinstance(image, Image.Image):
+                    image = self._load_image(image, settings, timings)
+                paths.append(self._save_for_ocr(self._preprocess_image(image, tier, timings), tmp, timings))
+            return [text.strip() for text in self._ocr_image_files(paths, tmp, timings)]
+
+    def _save_for_ocr(self, image: Image.Image, directory: str, timings: Dict[str, float] = None) -> str:
+        with _timed(timings, "encode"):
+            fd, path = tempfile.mkstemp(suffix=".png", dir=directory)
+            with os.fdopen(fd, "wb") as f:
+                # Light compression: the file only lives until tesseract has read it
+                image.save(f, format="PNG", compress_level=1)
+        return path
+
+    def _ocr_image_files(self, paths: List[str], directory: str, timings: Dict[str, float] = None) -> List[str]:
+        """Run tesseract once over a list of image files"""
+        with _timed(timings, "ocr"):
+            if len(paths) == 1:
+                texts = [pytesseract.image_to_string(paths[0], config=self.tesseract_config)]
+            else:
+                list_path = os.path.join(directory, "images.txt")
+                with open(list_path, "w") as f:
+                    f.write("\n".join(paths) + "\n")
+                output = pytesseract.image_to_string(list_path, config=self.tesseract_config)
+
+                # Tesseract ends every page with a form feed
+                texts = output.split("\f")
+                if len(texts) == len(paths) + 1 and not texts[-1].strip():
+                    texts = texts[:-1]
+                if len(texts) != len(paths):
+                    # Page boundaries got lost; fall back to one call per image
+                    texts = [pytesseract.image_to_string(path, config=self.tesseract_config) for path in paths]
+            return [text.replace("\f", "") for text in texts]
+
+    def extract_text_from_image(self, file_content: Document, tier: str = None, timings: Dict[str, float] = None) -> str:
         """Extract text from image using pytesseract with preprocessing"""
+        self.ensure_ready()
         try:
-            image = Image.open(io.BytesIO(file_content))
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
+            image = self._load_image(file_content, self._tier_settings(tier), timings)
             
             # Preprocess image for better OCR
-            processed_image = self._preprocess_image(image)
+            processed_image = self._preprocess_image(image, tier, timings)
             
-            text = pytesseract.image_to_string(
-                processed_image, 
-                config=self.tesseract_config
-            )
+            with _timed(timings, "ocr"):
+                text = pytesseract.image_to_string(
+                    processed_image, 
+                    config=self.tesseract_config
+                )
             return text.strip()
         except Exception as e:
             raise Exception(f"Error extracting text from image: {str(e)}")
+
+    def _load_image(self, file_content: Document, settings: Dict, timings: Dict[str, float] = None) -> Image.Image:
+        with _timed(timings, "decode"):
+            image = Image.open(open_document(file_content))
+            if settings["max_side"] and image.format == "JPEG":
+                # Let the JPEG decoder downscale (1/2, 1/4, 1/8) and emit grayscale
+                # directly; the result is never smaller than what we resize to below
+                original_width = image.width
+                image.draft('L', self._target_size(image, settings))
+                dpi = image.info.get("dpi")
+                if dpi and image.width != original_width:
+                    # draft() keeps the original DPI; scale it with the image so
+                    # _preprocess_image does not apply the DPI reduction twice
+                    factor = image.width / original_width
+                    image.info["dpi"] = (dpi[0] * factor, dpi[1] * factor)
+            image.load()
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+        return image
+
+    def _tier_settings(self, tier: str = None) -> Dict:
+        tier = tier or self.preprocess_tier
+        if tier not in PREPROCESS_TIERS:
+            raise ValueError(f"Unknown preprocessing tier: {tier}")
+        return PREPROCESS_TIERS[tier]
+
+    def _target_size(self, image: Image.Image, settings: Dict) -> Tuple[int, int]:
+        """Size that brings the image to the target DPI and the tier's longest-side cap"""
+        width, height = image.size
+        scale = 1.0
+
+        dpi = image.info.get("dpi")
+        # Phone cameras report a nominal 72 DPI; only trust real scanner metadata
+        if dpi and dpi[0] >= 150 and dpi[0] > self.target_dpi:
+            scale = self.target_dpi / float(dpi[0])
+
+        max_side = settings["max_side"]
+        if max_side and max(width, height) * scale > max_side:
+            scale = max_side / float(max(width, height))
+
+        return max(1, int(width * scale)), max(1, int(height * scale))
     
-    def _preprocess_image(self, image: Image.Image) -> Image.Image:
-        """Preprocess image for better OCR results"""
+    def _preprocess_image(self, image: Image.Image, tier: str = None, timings: Dict[str, float] = None) -> Image.Image:
+        """Preprocess image for better OCR results.
+
+        Stages run per the selected tier (see PREPROCESS_TIERS); the
+        "accurate" tier is the full pipeline at the original resolution.
+        """
+        settings = self._tier_settings(tier)
+
+        # Normalize resolution before the per-pixel stages
+        if settings["max_side"]:
+            with _timed(timings, "resize"):
+                size = self._target_size(image, settings)
+                if size != image.size:
+                    image = image.resize(size, Image.Resampling.BILINEAR, reducing_gap=3.0)
+
         # Convert to grayscale
-        if image.mode != 'L':
-            image = image.convert('L')
-        
-        # Enhance contrast
-        enhancer = ImageEnhance.Contrast(image)
-        image = enhancer.enhance(2.0)
+        with _timed(timings, "grayscale"):
+            if image.mode != 'L':
+                image = image.convert('L')
         
-        # Enhance sharpness
-        enhancer = ImageEnhance.Sharpness(image)
-        image = enhancer.enhance(2.0)
-        
-        # Apply slight blur to reduce noise
-        image = image.filter(ImageFilter.MedianFilter(size=3))
+        if settings["autocontrast"]:
+            with _timed(timings, "contrast"):
+                image = ImageOps.autocontrast(image, cutoff=1)
+        else:
+            # Enhance contrast
+            with _timed(timings, "contrast"):
+                enhancer = ImageEnhance.Contrast(image)
+                image = enhancer.enhance(2.0)
+        
+        if settings["sharpen"]:
+            # Enhance sharpness
+            with _timed(timings, "sharpen"):
+                enhancer = ImageEnhance.Sharpness(image)
+                image = enhancer.enhance(2.0)
+        
+        if settings["median"]:
+            # Apply slight blur to reduce noise
+            with _timed(timings, "median"):
+                image = image.filter(ImageFilter.MedianFilter(size=3))
         
         return image
     
     def parse_transactions(self, text: str) -> List[Dict]:
-        """Parse extracted text to find transactions with improved parsing"""
-        transactions = []
-        
-        if not text or not text.strip():
-            return transactions
-        
-        # Extract global date from the entire text first
-        global_date = self._extract_global_date(text)
-        
-        lines = text.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line or len(line) < 3:
-                continue
-            
-            # Extract all amounts from the line
-            amounts = self._extract_amounts(line)
-            
-            if amounts:
-                # Choose the best amount for this line
-                chosen_amount = self._choose_amount_for_line(line, amounts)
-                
-                if chosen_amount is not None:
-                    # Use global date if available, otherwise current date
-                    date = global_date or datetime.now().strftime("%Y-%m-%d")
-                    
-                    # Extract description (remove amounts and dates)
-                    description = self._clean_description(line, chosen_amount)
-                    
-                    if description and len(description.strip()) > 2:
-                        transactions.append({
-                            "date": date,
-                            "description": description.strip(),
-                            "amount": chosen_amount
-                        })
-        
-        # Remove duplicates but keep original order (don't sort by amount)
-        unique_transactions = self._remove_duplicates(transactions)
-        return unique_transactions
-    
-    def _extract_global_date(self, text: str) -> str:
-        """Extract date from the entire text (usually at bottom)"""
-        # Look for date patterns in the entire text
-        date_patterns = [
-            (re.compile(r"\b\d{4}-\d{2}-\d{2}\b"), ["%Y-%m-%d"]),
-            (re.compile(r"\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b"), ["%m/%d/%Y","%m/%d/%y","%d/%m/%Y","%d/%m/%y"]),
-            (re.compile(r"\b\d{1,2}\s+[A-Za-z]{3,9}\s+\d{4}\b"), ["%d %b %Y","%d %B %Y"]),
-            (re.compile(r"\b[A-Za-z]{3,9}\s+\d{1,2},\s*\d{4}\b"), ["%b %d, %Y","%B %d, %Y"])
-        ]
-        
-        for pattern, formats in date_patterns:
-            matches = pattern.findall(text)
-            for match in matches:
-                for fmt in formats:
-                    try:
-                        date_obj = datetime.strptime(match, fmt)
-                        return date_obj.strftime('%Y-%m-%d')
-                    except ValueError:
-                        continue
-        
-        return None
-    
-    def _extract_amounts(self, line: str) -> List[float]:
-        """Extract all amounts from a line with proper sign handling per token"""
-        amounts = []
-        lower = line.lower()
-        
-        for m in self.AMOUNT_TOKEN.finditer(line):
-            num = float(m.group("num").replace(",", ""))
-            neg = (m.group("sign") == "-") or (m.group("open") is not None) or any(w in lower for w in self.NEG_WORDS)
-            amounts.append(-num if neg else num)
-        
-        return amounts
-    
-    def _choose_amount_for_line(self, line: str, amounts: List[float]) -> float | None:
-        """Choose the best amount from a line based on context"""
-        if not amounts:
-            return None
-        
-        l = line.lower()
-        
-        # Skip lines with avoid words (subtotals, taxes, etc.)
-        if any(w in l for w in self.AVOID_WORDS):
-            return None
-        
-        # For total lines, prefer the largest amount (usually the grand total)
-        if any(w in l for w in self.TOTAL_WORDS):
-            return max(amounts, key=lambda x: abs(x))
-        
-        # For regular lines, prefer the rightmost amount (usually the item total)
-        return amounts[-1]
-    
-    def _clean_description(self, line: str, amount: float) -> str:
-        """Clean description by removing amounts and common receipt words"""
-        cleaned = line
-        val = f"{abs(amount):.2f}".replace(".", r"\.")
-        amt_rx = re.compile(
-            rf"\(?-?\s*[$€₹]?\s*\d{{1,3}}(?:,\d{{3}})*{val[len(val)-3:]}|\(?-?\s*[$€₹]?\s*{val}\)?"
-        )
-        cleaned = amt_rx.sub("", cleaned)
-
-        stop = {
-            "total","subtotal","tax","tip","amount","price","cost","receipt","invoice","bill",
-            "payment","charge","debit","credit","refund","return","discount","sale","off",
-            "usd$","usd","lb","kg","oz","g","each","per","@","x","times","grand","balance","due"
-        }
-        words = [w for w in cleaned.split() if w.lower() not in stop]
-        return " ".join(words).strip()
-    
-    def _remove_duplicates(self, transactions: List[Dict]) -> List[Dict]:
-        """Remove duplicate transactions based on description and amount"""
-        seen = set()
-        unique_transactions = []
-        
-        for transaction in transactions:
-            # Create a key based on description and amount
-            key = (transaction['description'].lower().strip(), transaction['amount'])
-            if key not in seen:
-                seen.add(key)
-                unique_transactions.append(transaction)
-        
-        return unique_transactions
+        """Parse extracted text to find transactions"""
+        return receipt_parser.parse_transactions(text)
 
 # Create a singleton instance
 ocr_service = OCRService()
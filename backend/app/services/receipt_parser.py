@@ -0,0 +1,285 @@
+import calendar
+import re
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+# Word categories for smart amount selection. Matched as substrings of the
+# lowercased line, so "subtotal" also counts as a "total" line.
+NEG_WORDS = {"refund","credit","reversal","cashback","returned","reimbursed"}
+TOTAL_WORDS = {"grand total","amount due","balance due","total"}
+AVOID_WORDS = {"subtotal","tax","tip","fee","surcharge"}
+
+# Words dropped from descriptions
+STOP_WORDS = frozenset({
+    "total","subtotal","tax","tip","amount","price","cost","receipt","invoice","bill",
+    "payment","charge","debit","credit","refund","return","discount","sale","off",
+    "usd$","usd","lb","kg","oz","g","each","per","@","x","times","grand","balance","due"
+})
+
+# Amount token with named groups; decimals are required
+AMOUNT_TOKEN = re.compile(r"""
+    (?P<open>\()?                 # (
+    (?P<sign>-)?                  # -
+    \s*
+    (?P<curr>[$€₹])?              # optional currency
+    \s*
+    (?P<num>\d{1,3}(?:,\d{3})*(?:\.\d{2})|\d+\.\d{2})  # require decimals
+    \s*
+    (?(open)\))                   # )
+""", re.VERBOSE)
+
+
+def _keyword_automaton(groups: Dict[str, set]) -> Tuple[re.Pattern, Dict[str, FrozenSet[str]]]:
+    """One pattern finding every keyword occurrence, overlapping ones included.
+
+    The lookahead makes each match zero-width, so the scan tries every
+    position once. Each keyword maps to the classes of all keywords it
+    starts with, so a longer alternative never hides a shorter one.
+    """
+    classes = {word: name for name, words in groups.items() for word in words}
+    keywords = sorted(classes, key=len, reverse=True)
+    pattern = re.compile("(?=(" + "|".join(re.escape(w) for w in keywords) + "))")
+    implied = {
+        word: frozenset(classes[other] for other in keywords if word.startswith(other))
+        for word in keywords
+    }
+    return pattern, implied
+
+
+KEYWORDS, KEYWORD_CLASSES = _keyword_automaton({"neg": NEG_WORDS, "total": TOTAL_WORDS, "avoid": AVOID_WORDS})
+
+# Global date patterns, tried in order; the first valid date wins
+ISO_DATE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+NUMERIC_DATE = re.compile(r"\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b")
+DAY_MONTH_YEAR = re.compile(r"\b\d{1,2}\s+[A-Za-z]{3,9}\s+\d{4}\b")
+MONTH_DAY_YEAR = re.compile(r"\b[A-Za-z]{3,9}\s+\d{1,2},\s*\d{4}\b")
+
+# Splitters for the matches above. The numeric layouts mirror the strptime
+# formats the parser used to try: "/" separators only, ASCII month and
+# day digits, and "%b %d, %Y" needs whitespace after the comma.
+_ISO_PARTS = re.compile(r"(\d{4})-([0-9]{2})-([0-9]{2})")
+_NUMERIC_PARTS = re.compile(r"([0-9]{1,2})/([0-9]{1,2})/(\d{2}|\d{4})")
+_DAY_MONTH_YEAR_PARTS = re.compile(r"([0-9]{1,2})\s+([A-Za-z]+)\s+(\d{4})")
+_MONTH_DAY_YEAR_PARTS = re.compile(r"([A-Za-z]+)\s+([0-9]{1,2}),\s+(\d{4})")
+
+# English month names and abbreviations, as accepted by %B and %b
+MONTHS = {
+    name.lower(): number
+    for number in range(1, 13)
+    for name in (calendar.month_name[number], calendar.month_abbr[number])
+}
+
+
+def _make_date(year: int, month: int, day: int) -> Optional[str]:
+    if not (1 <= year <= 9999 and 1 <= month <= 12):
+        return None
+    if not 1 <= day <= calendar.monthrange(year, month)[1]:
+        return None
+    return date(year, month, day).strftime('%Y-%m-%d')
+
+
+def _two_digit_year(value: str) -> int:
+    # Same pivot as %y: 69-99 are 19xx, 00-68 are 20xx
+    year = int(value)
+    return year + (1900 if year >= 69 else 2000)
+
+
+def _parse_date(match: str, pattern: re.Pattern) -> Optional[str]:
+    if pattern is ISO_DATE:
+        parts = _ISO_PARTS.fullmatch(match)
+        return parts and _make_date(int(parts[1]), int(parts[2]), int(parts[3]))
+
+    if pattern is NUMERIC_DATE:
+        parts = _NUMERIC_PARTS.fullmatch(match)
+        if not parts:
+            return None
+        first, second, year = int(parts[1]), int(parts[2]), parts[3]
+        year = int(year) if len(year) == 4 else _two_digit_year(year)
+        # Month first, then day first
+        return _make_date(year, first, second) or _make_date(year, second, first)
+
+    if pattern is DAY_MONTH_YEAR:
+        parts = _DAY_MONTH_YEAR_PARTS.fullmatch(match)
+        if not parts:
+            return None
+        day, month, year = parts[1], parts[2], parts[3]
+    else:
+        parts = _MONTH_DAY_YEAR_PARTS.fullmatch(match)
+        if not parts:
+            return None
+        month, day, year = parts[1], parts[2], parts[3]
+    month = MONTHS.get(month.lower())
+    return month and _make_date(int(year), month, int(day))
+
+
+DATE_PATTERNS = (ISO_DATE, NUMERIC_DATE, DAY_MONTH_YEAR, MONTH_DAY_YEAR)
+
+
+def _first_date(text: str, pattern: re.Pattern) -> Optional[str]:
+    for match in pattern.findall(text):
+        parsed = _parse_date(match, pattern)
+        if parsed:
+            return parsed
+    return None
+
+
+def extract_global_date(text: str) -> Optional[str]:
+    """Extract date from the entire text (usually at bottom)"""
+    for pattern in DATE_PATTERNS:
+        parsed = _first_date(text, pattern)
+        if parsed:
+            return parsed
+    return None
+
+
+class DocumentDate:
+    """extract_global_date over a document that arrives in pieces (e.g. pages).
+
+    `value` is the date extract_global_date would return for the pieces fed
+    so far, apart from dates split across two pieces.
+    """
+
+    def __init__(self):
+        self._found: List[Optional[str]] = [None] * len(DATE_PATTERNS)
+
+    def feed(self, text: str) -> Optional[str]:
+        for i, pattern in enumerate(DATE_PATTERNS):
+            if self._found[i] is None:
+                self._found[i] = _first_date(text, pattern)
+        return self.value
+
+    @property
+    def value(self) -> Optional[str]:
+        return next((found for found in self._found if found), None)
+
+
+# Amounts are stripped from descriptions with the equivalent of
+#   \(?-?\s*[$€₹]?\s*\d{1,3}(?:,\d{3})*.CC | \(?-?\s*[$€₹]?\s*V\)?
+# where V is the chosen amount ("12.34") and CC its cents. Only the first
+# branch is a regex (one per cents value); the literal branch is found with
+# str.find, so no pattern is compiled per amount.
+AMOUNT_CURRENCIES = "$€₹"
+
+
+@lru_cache(maxsize=None)
+def _cents_pattern(cents: str) -> re.Pattern:
+    return re.compile(rf"\(?-?\s*[$€₹]?\s*\d{{1,3}}(?:,\d{{3}})*.{cents}")
+
+
+def _amount_prefix_start(line: str, end: int, lo: int) -> int:
+    """Leftmost position >= lo from which the optional "(-  $ " prefix runs up to end"""
+    start = end
+    while start > lo and line[start - 1].isspace():
+        start -= 1
+    if start > lo and line[start - 1] in AMOUNT_CURRENCIES:
+        start -= 1
+        while start > lo and line[start - 1].isspace():
+            start -= 1
+    if start > lo and line[start - 1] == "-":
+        start -= 1
+    if start > lo and line[start - 1] == "(":
+        start -= 1
+    return start
+
+
+def _strip_amount(line: str, amount: float) -> str:
+    literal = f"{abs(amount):.2f}"
+    cents_rx = _cents_pattern(literal[-2:])
+    pieces = []
+    pos = 0
+    while True:
+        formatted = cents_rx.search(line, pos)
+        at = line.find(literal, pos)
+        if formatted is None and at == -1:
+            break
+        # Leftmost match wins; the formatted branch goes first on a tie
+        start = _amount_prefix_start(line, at, pos) if at != -1 else None
+        if formatted is not None and (start is None or formatted.start() <= start):
+            start, end = formatted.span()
+        else:
+            end = at + len(literal)
+            if line.startswith(")", end):
+                end += 1
+        pieces.append(line[pos:start])
+        pos = end
+    pieces.append(line[pos:])
+    return "".join(pieces)
+
+
+def clean_description(line: str, amount: float) -> str:
+    """Clean description by removing amounts and common receipt words"""
+    words = [w for w in _strip_amount(line, amount).split() if w.lower() not in STOP_WORDS]
+    return " ".join(words).strip()
+
+
+def parse_line(line: str) -> Optional[Tuple[str, float]]:
+    """(description, amount) for a stripped line, or None if it holds no transaction"""
+    tokens = AMOUNT_TOKEN.findall(line)
+    if not tokens:
+        return None
+
+    found = set()
+    for keyword in KEYWORDS.findall(line.lower()):
+        found |= KEYWORD_CLASSES[keyword]
+    # Skip lines with avoid words (subtotals, taxes, etc.)
+    if "avoid" in found:
+        return None
+
+    negative_line = "neg" in found
+    amounts = []
+    for open_paren, sign, _curr, num in tokens:
+        num = float(num.replace(",", ""))
+        neg = sign == "-" or open_paren != "" or negative_line
+        amounts.append(-num if neg else num)
+
+    # Total lines take the largest amount (usually the grand total),
+    # regular lines the rightmost one (usually the item total)
+    amount = max(amounts, key=abs) if "total" in found else amounts[-1]
+
+    description = clean_description(line, amount).strip()
+    if len(description) <= 2:
+        return None
+    return description, amount
+
+
+def parse_transactions(text: str, default_date: Optional[str] = None) -> List[Dict]:
+    """Parse extracted text into transactions, in order of appearance.
+
+    Every transaction gets the first date found anywhere in the text, or
+    `default_date` (today unless given) when there is none. Repeated
+    description/amount pairs are dropped.
+    """
+    if not text or not text.strip():
+        return []
+
+    txn_date = extract_global_date(text) or default_date or today()
+    return parse_lines(text, txn_date, set())
+
+
+def parse_lines(text: str, txn_date: str, seen: Set[Tuple[str, float]]) -> List[Dict]:
+    """Transactions on the lines of `text`, all dated `txn_date`.
+
+    `seen` holds the (description, amount) keys already returned and is
+    updated in place, so a document can be parsed piece by piece (e.g. per
+    PDF page) with the same result as parsing its joined text.
+    """
+    transactions = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if len(line) < 3:
+            continue
+        parsed = parse_line(line)
+        if parsed is None:
+            continue
+        description, amount = parsed
+        key = (description.lower(), amount)
+        if key in seen:
+            continue
+        seen.add(key)
+        transactions.append({"date": txn_date, "description": description, "amount": amount})
+    return transactions
+
+
+def today() -> str:
+    return datetime.now().strftime("%Y-%m-%d")
@@ -0,0 +1,59 @@
+import re
+from typing import List
+
+from sqlalchemy import column, func, literal_column, or_, table
+
+from app.models import Transaction
+
+# Longer queries are cut to their first terms
+MAX_TERMS = 8
+
+_TERM = re.compile(r"\w+")
+
+# The FTS5 table created by app.db.ensure_search_index
+_FTS = table("transactions_fts", column("rowid"))
+_FTS_TABLE = literal_column("transactions_fts")
+# bm25 weights per FTS column: description counts, the owner token does not
+_BM25 = literal_column("bm25(transactions_fts, 1.0, 0.0)")
+
+# Must match the expression of the PostgreSQL GIN index to use it
+_TSVECTOR = func.to_tsvector(literal_column("'simple'"), Transaction.description)
+
+
+def search_terms(q: str) -> List[str]:
+    """Words of a search box query, lowercased; punctuation and operators are dropped"""
+    return _TERM.findall(q.lower())[:MAX_TERMS]
+
+
+def fts5_match(user_id: int, terms: List[str]) -> str:
+    """FTS5 query: every term as a prefix of a description word, within the user's rows"""
+    phrases = " ".join(f'"{term}"*' for term in terms)
+    return f"owner : u{user_id} AND description : ({phrases})"
+
+
+def tsquery(terms: List[str]) -> str:
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def apply_search(query, backend: str, user_id: int, terms: List[str]):
+    """Restrict a Transaction query to matches of all terms (prefix matching)
+    and order it by relevance, then newest first.
+    """
+    if backend == "fts5":
+        query = query.join(_FTS, _FTS.c.rowid == Transaction.id)
+        query = query.filter(_FTS_TABLE.op("MATCH")(fts5_match(user_id, terms)))
+        # bm25 is lower for better matches
+        return query.order_by(_BM25, Transaction.date.desc(), Transaction.id.desc())
+    if backend == "postgres":
+        ts_query = func.to_tsquery(literal_column("'simple'"), tsquery(terms))
+        query = query.filter(_TSVECTOR.op("@@")(ts_query))
+        return query.order_by(func.ts_rank(_TSVECTOR, ts_query).desc(), Transaction.date.desc(), Transaction.id.desc())
+
+    # No full-text index: each term must start a word of the description
+    for term in terms:
+        term = term.replace("_", "\\_")
+        query = query.filter(or_(
+            Transaction.description.ilike(f"{term}%", escape="\\"),
+            Transaction.description.ilike(f"% {term}%", escape="\\"),
+        ))
+    return query.order_by(Transaction.date.desc(), Transaction.id.desc())
@@ -0,0 +1,251 @@
+import codecs
+import csv
+import os
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Statement rows categorized and inserted together
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))
+MAX_IMPORT_SIZE = int(os.getenv("IMPORT_MAX_SIZE", 100 * 1024 * 1024))
+# Rows with errors reported one by one; later ones are only counted
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", 100))
+IMPORT_READ_SIZE = 64 * 1024
+
+IMPORT_FORMATS = {".csv": "csv", ".txt": "csv", ".ofx": "ofx", ".qfx": "ofx"}
+
+# Header names tried, in order, for each field the mapping leaves out
+DEFAULT_COLUMNS = {
+    "date": ("date", "transaction date", "posted date", "posting date", "booking date", "value date"),
+    "description": ("description", "payee", "name", "merchant", "details", "narrative", "memo"),
+    "amount": ("amount", "transaction amount"),
+    "debit": ("debit", "withdrawal", "withdrawals", "money out", "paid out"),
+    "credit": ("credit", "deposit", "deposits", "money in", "paid in"),
+    "category": ("category",),
+}
+
+# Fits Numeric(12, 2)
+MAX_AMOUNT = Decimal("9999999999.99")
+MAX_CATEGORY_LENGTH = 100
+_CENTS = Decimal("0.01")
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+class StatementError(ValueError):
+    """The file or the column mapping cannot be read at all (as opposed to one bad row)"""
+
+
+def parse_amount(value: str, decimal: str = ".") -> Decimal:
+    """Bank-formatted amount: currency signs, thousands separators, "(12.50)"
+    and trailing minus signs are accepted.
+    """
+    text = value.strip()
+    negative = False
+    if text.startswith("(") and text.endswith(")"):
+        negative, text = True, text[1:-1]
+    elif text.endswith("-"):
+        negative, text = True, text[:-1]
+    text = re.sub(r"[^0-9" + re.escape(decimal) + "-]", "", text)
+    if decimal != ".":
+        text = text.replace(decimal, ".")
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value}")
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount: {value}")
+    amount = (-amount if negative else amount).quantize(_CENTS)
+    if abs(amount) > MAX_AMOUNT:
+        raise ValueError(f"Amount out of range: {value}")
+    return amount
+
+
+class StatementReader:
+    """Transactions of a CSV or OFX bank statement, read incrementally from a
+    binary file, so memory does not grow with the statement.
+
+    Iterating yields (row, record, error) per transaction: `row` counts from 1,
+    and either `record` ({date, description, amount, category}) or `error`
+    (a message) is None. Dates are left as written unless `date_format` is
+    given; OFX dates are parsed. Amounts are spending-positive, as in the
+    rest of the app: OFX and debit/credit columns are converted, and a
+    signed amount column is negated with `negate=True`.
+    """
+
+    def __init__(self, stream, fmt: str, columns: Optional[Dict[str, str]] = None,
+                 has_header: bool = True, delimiter: Optional[str] = None,
+                 date_format: Optional[str] = None, decimal: str = ".",
+                 negate: bool = False, encoding: str = "utf-8-sig"):
+        if fmt not in ("csv", "ofx"):
+            raise StatementError(f"Unsupported statement format: {fmt}")
+        self.fmt = fmt
+        self.date_format = date_format
+        self.decimal = decimal
+        self.negate = negate
+        self._text = codecs.getreader(encoding)(stream, errors="replace")
+        self._rows = None
+        if fmt == "csv":
+            # The header is read now so a bad mapping fails before anything is imported
+            self._open_csv(columns or {}, has_header, delimiter)
+
+    def __iter__(self) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+        if self.fmt == "ofx":
+            return self._iter_ofx()
+        return self._iter_csv()
+
+    def _open_csv(self, columns: Dict[str, str], has_header: bool, delimiter: Optional[str]) -> None:
+        first = self._text.readline()
+        if not first.strip():
+            raise StatementError("The statement is empty")
+        if delimiter is None:
+            # The most frequent candidate in the first line
+            delimiter = max(",;\t|", key=first.count)
+
+        # Readlines so the first line, already consumed, is parsed too
+        lines = _chain([first], self._text)
+        self._rows = csv.reader(lines, delimiter=delimiter)
+        if has_header:
+            header = [name.strip().lower() for name in next(self._rows)]
+        else:
+            header = None
+
+        self._index: Dict[str, Optional[int]] = {}
+        for field, defaults in DEFAULT_COLUMNS.items():
+            wanted = columns.get(field)
+            self._index[field] = _column_index(field, wanted, defaults, header)
+        if self._index["date"] is None or self._index["description"] is None:
+            raise StatementError("Map the date and description columns")
+        if self._index["amount"] is None and self._index["debit"] is None and self._index["credit"] is None:
+            raise StatementError("Map an amount column, or debit and credit columns")
+        self._width = max(i for i in self._index.values() if i is not None) + 1
+
+    def _iter_csv(self):
+        index = self._index
+        row_number = 0
+        for values in self._rows:
+            if not any(v.strip() for v in values):
+                continue
+            row_number += 1
+            if len(values) < self._width:
+                yield row_number, None, f"Expected {self._width} columns, found {len(values)}"
+                continue
+            try:
+                yield row_number, self._csv_record(values, index), None
+            except ValueError as e:
+                yield row_number, None, str(e)
+
+    def _csv_record(self, values: List[str], index: Dict[str, Optional[int]]) -> Dict:
+        if index["amount"] is not None and values[index["amount"]].strip():
+            amount = parse_amount(values[index["amount"]], self.decimal)
+            if self.negate:
+                amount = -amount
+        else:
+            # Debit and credit columns: money out is spending
+            amount = Decimal("0.00")
+            found = False
+            for field, sign in (("debit", 1), ("credit", -1)):
+                value = values[index[field]].strip() if index[field] is not None else ""
+                if value:
+                    amount += sign * abs(parse_amount(value, self.decimal))
+                    found = True
+            if not found:
+                raise ValueError("Missing amount")
+
+        category = values[index["category"]].strip() if index["category"] is not None else ""
+        return self._record(values[index["date"]].strip(), values[index["description"]], amount, category)
+
+    def _record(self, raw_date, description: str, amount: Decimal, category: str = "") -> Dict:
+        if not raw_date:
+            raise ValueError("Missing date")
+        if self.date_format and isinstance(raw_date, str):
+            try:
+                raw_date = datetime.strptime(raw_date, self.date_format).date()
+            except ValueError:
+                raise ValueError(f"Invalid date format: {raw_date}")
+        description = " ".join(description.split())
+        if not description:
+            raise ValueError("Missing description")
+        return {
+            "date": raw_date,
+            "description": description,
+            "amount": amount,
+            "category": category[:MAX_CATEGORY_LENGTH] or None,
+        }
+
+    def _iter_ofx(self):
+        # OFX 1.x is SGML (leaf elements are not closed) and 2.x is XML; both
+        # are scanned tag by tag, keeping only the open <STMTTRN> in memory.
+        row_number = 0
+        current = None
+        for closing, tag, value in _ofx_tags(self._text):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if current is not None:
+                    row_number += 1
+                    yield (row_number, *self._ofx_record(current))
+                current = None if closing else {}
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+        if current is not None:
+            row_number += 1
+            yield (row_number, *self._ofx_record(current))
+
+    def _ofx_record(self, fields: Dict[str, str]) -> Tuple[Optional[Dict], Optional[str]]:
+        try:
+            posted = fields.get("DTPOSTED", "")
+            try:
+                txn_date = date(int(posted[:4]), int(posted[4:6]), int(posted[6:8])) if posted else ""
+            except ValueError:
+                raise ValueError(f"Invalid date format: {posted}")
+            if not fields.get("TRNAMT"):
+                raise ValueError("Missing amount")
+            # OFX amounts are negative for money out
+            amount = -parse_amount(fields["TRNAMT"])
+            description = _unescape(fields.get("NAME") or fields.get("MEMO") or "")
+            return self._record(txn_date, description, amount), None
+        except ValueError as e:
+            return None, str(e)
+
+
+def _column_index(field: str, wanted: Optional[str], defaults: Tuple[str, ...],
+                  header: Optional[List[str]]) -> Optional[int]:
+    """Position of a mapped column: a header name, or a 0-based index without a header"""
+    if header is None:
+        if wanted is None:
+            return None
+        if not wanted.isdigit():
+            raise StatementError(f"Without a header, map {field} to a column number")
+        return int(wanted)
+    if wanted is not None:
+        wanted = wanted.strip().lower()
+        if wanted not in header:
+            raise StatementError(f"Column not found for {field}: {wanted}")
+        return header.index(wanted)
+    return next((header.index(name) for name in defaults if name in header), None)
+
+
+def _chain(first: List[str], rest) -> Iterator[str]:
+    yield from first
+    yield from rest
+
+
+def _ofx_tags(text) -> Iterator[Tuple[bool, str, str]]:
+    """(closing, tag, text after the tag) for each tag, reading in chunks"""
+    buffer = ""
+    for chunk in iter(lambda: text.read(IMPORT_READ_SIZE), ""):
+        buffer += chunk
+        # The last tag may continue in the next chunk
+        end = buffer.rfind("<")
+        if end <= 0:
+            continue
+        for match in _OFX_TAG.finditer(buffer, 0, end):
+            yield match.group(1) == "/", match.group(2), match.group(3)
+        buffer = buffer[end:]
+    for match in _OFX_TAG.finditer(buffer):
+        yield match.group(1) == "/", match.group(2), match.group(3)
+
+
+def _unescape(value: str) -> str:
+    return value.replace("&lt;", "<").replace("&gt;", ">").replace("&amp;", "&")
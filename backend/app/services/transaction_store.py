@@ -0,0 +1,134 @@
+import hashlib
+import os
+from collections import Counter
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from app.models import Transaction, date_buckets
+
+# Rows per executemany() in bulk inserts
+BATCH_INSERT_CHUNK_SIZE = int(os.getenv("BATCH_INSERT_CHUNK_SIZE", 500))
+
+_TABLE = Transaction.__table__
+_CENTS = Decimal("0.01")
+
+
+def add_fingerprints(rows: Iterable[Dict], seen: Optional[Counter] = None) -> None:
+    """Set each row's fingerprint: a hash of user, date, amount, description
+    (case and spacing folded) and source.
+
+    Identical rows within one save are told apart by their occurrence number
+    (two equal coffees on a receipt are two purchases), so saving the same
+    items again reproduces the same fingerprints and inserts nothing. Pass
+    the same `seen` for rows saved in several calls as one batch.
+    """
+    seen = Counter() if seen is None else seen
+    for row in rows:
+        amount = Decimal(str(row["amount"])).quantize(_CENTS)
+        description = " ".join(row["description"].casefold().split())
+        key = hashlib.sha256(
+            f"{row['user_id']}|{row['date'].isoformat()}|{amount}|{description}|{row.get('source')}".encode()
+        ).digest()
+        row["fingerprint"] = hashlib.sha256(key + str(seen[key]).encode()).hexdigest()
+        seen[key] += 1
+
+
+def _insert_statement(dialect_name: str):
+    # Rows whose fingerprint is already stored are skipped, not errors
+    if dialect_name == "sqlite":
+        return sqlite.insert(_TABLE).on_conflict_do_nothing(index_elements=["fingerprint"])
+    if dialect_name == "postgresql":
+        return postgresql.insert(_TABLE).on_conflict_do_nothing(index_elements=["fingerprint"])
+    return insert(_TABLE)
+
+
+def insert_transactions(db: Session, rows: List[Dict], chunk_size: Optional[int] = None) -> List[Row]:
+    """Insert transaction rows with set-based INSERTs and return the ones stored.
+
+    Each chunk is one executemany() with RETURNING, which SQLAlchemy sends
+    as multi-row INSERT ... VALUES statements, so no per-row SELECT is
+    needed to learn the ids. Rows with a fingerprint that is already stored
+    are skipped by ON CONFLICT DO NOTHING and are not returned (see
+    find_by_fingerprint). The returned rows are plain result rows in input
+    order, not ORM objects, so committing does not expire them.
+    Nothing is committed here: the caller owns the transaction.
+    """
+    # RETURNING order is unspecified, but ids are assigned in VALUES order, so
+    # rows are sorted by id. (sort_by_parameter_order would do this for us but
+    # makes SQLite fall back to one INSERT per row.)
+    chunk_size = chunk_size or BATCH_INSERT_CHUNK_SIZE
+    dialect = db.get_bind().dialect
+    stmt = _insert_statement(dialect.name)
+    # One date_buckets() per row rather than three column default calls
+    for row in rows:
+        if "year_month" not in row:
+            row.update(date_buckets(row["date"]))
+
+    inserted: List[Row] = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        if dialect.insert_returning:
+            inserted.extend(sorted(db.execute(stmt.returning(*_TABLE.c), chunk).all(), key=lambda r: r.id))
+        else:
+            # No RETURNING (e.g. SQLite < 3.35): ids from the cursor, rows in one SELECT
+            results = [db.execute(stmt, row) for row in chunk]
+            ids = [result.inserted_primary_key[0] for result in results if result.rowcount]
+            stored = {r.id: r for r in db.execute(select(_TABLE).where(_TABLE.c.id.in_(ids)))}
+            inserted.extend(stored[i] for i in ids)
+    return inserted
+
+
+def find_by_fingerprint(db: Session, fingerprints: List[str], chunk_size: Optional[int] = None) -> Dict[str, Row]:
+    """Stored rows for the given fingerprints, by fingerprint (one indexed lookup per chunk)"""
+    chunk_size = chunk_size or BATCH_INSERT_CHUNK_SIZE
+    found: Dict[str, Row] = {}
+    for start in range(0, len(fingerprints), chunk_size):
+        chunk = fingerprints[start:start + chunk_size]
+        for row in db.execute(select(_TABLE).where(_TABLE.c.fingerprint.in_(chunk))):
+            found[row.fingerprint] = row
+    return found
+
+
+def backfill_fingerprints(bind) -> int:
+    """Fingerprint rows stored before the column existed, oldest first, so
+    existing duplicates get increasing occurrence numbers rather than clash
+    in the unique index. Returns the number of rows updated.
+    """
+    columns = [_TABLE.c.id, _TABLE.c.user_id, _TABLE.c.date, _TABLE.c.amount, _TABLE.c.description, _TABLE.c.source]
+    seen: Counter = Counter()
+    updated = 0
+    with bind.begin() as conn:
+        rows = conn.execute(select(*columns).where(_TABLE.c.fingerprint.is_(None)).order_by(_TABLE.c.id)).mappings().all()
+        for start in range(0, len(rows), BATCH_INSERT_CHUNK_SIZE):
+            chunk = [dict(r) for r in rows[start:start + BATCH_INSERT_CHUNK_SIZE]]
+            add_fingerprints(chunk, seen)
+            conn.execute(
+                _TABLE.update().where(_TABLE.c.id == bindparam("row_id")).values(fingerprint=bindparam("fp")),
+                [{"row_id": r["id"], "fp": r["fingerprint"]} for r in chunk],
+            )
+            updated += len(chunk)
+    return updated
+
+
+def backfill_date_buckets(bind) -> int:
+    """Fill year, year_month and year_week of rows stored before the columns
+    existed. Returns the number of rows updated.
+    """
+    # Bound names must differ from the column names in an UPDATE
+    values = {name: bindparam(f"new_{name}") for name in ("year", "year_month", "year_week")}
+    updated = 0
+    with bind.begin() as conn:
+        rows = conn.execute(select(_TABLE.c.id, _TABLE.c.date).where(_TABLE.c.year_month.is_(None))).all()
+        for start in range(0, len(rows), BATCH_INSERT_CHUNK_SIZE):
+            chunk = rows[start:start + BATCH_INSERT_CHUNK_SIZE]
+            conn.execute(
+                _TABLE.update().where(_TABLE.c.id == bindparam("row_id")).values(values),
+                [{"row_id": r.id, **{f"new_{k}": v for k, v in date_buckets(r.date).items()}} for r in chunk],
+            )
+            updated += len(chunk)
+    return updated
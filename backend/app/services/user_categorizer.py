@@ -0,0 +1,213 @@
+import math
+import os
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.db import ReadSessionLocal
+from app.models import Transaction
+from app.services.categorizer import _normalize, suggest_categories
+
+UNCATEGORIZED = "Uncategorized"
+
+
+class UserCategoryModel:
+    """Categories learned from one user's saved transactions.
+
+    A description saved before gets the category it was last saved with
+    (so corrections stick); otherwise a multinomial naive Bayes over its
+    tokens decides, provided it is confident enough. All state is counts,
+    so learning and forgetting a transaction are O(tokens).
+    """
+
+    def __init__(self):
+        self.examples = 0
+        self.category_docs: Counter = Counter()
+        self.category_tokens: Counter = Counter()
+        # token -> {category: count}; inference only touches the tokens it sees
+        self.token_counts: Dict[str, Counter] = {}
+        self.exact: Dict[str, Counter] = {}
+        self.latest: Dict[str, str] = {}
+
+    def learn(self, description: str, category: str) -> None:
+        desc = _normalize(description)
+        if not desc:
+            return
+        self.examples += 1
+        self.category_docs[category] += 1
+        for token in desc.split():
+            self.token_counts.setdefault(token, Counter())[category] += 1
+            self.category_tokens[category] += 1
+        self.exact.setdefault(desc, Counter())[category] += 1
+        self.latest[desc] = category
+
+    def forget(self, description: str, category: str) -> None:
+        desc = _normalize(description)
+        seen = self.exact.get(desc)
+        if not desc or not seen or not seen[category]:
+            return
+        self.examples -= 1
+        _decrement(self.category_docs, category)
+        for token in desc.split():
+            counts = self.token_counts.get(token)
+            if counts is not None:
+                _decrement(counts, category)
+                if not counts:
+                    del self.token_counts[token]
+            _decrement(self.category_tokens, category)
+        _decrement(seen, category)
+        if not seen:
+            del self.exact[desc]
+            del self.latest[desc]
+        elif self.latest[desc] == category and not seen[category]:
+            self.latest[desc] = seen.most_common(1)[0][0]
+
+    def predict(self, description: str, min_confidence: float) -> Optional[str]:
+        desc = _normalize(description)
+        if not desc or not self.examples:
+            return None
+        if desc in self.latest:
+            return self.latest[desc]
+
+        tokens = [t for t in desc.split() if t in self.token_counts]
+        if not tokens:
+            return None
+        vocabulary = len(self.token_counts)
+        log_probs = {}
+        for category, docs in self.category_docs.items():
+            denominator = math.log(self.category_tokens[category] + vocabulary)
+            score = math.log(docs / self.examples)
+            for token in tokens:
+                score += math.log(self.token_counts[token][category] + 1) - denominator
+            log_probs[category] = score
+
+        # ties broken by lexicographic order, as in the rule engine
+        best, best_score = max(log_probs.items(), key=lambda x: (x[1], x[0]))
+        confidence = 1.0 / sum(math.exp(score - best_score) for score in log_probs.values())
+        return best if confidence >= min_confidence else None
+
+
+def _decrement(counter: Counter, key: str) -> None:
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
+
+
+class UserCategorizer:
+    """Per-user category models in a bounded LRU, falling back to the rules.
+
+    A user's model is trained from their most recent `max_history`
+    categorized transactions the first time it is needed, then kept up to
+    date by learn/forget as transactions are written, so writes never
+    trigger a rescan.
+    """
+
+    def __init__(self, max_users: Optional[int] = None, max_history: Optional[int] = None,
+                 min_confidence: Optional[float] = None):
+        self.max_users = max_users or int(os.getenv("USER_CATEGORIZER_MAX_USERS", 256))
+        self.max_history = max_history or int(os.getenv("USER_CATEGORIZER_MAX_HISTORY", 5000))
+        self.min_confidence = min_confidence or float(os.getenv("USER_CATEGORIZER_MIN_CONFIDENCE", 0.6))
+        self.enabled = os.getenv("USER_CATEGORIZER_ENABLED", "True").lower() == "true"
+        self._models: "OrderedDict[int, UserCategoryModel]" = OrderedDict()
+        # user_id -> writes seen while that user's model was being loaded
+        self._loading: Dict[int, int] = {}
+        self._lock = threading.RLock()
+
+    def suggest_many(self, user_id: Optional[int], descriptions: List[str]) -> List[str]:
+        """Learned category for each of the user's descriptions, else the rule-based one"""
+        learned: List[Optional[str]] = [None] * len(descriptions)
+        if user_id is not None and self.enabled and descriptions:
+            model = self.load(user_id)
+            with self._lock:
+                learned = [model.predict(d, self.min_confidence) for d in descriptions]
+        open_indexes = [i for i, category in enumerate(learned) if not category]
+        for i, category in zip(open_indexes, suggest_categories(descriptions[i] for i in open_indexes)):
+            learned[i] = category
+        return learned
+
+    def load(self, user_id: int) -> UserCategoryModel:
+        """The user's model, training it from the database if it is not cached.
+        Call from a worker thread (it may query the database).
+        """
+        with self._lock:
+            model = self._models.get(user_id)
+            if model is not None:
+                self._models.move_to_end(user_id)
+                return model
+            writes_before = self._loading.setdefault(user_id, 0)
+
+        db = ReadSessionLocal()
+        try:
+            rows = (
+                db.query(Transaction.description, Transaction.category)
+                .filter(Transaction.user_id == user_id)
+                .filter(Transaction.category.isnot(None), Transaction.category != UNCATEGORIZED)
+                .order_by(Transaction.id.desc())
+                .limit(self.max_history)
+                .all()
+            )
+        finally:
+            db.close()
+
+        model = UserCategoryModel()
+        # Oldest first, so the latest category of a repeated description wins
+        for description, category in reversed(rows):
+            model.learn(description, category)
+
+        with self._lock:
+            # Another thread may have loaded (and updated) it meanwhile
+            existing = self._models.get(user_id)
+            if existing is not None:
+                return existing
+            if self._loading.pop(user_id, 0) != writes_before:
+                # A write raced the query; serve this model once but reload next time
+                return model
+            self._models[user_id] = model
+            while len(self._models) > self.max_users:
+                self._models.popitem(last=False)
+        return model
+
+    def learn(self, user_id: int, items: Iterable[Tuple[str, Optional[str]]]) -> None:
+        """Record saved (description, category) pairs in the user's model, if loaded"""
+        with self._lock:
+            model = self._models.get(user_id)
+            if model is None:
+                # Not cached: the next load reads these rows from the database
+                self._note_write(user_id)
+                return
+            for description, category in items:
+                if category and category != UNCATEGORIZED:
+                    model.learn(description, category)
+
+    def forget(self, user_id: int, items: Iterable[Tuple[str, Optional[str]]]) -> None:
+        """Undo learn() for deleted transactions"""
+        with self._lock:
+            model = self._models.get(user_id)
+            if model is None:
+                self._note_write(user_id)
+                return
+            for description, category in items:
+                if category and category != UNCATEGORIZED:
+                    model.forget(description, category)
+
+    def drop(self, user_id: int) -> None:
+        with self._lock:
+            self._models.pop(user_id, None)
+            self._note_write(user_id)
+
+    def _note_write(self, user_id: int) -> None:
+        if user_id in self._loading:
+            self._loading[user_id] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "users_loaded": len(self._models),
+                "max_users": self.max_users,
+                "examples": sum(m.examples for m in self._models.values()),
+            }
+
+
+# Create a singleton instance
+user_categorizer = UserCategorizer()
@@ -0,0 +1,31 @@
+"""Wall time of each startup phase, exposed at GET /health/startup.
+
+Phases: "import" (loading app.main and the route modules), "db" (schema
+checks in init_db) and "ocr_probe" (importing the OCR libraries and
+locating tesseract/poppler, done on first OCR use unless OCR_EAGER_INIT).
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+# Taken when app.main starts importing; app.main imports this module first
+IMPORT_STARTED = time.perf_counter()
+
+_phases: Dict[str, float] = {}
+
+
+def record(phase: str, seconds: float) -> None:
+    _phases[phase] = round(seconds, 4)
+
+
+@contextmanager
+def timed_phase(phase: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - start)
+
+
+def timings() -> Dict[str, float]:
+    return dict(_phases)
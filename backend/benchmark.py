@@ -0,0 +1,1108 @@
+"""Ad-hoc performance checks for the backend.
+
+Run from the backend directory, e.g.:
+    python benchmark.py pdf-ocr statement.pdf --max-pages-in-memory 2
+"""
+import argparse
+import resource
+import sys
+import time
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process and its reaped children, in MB"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return (usage + children) / scale
+
+
+def bench_pdf_ocr(args):
+    from app.services.ocr_service import OCRService
+
+    service = OCRService()
+    if args.workers:
+        service.page_workers = args.workers
+    if args.max_pages_in_memory:
+        service.max_pages_in_memory = args.max_pages_in_memory
+
+    with open(args.pdf, "rb") as f:
+        content = f.read()
+
+    start = time.perf_counter()
+    pages = sum(1 for _ in service.iter_ocr_pdf_pages(content))
+    elapsed = time.perf_counter() - start
+
+    print(f"pages:               {pages}")
+    print(f"workers:             {service.page_workers}")
+    print(f"max pages in memory: {service.max_pages_in_memory}")
+    print(f"elapsed:             {elapsed:.2f}s")
+    print(f"pages/sec:           {pages / elapsed:.2f}")
+    print(f"peak RSS:            {peak_rss_mb():.1f} MB")
+
+
+def bench_ocr_cache(args):
+    import os
+    from app.services.ocr_jobs import process_document
+    from app.services.ocr_cache import ocr_cache
+
+    with open(args.file, "rb") as f:
+        content = f.read()
+    ext = os.path.splitext(args.file.lower())[1]
+
+    ocr_cache.invalidate()
+    for label in ("cold", "warm (disk)", "warm (hot tier)"):
+        if label == "warm (disk)":
+            ocr_cache._hot.clear()
+        start = time.perf_counter()
+        process_document(content, ext)
+        print(f"{label:16} {(time.perf_counter() - start) * 1000:9.2f} ms")
+    print(ocr_cache.stats())
+
+
+def bench_preprocess(args):
+    import difflib
+    import glob
+    import os
+    from app.services.ocr_service import OCRService, PREPROCESS_TIERS
+
+    service = OCRService()
+    images = sorted(
+        path for path in glob.glob(os.path.join(args.corpus, "*"))
+        if os.path.splitext(path.lower())[1] in (".png", ".jpg", ".jpeg")
+    )
+    if not images:
+        sys.exit(f"No images found in {args.corpus}")
+
+    # Ground truth, if present, lives next to each image as <name>.txt
+    print(f"{'tier':10} {'ms/image':>10} {'accuracy':>9}  slowest stages")
+    for tier in PREPROCESS_TIERS:
+        elapsed, scores, stages = 0.0, [], {}
+        for path in images:
+            with open(path, "rb") as f:
+                content = f.read()
+            start = time.perf_counter()
+            text = service.extract_text_from_image(content, tier, stages)
+            elapsed += time.perf_counter() - start
+
+            truth_path = os.path.splitext(path)[0] + ".txt"
+            if os.path.exists(truth_path):
+                with open(truth_path, encoding="utf-8") as f:
+                    scores.append(difflib.SequenceMatcher(None, f.read().strip(), text).ratio())
+
+        accuracy = f"{sum(scores) / len(scores):.3f}" if scores else "n/a"
+        slowest = sorted(stages.items(), key=lambda kv: -kv[1])[:3]
+        per_stage = ", ".join(f"{k}={v * 1000 / len(images):.0f}ms" for k, v in slowest)
+        print(f"{tier:10} {elapsed * 1000 / len(images):10.1f} {accuracy:>9}  {per_stage}")
+
+
+def bench_ocr_batch(args):
+    import glob
+    import os
+    from app.services.ocr_service import OCRService
+
+    service = OCRService()
+    paths = sorted(
+        path for path in glob.glob(os.path.join(args.corpus, "*"))
+        if os.path.splitext(path.lower())[1] in (".png", ".jpg", ".jpeg")
+    )
+    if not paths:
+        sys.exit(f"No images found in {args.corpus}")
+    contents = []
+    for path in paths:
+        with open(path, "rb") as f:
+            contents.append(f.read())
+
+    start = time.perf_counter()
+    for content in contents:
+        service.extract_text_from_image(content, args.tier)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(0, len(contents), args.batch_size):
+        service.extract_text_batch(contents[i:i + args.batch_size], args.tier)
+    batched = time.perf_counter() - start
+
+    print(f"images:           {len(contents)}")
+    print(f"one call each:    {len(contents) / single:.2f} images/sec")
+    print(f"batches of {args.batch_size:<3}:   {len(contents) / batched:.2f} images/sec")
+
+
+def bench_pdf_text(args):
+    import pdfplumber
+    from app.services.ocr_service import OCRService
+
+    service = OCRService()
+
+    start = time.perf_counter()
+    with pdfplumber.open(args.pdf) as pdf:
+        pages = len([page.extract_text() for page in pdf.pages])
+    plumber = time.perf_counter() - start
+    print(f"pdfplumber:          {pages / plumber:8.1f} pages/sec ({pages} pages)")
+
+    for label, min_pages in (("pypdfium2 serial", pages + 1), ("pypdfium2 parallel", 1)):
+        service.parallel_text_min_pages = min_pages
+        service._extract_text_layer(args.pdf)  # warm up the worker pool
+        start = time.perf_counter()
+        service._extract_text_layer(args.pdf)
+        elapsed = time.perf_counter() - start
+        print(f"{label + ':':20} {pages / elapsed:8.1f} pages/sec")
+
+
+def bench_parser(args):
+    import random
+    from app.services import receipt_parser
+
+    if args.text:
+        with open(args.text, encoding="utf-8") as f:
+            text = f.read()
+    else:
+        # Synthetic bank statement: one dated transaction per line plus some noise
+        rnd = random.Random(0)
+        merchants = ["STARBUCKS #1234", "UBER TRIP", "AMAZON MKTPLACE", "SHELL OIL", "REFUND WALMART", "NETFLIX.COM"]
+        lines = ["Statement period 01/01/2024 - 01/31/2024"]
+        for i in range(args.lines):
+            if i % 25 == 0:
+                lines.append("Page %d  Balance due %s" % (i // 25 + 1, f"{rnd.uniform(100, 9000):,.2f}"))
+            else:
+                lines.append(f"01/{rnd.randint(1, 28):02d} {rnd.choice(merchants)} ${rnd.uniform(1, 500):.2f}")
+        text = "\n".join(lines)
+
+    n_lines = text.count("\n") + 1
+    receipt_parser.parse_transactions(text)  # warm up compiled patterns
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        transactions = receipt_parser.parse_transactions(text)
+    elapsed = time.perf_counter() - start
+
+    print(f"lines:        {n_lines}")
+    print(f"transactions: {len(transactions)}")
+    print(f"lines/sec:    {n_lines * args.repeat / elapsed:,.0f}")
+
+
+def bench_stream(args):
+    from app.services import receipt_parser
+    from app.services.ocr_service import OCRService
+
+    service = OCRService()
+    with open(args.pdf, "rb") as f:
+        content = f.read()
+
+    service.extract_text_from_pdf(content, args.tier)  # warm up the worker pools
+
+    # Whole document: nothing can be shown until every page is done
+    start = time.perf_counter()
+    receipt_parser.parse_transactions(service.extract_text_from_pdf(content, args.tier))
+    whole = time.perf_counter() - start
+
+    # Page by page, as /api/upload/stream does
+    start = time.perf_counter()
+    first, seen, today = None, set(), receipt_parser.today()
+    for _, page_count, text, _ in service.iter_pdf_pages(content, args.tier):
+        if receipt_parser.parse_lines(text, today, seen) and first is None:
+            first = time.perf_counter() - start
+    streamed = time.perf_counter() - start
+
+    print(f"pages:                           {page_count}")
+    print(f"whole document:                  {whole:.3f}s")
+    print(f"streamed, first transaction:     {first:.3f}s" if first is not None else "no transactions found")
+    print(f"streamed, last page:             {streamed:.3f}s")
+
+
+def bench_categorizer(args):
+    import random
+    import string
+    from app.services import categorizer
+
+    rnd = random.Random(0)
+    descriptions = [
+        " ".join("".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(3, 9))) for _ in range(rnd.randint(2, 6)))
+        for _ in range(args.descriptions)
+    ]
+
+    print(f"{'keywords':>9} {'automaton desc/sec':>19} {'substring scan desc/sec':>24}")
+    for count in args.keywords:
+        # Synthetic merchant names spread over a handful of categories
+        rules = {f"Category {i}": [] for i in range(10)}
+        for i in range(count):
+            name = "".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(4, 12)))
+            rules[f"Category {i % 10}"].append(name)
+        automaton = categorizer.build_automaton(rules)
+        flat = [(cat, categorizer._normalize(k)) for cat, kws in rules.items() for k in kws]
+
+        start = time.perf_counter()
+        for d in descriptions:
+            categorizer.suggest_category(d, automaton)
+        automaton_rate = len(descriptions) / (time.perf_counter() - start)
+
+        # The previous implementation: one `in` test per keyword
+        start = time.perf_counter()
+        for d in descriptions:
+            desc = categorizer._normalize(d)
+            [cat for cat, kw in flat if kw in desc]
+        scan_rate = len(descriptions) / (time.perf_counter() - start)
+
+        print(f"{count:>9} {automaton_rate:>19,.0f} {scan_rate:>24,.0f}")
+
+
+def bench_categorize_batch(args):
+    import random
+    from app.services import categorizer, receipt_parser
+
+    if args.text:
+        with open(args.text, encoding="utf-8") as f:
+            text = f.read()
+    else:
+        # A year of statements: mostly recurring merchants, some one-off descriptions
+        rnd = random.Random(0)
+        recurring = [
+            "STARBUCKS #1234", "STARBUCKS #0871", "UBER TRIP", "UBER EATS", "AMAZON MKTPLACE", "SHELL OIL 5521",
+            "COSTCO WHOLESALE", "COSTCO GAS", "KROGER #412", "WALMART SUPERCENTER", "NETFLIX.COM", "SPOTIFY USA",
+            "CITY PARKING", "LYFT RIDE", "WHOLE FOODS", "TRADER JOES", "CVS PHARMACY", "TARGET T-1881",
+            "CHIPOTLE 0293", "DOMINOS PIZZA", "ORGANIC MILK 1GAL", "BANANAS", "BROWN RICE 5LB", "TIDE DETERGENT",
+        ]
+        lines = []
+        for i in range(args.lines):
+            if rnd.random() < args.unique:
+                merchant = "POS PURCHASE %06d %s" % (rnd.randint(0, 999999), rnd.choice(recurring))
+            else:
+                merchant = rnd.choice(recurring)
+            lines.append(f"{rnd.randint(1, 12):02d}/{rnd.randint(1, 28):02d} {merchant} ${rnd.uniform(1, 300):.2f}")
+        text = "\n".join(lines)
+
+    descriptions = [t["description"] for t in receipt_parser.parse_transactions(text)]
+    automaton = categorizer._AUTOMATON
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        # Previous call sites: one uncached suggest_category per line
+        uncached = [categorizer.suggest_category(d, automaton) for d in descriptions]
+    per_line = time.perf_counter() - start
+
+    categorizer.set_rules(categorizer._RULES)  # start from an empty cache
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        batched = categorizer.suggest_categories(descriptions)
+    batch = time.perf_counter() - start
+    assert batched == uncached
+
+    n = len(descriptions) * args.repeat
+    print(f"descriptions:           {len(descriptions)} ({len(set(descriptions))} distinct)")
+    print(f"per-line desc/sec:      {n / per_line:,.0f}")
+    print(f"batched+cache desc/sec: {n / batch:,.0f}")
+    print(f"cache:                  {categorizer.cache_stats()}")
+
+
+def bench_bulk_insert(args):
+    import datetime
+    import os
+    import tempfile
+    from sqlalchemy import create_engine, delete
+    from sqlalchemy.orm import sessionmaker
+    from app.db import Base
+    from app.models import Transaction, User
+    from app.services.transaction_store import add_fingerprints, find_by_fingerprint, insert_transactions
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        user = User(email=f"bench-{time.time_ns()}@example.com", password_hash="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    def items(n):
+        return [
+            {"date": datetime.date(2024, 1, 1) + datetime.timedelta(days=i % 365), "description": f"MERCHANT {i}",
+             "amount": round(i * 1.37 % 500, 2), "category": "Groceries", "source": "statement", "user_id": user_id}
+            for i in range(n)
+        ]
+
+    def per_row(db, rows):
+        # The previous endpoint: add each row, commit, refresh each row
+        objs = [Transaction(**row) for row in rows]
+        db.add_all(objs)
+        db.commit()
+        for obj in objs:
+            db.refresh(obj)
+
+    def bulk(db, rows):
+        add_fingerprints(rows)
+        inserted = insert_transactions(db, rows, args.chunk_size)
+        # What the endpoint does to report deduplicated items
+        find_by_fingerprint(db, [r["fingerprint"] for r in rows if len(inserted) < len(rows)])
+        db.commit()
+
+    def timed(method, rows):
+        with Session() as db:
+            start = time.perf_counter()
+            method(db, rows)
+            return len(rows) / (time.perf_counter() - start)
+
+    def clear():
+        with Session() as db:
+            db.execute(delete(Transaction).where(Transaction.user_id == user_id))
+            db.commit()
+
+    print(f"{url.split(':')[0]}, chunk size {args.chunk_size or 'default'}")
+    print(f"{'items':>7} {'per-row rows/sec':>17} {'bulk rows/sec':>14} {'re-save rows/sec':>17}")
+    for n in args.sizes:
+        per_row_rate = timed(per_row, items(n))
+        clear()
+        bulk_rate = timed(bulk, items(n))
+        # The same items again: every row conflicts and is looked up instead
+        repeat_rate = timed(bulk, items(n))
+        clear()
+        print(f"{n:>7} {per_row_rate:>17,.0f} {bulk_rate:>14,.0f} {repeat_rate:>17,.0f}")
+
+    with Session() as db:
+        db.execute(delete(User).where(User.id == user_id))
+        db.commit()
+
+
+def bench_pagination(args):
+    import datetime
+    import os
+    import random
+    import tempfile
+    from sqlalchemy import create_engine, event, text
+    from sqlalchemy.orm import sessionmaker
+    from app.db import Base
+    from app.models import Transaction, User
+    from app.routes.transactions import _encode_cursor, _keyset_page
+    from app.services.transaction_store import insert_transactions
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+
+    user = User(email=f"bench-{time.time_ns()}@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    rnd = random.Random(0)
+    rows = [
+        {"date": datetime.date(2020, 1, 1) + datetime.timedelta(days=rnd.randint(0, 1500)), "description": f"MERCHANT {i}",
+         "amount": round(rnd.uniform(1, 500), 2), "category": rnd.choice(["Food", "Groceries", "Transport"]),
+         "source": "statement", "user_id": user.id}
+        for i in range(args.rows)
+    ]
+    insert_transactions(db, rows, 5000)
+    db.commit()
+    if engine.dialect.name == "postgresql":
+        db.execute(text("ANALYZE transactions"))
+    print(f"{engine.dialect.name}, {args.rows} transactions for one user, {args.limit} per page")
+
+    def query(category=None):
+        q = db.query(Transaction).filter(Transaction.user_id == user.id)
+        return q.filter(Transaction.category == category) if category else q
+
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        return (time.perf_counter() - start) / args.repeat * 1000
+
+    print(f"{'page':>7} {'offset ms':>10} {'cursor ms':>10}")
+    for page in (p for p in args.pages if (p - 1) * args.limit < args.rows):
+        skip = (page - 1) * args.limit
+        # The cursor a client would hold after reading the previous page
+        cursor = None
+        if skip:
+            before = query().order_by(Transaction.date.desc(), Transaction.id.desc()).offset(skip - 1).first()
+            cursor = _encode_cursor(before)
+        offset_ms = timed(lambda: _keyset_page(query(), None, skip, args.limit))
+        cursor_ms = timed(lambda: _keyset_page(query(), cursor, 0, args.limit))
+        print(f"{page:>7} {offset_ms:>10.2f} {cursor_ms:>10.2f}")
+
+    # The keyset queries must be index range scans with no sort step
+    cursor = _encode_cursor(query().order_by(Transaction.date.desc(), Transaction.id.desc()).first())
+    explain = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    missing = []
+    for label, category in (("all", None), ("category", "Food")):
+        captured = []
+        capture = lambda conn, cur, statement, params, context, many: captured.append((statement, params))
+        event.listen(engine, "before_cursor_execute", capture)
+        _keyset_page(query(category), cursor, 0, args.limit)
+        event.remove(engine, "before_cursor_execute", capture)
+        statement, params = captured[-1]
+        with engine.connect() as conn:
+            plan = "\n".join(str(r[-1]) for r in conn.exec_driver_sql(explain + statement, params))
+        uses_index = "ix_transactions_user_" in plan and "TEMP B-TREE" not in plan and "Sort" not in plan
+        print(f"\n{label}: composite index used, no sort: {'yes' if uses_index else 'NO'}\n{plan}")
+        if not uses_index:
+            missing.append(label)
+
+    db.query(Transaction).filter(Transaction.user_id == user.id).delete()
+    db.delete(user)
+    db.commit()
+    db.close()
+    if missing:
+        sys.exit(f"Keyset pages not served by the (user_id, date, id) indexes: {', '.join(missing)}")
+
+
+def bench_search(args):
+    import datetime
+    import os
+    import random
+    import string
+    import tempfile
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.db import Base, ensure_search_index
+    from app.models import Transaction, User
+    from app.services.search import apply_search, search_terms
+    from app.services.transaction_store import insert_transactions
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    ensure_search_index(engine)
+    backend = "postgres" if engine.dialect.name == "postgresql" else "fts5"
+    Session = sessionmaker(bind=engine)
+    db = Session()
+
+    rnd = random.Random(0)
+    vocabulary = ["".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(4, 10))) for _ in range(args.vocabulary)]
+    users = []
+    for _ in range(args.users):
+        user = User(email=f"bench-{time.time_ns()}-{len(users)}@example.com", password_hash="x")
+        db.add(user)
+        db.flush()
+        users.append(user.id)
+    db.commit()
+
+    start = time.perf_counter()
+    per_user = args.rows // args.users
+    for user_id in users:
+        rows = [
+            {"date": datetime.date(2020, 1, 1) + datetime.timedelta(days=rnd.randint(0, 1500)),
+             "description": " ".join(rnd.choices(vocabulary, k=rnd.randint(2, 5))).upper() + f" #{rnd.randint(1, 9999)}",
+             "amount": round(rnd.uniform(1, 500), 2), "category": rnd.choice(["Food", "Groceries", "Transport"]),
+             "source": "statement", "user_id": user_id}
+            for _ in range(per_user)
+        ]
+        insert_transactions(db, rows, 5000)
+        db.commit()
+    print(f"{engine.dialect.name}: {per_user * args.users} rows, {args.users} users, "
+          f"loaded and indexed in {time.perf_counter() - start:.1f}s")
+
+    # Search box input: one or two words, often cut short
+    queries = [
+        " ".join(w[:rnd.randint(2, len(w))] for w in rnd.sample(vocabulary, rnd.randint(1, 2)))
+        for _ in range(args.queries)
+    ]
+
+    def run(method, filtered, n):
+        latencies = []
+        for q in queries[:n]:
+            user_id = rnd.choice(users)
+            query = db.query(Transaction).filter(Transaction.user_id == user_id)
+            if filtered:
+                query = query.filter(Transaction.category == "Food", Transaction.amount >= 100)
+            start = time.perf_counter()
+            apply_search(query, method, user_id, search_terms(q)).limit(50).all()
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95) - 1]
+
+    print(f"{'search':>22} {'p50 ms':>8} {'p95 ms':>8}")
+    for label, method, filtered, n in (
+        (backend, backend, False, args.queries),
+        (backend + " + filters", backend, True, args.queries),
+        ("LIKE scan", "like", False, max(20, args.queries // 10)),
+    ):
+        p50, p95 = run(method, filtered, n)
+        print(f"{label:>22} {p50:>8.2f} {p95:>8.2f}")
+
+    db.close()
+
+
+def bench_export(args):
+    import datetime
+    import os
+    import random
+    import tempfile
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import sessionmaker
+    from app.db import Base
+    from app.models import Transaction, User
+    from app.routes.transactions import _EXPORT_COLUMNS
+    from app.services.export import EXPORT_BATCH_SIZE, iter_export
+    from app.services.transaction_store import insert_transactions
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        user = User(email=f"bench-{time.time_ns()}@example.com", password_hash="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+        rnd = random.Random(0)
+        for start in range(0, args.rows, 50000):
+            insert_transactions(db, [
+                {"date": datetime.date(2020, 1, 1) + datetime.timedelta(days=rnd.randint(0, 1500)),
+                 "description": f"MERCHANT {i} CITY", "amount": round(rnd.uniform(1, 500), 2),
+                 "category": rnd.choice(["Food", "Groceries", "Transport"]), "source": "statement", "user_id": user_id}
+                for i in range(start, min(start + 50000, args.rows))
+            ], 5000)
+            db.commit()
+
+    stmt = (select(*_EXPORT_COLUMNS).where(Transaction.user_id == user_id)
+            .order_by(Transaction.date.desc(), Transaction.id.desc()))
+    columns = [c.key for c in _EXPORT_COLUMNS]
+    print(f"{engine.dialect.name}, {args.rows} rows, batch {EXPORT_BATCH_SIZE}, peak RSS before export {peak_rss_mb():.0f} MB")
+    print(f"{'export':>12} {'rows/sec':>10} {'MB/sec':>8} {'output MB':>10} {'peak RSS MB':>12}")
+    for fmt, compress in (("csv", False), ("ndjson", False), ("csv", True)):
+        with Session() as db:
+            start = time.perf_counter()
+            size = 0
+            rows = db.connection().execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            for chunk in iter_export(rows, columns, fmt, compress):
+                size += len(chunk)
+            elapsed = time.perf_counter() - start
+        label = fmt + (".gz" if compress else "")
+        print(f"{label:>12} {args.rows / elapsed:>10,.0f} {size / elapsed / 1e6:>8.1f} {size / 1e6:>10.1f} {peak_rss_mb():>12.0f}")
+
+    # For comparison: materializing the account as ORM objects first
+    with Session() as db:
+        start = time.perf_counter()
+        loaded = db.query(Transaction).filter(Transaction.user_id == user_id).all()
+        print(f"{'ORM .all()':>12} {len(loaded) / (time.perf_counter() - start):>10,.0f} {'':>8} {'':>10} {peak_rss_mb():>12.0f}")
+
+
+def bench_import(args):
+    import datetime
+    import json
+    import os
+    import random
+    import tempfile
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    # The import stream opens sessions from app.db, so point it at the benchmark database
+    os.environ["DATABASE_URL"] = url
+    from app.db import SessionLocal, engine, init_db
+    from app.models import User
+    from app.routes.transactions import _import_stream
+    from app.services.statement_import import IMPORT_CHUNK_SIZE, StatementReader
+
+    init_db()
+    with SessionLocal() as db:
+        user = User(email=f"bench-{time.time_ns()}@example.com", password_hash="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    rnd = random.Random(0)
+    merchants = ["TESCO STORES", "SHELL", "UBER TRIP", "NETFLIX.COM", "AMAZON MKTP", "LOCAL CAFE", "PHARMACY"]
+    directory = tempfile.mkdtemp()
+    csv_path = os.path.join(directory, "statement.csv")
+    ofx_path = os.path.join(directory, "statement.ofx")
+    with open(csv_path, "w") as csv_file, open(ofx_path, "w") as ofx_file:
+        csv_file.write("Date,Description,Amount\n")
+        ofx_file.write("OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n")
+        for i in range(args.rows):
+            day = datetime.date(2020, 1, 1) + datetime.timedelta(days=rnd.randint(0, 1500))
+            desc = f"{rnd.choice(merchants)} {rnd.randint(1, 999)}"
+            amount = round(rnd.uniform(1, 500), 2)
+            csv_file.write(f"{day.isoformat()},{desc},-{amount:.2f}\n")
+            ofx_file.write(f"<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>{day:%Y%m%d}<TRNAMT>-{amount:.2f}<FITID>{i}<NAME>{desc}</STMTTRN>\n")
+        ofx_file.write("</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n")
+
+    print(f"{engine.dialect.name}, {args.rows} rows, chunk {IMPORT_CHUNK_SIZE}, peak RSS before import {peak_rss_mb():.0f} MB")
+    print(f"{'format':>8} {'file MB':>8} {'seconds':>8} {'rows/sec':>10} {'imported':>9} {'events':>7} {'peak RSS MB':>12}")
+    for fmt, path in (("csv", csv_path), ("ofx", ofx_path)):
+        start = time.perf_counter()
+        spool = open(path, "rb")
+        events = list(_import_stream(StatementReader(spool, fmt, negate=True), spool, user_id))
+        elapsed = time.perf_counter() - start
+        summary = json.loads(events[-1])
+        print(f"{fmt:>8} {os.path.getsize(path) / 1e6:>8.1f} {elapsed:>8.2f} {args.rows / elapsed:>10,.0f} "
+              f"{summary.get('imported', summary):>9} {len(events):>7} {peak_rss_mb():>12.0f}")
+
+
+def bench_duplicates(args):
+    import datetime
+    import os
+    import random
+    import statistics
+    import tempfile
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import sessionmaker
+    from app.db import Base
+    from app.models import Transaction, User
+    from app.services.duplicates import DUPLICATE_MIN_SIMILARITY, DUPLICATE_WINDOW_DAYS, find_duplicates, similarity
+    from app.services.transaction_store import insert_transactions
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    rnd = random.Random(0)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    merchants = [
+        " ".join("".join(rnd.choice(letters) for _ in range(rnd.randint(4, 9))) for _ in range(2)).upper()
+        + f" #{rnd.randint(1, 999)}"
+        for _ in range(2000)
+    ]
+    # Everyday purchases repeat the same few amounts
+    common_amounts = [round(rnd.uniform(2, 30), 2) for _ in range(50)]
+
+    def amount():
+        return rnd.choice(common_amounts) if rnd.random() < 0.2 else round(rnd.uniform(1, 500), 2)
+
+    with Session() as db:
+        user = User(email=f"bench-{time.time_ns()}@example.com", password_hash="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+        for start in range(0, args.rows, 50000):
+            insert_transactions(db, [
+                {"date": datetime.date(2021, 1, 1) + datetime.timedelta(days=rnd.randint(0, 1460)),
+                 "description": rnd.choice(merchants), "amount": amount(), "category": "Groceries",
+                 "source": "statement", "user_id": user_id}
+                for _ in range(start, min(start + 50000, args.rows))
+            ], 5000)
+            db.commit()
+        stored = db.execute(select(Transaction.date, Transaction.description, Transaction.amount)
+                            .where(Transaction.user_id == user_id).limit(5000)).all()
+
+    def upload():
+        # A receipt: one date, some lines; a few repeat a stored row with OCR noise
+        receipt = []
+        day = datetime.date(2021, 1, 1) + datetime.timedelta(days=rnd.randint(0, 1460))
+        for _ in range(args.lines):
+            if rnd.random() < 0.2:
+                txn_date, desc, amt = rnd.choice(stored)
+                receipt.append({"date": (txn_date + datetime.timedelta(days=1)).isoformat(),
+                                "description": desc.lower().replace("#", ""), "amount": float(amt)})
+            else:
+                receipt.append({"date": day.isoformat(), "description": rnd.choice(merchants), "amount": amount()})
+        return receipt
+
+    def scan(db, receipt):
+        # For comparison: every stored row of the user, compared in Python
+        rows = db.execute(select(Transaction.id, Transaction.date, Transaction.amount, Transaction.description)
+                          .where(Transaction.user_id == user_id)).all()
+        found = []
+        for t in receipt:
+            txn_date = datetime.date.fromisoformat(t["date"])
+            matches = [r.id for r in rows if float(r.amount) == t["amount"]
+                       and abs((r.date - txn_date).days) <= DUPLICATE_WINDOW_DAYS
+                       and similarity(t["description"], r.description) >= DUPLICATE_MIN_SIMILARITY]
+            found.append(matches[0] if matches else None)
+        return found
+
+    print(f"{engine.dialect.name}, {args.rows} rows for one user, {args.lines} lines per upload, "
+          f"window {DUPLICATE_WINDOW_DAYS} days, similarity >= {DUPLICATE_MIN_SIMILARITY}")
+    print(f"{'method':>8} {'p50 ms':>8} {'p95 ms':>8} {'flagged':>8}")
+    receipts = [upload() for _ in range(args.uploads)]
+    for name, method, count in (("index", find_duplicates, len(receipts)), ("scan", None, min(5, len(receipts)))):
+        times = []
+        flagged = 0
+        with Session() as db:
+            for receipt in receipts[:count]:
+                start = time.perf_counter()
+                found = method(db, user_id, receipt) if method else scan(db, receipt)
+                times.append((time.perf_counter() - start) * 1000)
+                flagged += sum(f is not None for f in found)
+        p95 = statistics.quantiles(times, n=20)[-1] if len(times) > 1 else times[0]
+        print(f"{name:>8} {statistics.median(times):>8.2f} {p95:>8.2f} {flagged:>8}")
+
+
+def bench_concurrency(args):
+    import datetime
+    import os
+    import random
+    import statistics
+    import tempfile
+    import threading
+    from collections import Counter
+    from sqlalchemy import delete, func, select
+    from sqlalchemy.orm import sessionmaker
+    from app.db import Base, create_engines
+    from app.models import Transaction, User
+    from app.services.transaction_store import insert_transactions
+
+    def rows(rnd, user_id, n):
+        return [
+            {"date": datetime.date(2022, 1, 1) + datetime.timedelta(days=rnd.randint(0, 1000)),
+             "description": f"MERCHANT {rnd.randint(1, 5000)}", "amount": round(rnd.uniform(1, 500), 2),
+             "category": rnd.choice(["Food", "Groceries", "Transport", "Bills"]), "source": "bench", "user_id": user_id}
+            for _ in range(n)
+        ]
+
+    print(f"{args.readers} readers, {args.writers} writers ({args.batch} rows per write), "
+          f"{args.seconds}s, {args.rows} rows preloaded")
+    print(f"{'profile':>11} {'reads/s':>9} {'read p95 ms':>12} {'writes/s':>9} {'write p95 ms':>13} {'errors':>7}  error types")
+    for profile in args.profiles:
+        # A new file per profile: WAL mode, once set, stays with the database
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+        write_engine, read_engine = create_engines(url, profile)
+        Base.metadata.create_all(write_engine)
+        WriteSession = sessionmaker(bind=write_engine)
+        ReadSession = sessionmaker(bind=read_engine)
+
+        rnd = random.Random(0)
+        with WriteSession() as db:
+            users = [User(email=f"bench-{i}-{time.time_ns()}@example.com", password_hash="x") for i in range(args.users)]
+            db.add_all(users)
+            db.commit()
+            user_ids = [u.id for u in users]
+            for start in range(0, args.rows, 10000):
+                insert_transactions(db, rows(rnd, rnd.choice(user_ids), min(10000, args.rows - start)), 5000)
+                db.commit()
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        latencies = {"read": [], "write": []}
+        errors: Counter = Counter()
+
+        def reader(seed):
+            local = random.Random(seed)
+            while not stop.is_set():
+                user_id = local.choice(user_ids)
+                start = time.perf_counter()
+                try:
+                    with ReadSession() as db:
+                        # Like /analytics/categories and a first /api/transactions/ page
+                        db.execute(select(Transaction.category, func.sum(Transaction.amount))
+                                   .where(Transaction.user_id == user_id)
+                                   .where(Transaction.date >= datetime.date(2024, 1, 1))
+                                   .group_by(Transaction.category)).all()
+                        db.execute(select(Transaction).where(Transaction.user_id == user_id)
+                                   .order_by(Transaction.date.desc(), Transaction.id.desc()).limit(100)).all()
+                    with lock:
+                        latencies["read"].append(time.perf_counter() - start)
+                except Exception as e:
+                    with lock:
+                        errors[type(e).__name__] += 1
+
+        def writer(seed):
+            local = random.Random(seed)
+            while not stop.is_set():
+                user_id = local.choice(user_ids)
+                start = time.perf_counter()
+                try:
+                    with WriteSession() as db:
+                        # Like the write endpoints: read first (the row to delete, the
+                        # Idempotency-Key or fingerprint lookups), then write
+                        latest = db.execute(select(Transaction.id).where(Transaction.user_id == user_id)
+                                            .order_by(Transaction.id.desc()).limit(1)).scalar()
+                        if latest is not None and local.random() < 0.2:
+                            db.execute(delete(Transaction).where(Transaction.id == latest))
+                        else:
+                            insert_transactions(db, rows(local, user_id, args.batch))
+                        db.commit()
+                    with lock:
+                        latencies["write"].append(time.perf_counter() - start)
+                except Exception as e:
+                    with lock:
+                        errors[type(e).__name__] += 1
+
+        threads = ([threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+                   + [threading.Thread(target=writer, args=(1000 + i,)) for i in range(args.writers)])
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        write_engine.dispose()
+        read_engine.dispose()
+
+        def p95(values):
+            return statistics.quantiles(values, n=20)[-1] * 1000 if len(values) > 1 else float("nan")
+
+        total_errors = sum(errors.values())
+        print(f"{profile:>11} {len(latencies['read']) / args.seconds:>9,.0f} {p95(latencies['read']):>12.1f} "
+              f"{len(latencies['write']) / args.seconds:>9,.0f} {p95(latencies['write']):>13.1f} {total_errors:>7}  "
+              f"{', '.join(f'{name} x{count}' for name, count in errors.items()) or '-'}")
+
+
+def bench_money(args):
+    import datetime
+    import os
+    import random
+    import statistics
+    import tempfile
+    from decimal import Decimal
+    from sqlalchemy import MetaData, Numeric, create_engine, func, insert, select
+    from app.models import Cents, CentsAverage, Transaction, User
+
+    rnd = random.Random(0)
+    rows = [
+        {"date": datetime.date(2020, 1, 1) + datetime.timedelta(days=rnd.randint(0, 1500)), "description": f"MERCHANT {i}",
+         "amount": Decimal(rnd.randint(1, 50000)) / 100, "category": rnd.choice(["Food", "Groceries", "Transport", "Bills"]),
+         "source": "bench", "user_id": 1}
+        for i in range(args.rows)
+    ]
+    exact_total = sum(r["amount"] for r in rows)
+    print(f"{args.rows} transactions for one user, median of {args.repeat} runs")
+    print(f"{'storage':>8} {'summary ms':>11} {'categories ms':>14} {'monthly ms':>11} "
+          f"{'hydrate ms':>11} {'amounts/s':>10}  total")
+
+    # The same table and indexes under each amount type, each in a new SQLite file
+    for storage, amount_type, avg_type in (("decimal", Numeric(12, 2), None), ("cents", Cents(), CentsAverage())):
+        metadata = MetaData()
+        User.__table__.to_metadata(metadata)
+        table = Transaction.__table__.to_metadata(metadata)
+        table.c.amount.type = amount_type
+        engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+        metadata.create_all(engine)
+        with engine.begin() as conn:
+            for start in range(0, len(rows), 5000):
+                conn.execute(insert(table), rows[start:start + 5000])
+
+        amount = table.c.amount
+        mine = table.c.user_id == 1
+        # Like /analytics/summary, /analytics/categories and /analytics/monthly
+        summary = select(func.sum(amount), func.avg(amount, type_=avg_type), func.min(amount),
+                         func.max(amount), func.count(table.c.id)).where(mine)
+        categories = (select(table.c.category, func.sum(amount), func.avg(amount, type_=avg_type), func.count(table.c.id))
+                      .where(mine).group_by(table.c.category))
+        month = func.strftime("%Y-%m", table.c.date)
+        monthly = select(month, func.sum(amount), func.count(table.c.id)).where(mine).group_by(month)
+        # Every amount through the result processor, and to the API's float
+        hydrate = select(table.c.id, amount).where(mine)
+
+        def timed(stmt, hydrate_rows=False):
+            times = []
+            with engine.connect() as conn:
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    result = conn.execute(stmt).all()
+                    if hydrate_rows:
+                        [float(r.amount) for r in result]
+                    times.append(time.perf_counter() - start)
+            return statistics.median(times) * 1000, result
+
+        summary_ms, result = timed(summary)
+        total = result[0][0]
+        categories_ms, _ = timed(categories)
+        monthly_ms, _ = timed(monthly)
+        hydrate_ms, _ = timed(hydrate, hydrate_rows=True)
+        exact = "exact" if Decimal(str(total)) == exact_total else f"off by {Decimal(str(total)) - exact_total}"
+        print(f"{storage:>8} {summary_ms:>11.2f} {categories_ms:>14.2f} {monthly_ms:>11.2f} "
+              f"{hydrate_ms:>11.2f} {args.rows / hydrate_ms * 1000:>10,.0f}  {total} ({exact})")
+        engine.dispose()
+
+
+def bench_date_buckets(args):
+    import datetime
+    import os
+    import random
+    import statistics
+    import tempfile
+    from sqlalchemy import create_engine, event, extract, func, text
+    from sqlalchemy.orm import sessionmaker
+    from app.db import Base
+    from app.models import Transaction, User
+    from app.routes.transactions import _category_label, _month_filter
+    from app.services.transaction_store import insert_transactions
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    user = User(email=f"bench-{time.time_ns()}@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    rnd = random.Random(0)
+    days = args.years * 365
+    for start in range(0, args.rows, 10000):
+        insert_transactions(db, [
+            {"date": datetime.date(2026 - args.years, 1, 1) + datetime.timedelta(days=rnd.randint(0, days - 1)),
+             "description": f"MERCHANT {i}", "amount": round(rnd.uniform(1, 500), 2),
+             "category": rnd.choice(["Food", "Groceries", "Transport", "Bills"]), "source": "bench", "user_id": user.id}
+            for i in range(start, min(start + 10000, args.rows))
+        ], 5000)
+        db.commit()
+    if engine.dialect.name == "postgresql":
+        db.execute(text("ANALYZE transactions"))
+    print(f"{engine.dialect.name}, {args.rows} transactions over {args.years} years for one user, "
+          f"median of {args.repeat} runs")
+
+    year = 2026 - args.years // 2
+    mine = Transaction.user_id == user.id
+
+    def by_month(columns, new, with_year):
+        query = db.query(*columns).filter(mine)
+        if new:
+            return _month_filter(query, db, user.id, 6, year if with_year else None)
+        query = query.filter(extract("month", Transaction.date) == 6)
+        return query.filter(extract("year", Transaction.date) == year) if with_year else query
+
+    totals = (func.sum(Transaction.amount), func.count(Transaction.id))
+    categories = (_category_label, *totals)
+    cases = [
+        ("by-month, year", lambda new: by_month(totals, new, True).all()),
+        ("by-month, all years", lambda new: by_month(totals, new, False).all()),
+        ("categories, year", lambda new: by_month(categories, new, True).group_by(_category_label).all()),
+        ("categories, all years", lambda new: by_month(categories, new, False).group_by(_category_label).all()),
+    ]
+
+    def timed(fn):
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return statistics.median(times) * 1000
+
+    print(f"{'query':>20} {'extract() ms':>13} {'year_month ms':>14}")
+    for label, run in cases:
+        print(f"{label:>20} {timed(lambda: run(False)):>13.2f} {timed(lambda: run(True)):>14.2f}")
+
+    # The month predicates must be served by the (user_id, year_month) index
+    explain = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    missing = []
+    for label, run in cases:
+        captured = []
+        capture = lambda conn, cur, statement, params, context, many: captured.append((statement, params))
+        event.listen(engine, "before_cursor_execute", capture)
+        run(True)
+        event.remove(engine, "before_cursor_execute", capture)
+        statement, params = captured[-1]
+        with engine.connect() as conn:
+            plan = "\n".join(str(r[-1]) for r in conn.exec_driver_sql(explain + statement, params))
+        uses_index = "ix_transactions_user_year_month" in plan
+        print(f"\n{label}: year_month index used: {'yes' if uses_index else 'NO'}\n{plan}")
+        if not uses_index:
+            missing.append(label)
+
+    db.query(Transaction).filter(mine).delete()
+    db.delete(user)
+    db.commit()
+    db.close()
+    if missing:
+        sys.exit(f"Month filters not served by the (user_id, year_month) index: {', '.join(missing)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("pdf-ocr", help="OCR every page of a scanned PDF")
+    p.add_argument("pdf")
+    p.add_argument("--workers", type=int)
+    p.add_argument("--max-pages-in-memory", type=int)
+    p.set_defaults(func=bench_pdf_ocr)
+
+    p = sub.add_parser("ocr-cache", help="Compare a cold OCR run with repeat uploads of the same file")
+    p.add_argument("file")
+    p.set_defaults(func=bench_ocr_cache)
+
+    p = sub.add_parser("preprocess", help="Latency and accuracy of each preprocessing tier on a receipt corpus")
+    p.add_argument("corpus", help="Directory of receipt images, optionally with <name>.txt ground truth")
+    p.set_defaults(func=bench_preprocess)
+
+    p = sub.add_parser("ocr-batch", help="Images/sec with one tesseract call per image vs batched calls")
+    p.add_argument("corpus", help="Directory of receipt images")
+    p.add_argument("--batch-size", type=int, default=8)
+    p.add_argument("--tier")
+    p.set_defaults(func=bench_ocr_batch)
+
+    p = sub.add_parser("pdf-text", help="Text-layer pages/sec: pdfplumber vs pypdfium2")
+    p.add_argument("pdf")
+    p.set_defaults(func=bench_pdf_text)
+
+    p = sub.add_parser("parser", help="Receipt/statement parser throughput in lines/sec")
+    p.add_argument("--text", help="OCR text to parse; defaults to a synthetic bank statement")
+    p.add_argument("--lines", type=int, default=5000)
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_parser)
+
+    p = sub.add_parser("stream", help="Time to first transaction: whole-document vs per-page parsing")
+    p.add_argument("pdf")
+    p.add_argument("--tier")
+    p.set_defaults(func=bench_stream)
+
+    p = sub.add_parser("categorizer", help="suggest_category throughput as the keyword count grows")
+    p.add_argument("--keywords", type=int, nargs="+", default=[60, 500, 2000, 5000])
+    p.add_argument("--descriptions", type=int, default=20000)
+    p.set_defaults(func=bench_categorizer)
+
+    p = sub.add_parser("categorize-batch", help="suggest_categories with its cache vs per-line suggest_category")
+    p.add_argument("--text", help="Statement text to categorize; defaults to a synthetic year of statements")
+    p.add_argument("--lines", type=int, default=5000)
+    p.add_argument("--unique", type=float, default=0.1, help="Share of one-off descriptions in the synthetic text")
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_categorize_batch)
+
+    p = sub.add_parser("bulk-insert", help="Rows/sec of the batch insert path vs per-row ORM inserts, and of saving it again")
+    p.add_argument("--url", help="Database URL, e.g. postgresql://...; defaults to a temporary SQLite file")
+    p.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    p.add_argument("--chunk-size", type=int)
+    p.set_defaults(func=bench_bulk_insert)
+
+    p = sub.add_parser("pagination", help="Offset vs keyset cursor page latency, plus the keyset query plans")
+    p.add_argument("--url", help="Database URL, e.g. postgresql://...; defaults to a temporary SQLite file")
+    p.add_argument("--rows", type=int, default=200000)
+    p.add_argument("--limit", type=int, default=100)
+    p.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100, 1000])
+    p.add_argument("--repeat", type=int, default=20)
+    p.set_defaults(func=bench_pagination)
+
+    p = sub.add_parser("search", help="Full-text search p50/p95 latency vs a LIKE scan")
+    p.add_argument("--url", help="Database URL, e.g. postgresql://...; defaults to a temporary SQLite file")
+    p.add_argument("--rows", type=int, default=1000000)
+    p.add_argument("--users", type=int, default=100)
+    p.add_argument("--vocabulary", type=int, default=5000, help="Distinct merchant words")
+    p.add_argument("--queries", type=int, default=500)
+    p.set_defaults(func=bench_search)
+
+    p = sub.add_parser("export", help="Streaming export throughput and peak memory")
+    p.add_argument("--url", help="Database URL, e.g. postgresql://...; defaults to a temporary SQLite file")
+    p.add_argument("--rows", type=int, default=1000000)
+    p.set_defaults(func=bench_export)
+
+    p = sub.add_parser("import", help="Statement import (CSV and OFX) rows/sec and peak memory")
+    p.add_argument("--url", help="Database URL, e.g. postgresql://...; defaults to a temporary SQLite file")
+    p.add_argument("--rows", type=int, default=100000)
+    p.set_defaults(func=bench_import)
+
+    p = sub.add_parser("duplicates", help="Near-duplicate lookup latency per upload at a large account size")
+    p.add_argument("--url", help="Database URL, e.g. postgresql://...; defaults to a temporary SQLite file")
+    p.add_argument("--rows", type=int, default=100000)
+    p.add_argument("--lines", type=int, default=20, help="Transactions per upload")
+    p.add_argument("--uploads", type=int, default=200)
+    p.set_defaults(func=bench_duplicates)
+
+    p = sub.add_parser("concurrency", help="Readers and writers at once: throughput and errors per SQLite profile")
+    p.add_argument("--readers", type=int, default=8)
+    p.add_argument("--writers", type=int, default=4)
+    p.add_argument("--batch", type=int, default=50, help="Rows inserted per write")
+    p.add_argument("--seconds", type=float, default=10)
+    p.add_argument("--rows", type=int, default=100000)
+    p.add_argument("--users", type=int, default=20)
+    p.add_argument("--profiles", nargs="+", default=["default", "production"])
+    p.set_defaults(func=bench_concurrency)
+
+    p = sub.add_parser("money", help="Aggregation and row hydration: NUMERIC amounts vs integer cents")
+    p.add_argument("--rows", type=int, default=200000)
+    p.add_argument("--repeat", type=int, default=10)
+    p.set_defaults(func=bench_money)
+
+    p = sub.add_parser("date-buckets", help="Month filters: extract() predicates vs the year_month index, plus query plans")
+    p.add_argument("--url", help="Database URL, e.g. postgresql://...; defaults to a temporary SQLite file")
+    p.add_argument("--rows", type=int, default=200000)
+    p.add_argument("--years", type=int, default=6)
+    p.add_argument("--repeat", type=int, default=20)
+    p.set_defaults(func=bench_date_buckets)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
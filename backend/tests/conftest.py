@@ -0,0 +1,28 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# Point the app at throwaway databases before anything imports app.db
+_tmp = tempfile.mkdtemp(prefix="expense-tracker-tests-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_tmp, "test.db")
+os.environ["OCR_CACHE_PATH"] = os.path.join(_tmp, "ocr_cache.db")
+
+
+@pytest.fixture(scope="module")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    # Entering the client runs startup, which creates the tables
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def headers(client):
+    """Authorization header of a newly signed-up user"""
+    response = client.post("/api/auth/signup", json={"email": f"{uuid.uuid4().hex[:12]}@example.com", "password": "x"})
+    return {"Authorization": "Bearer " + response.json()["access_token"]}
+
@@ -0,0 +1,50 @@
+from app.services.count_cache import CountCache, count_cache
+
+
+def _save(client, headers, count):
+    items = [{"date": f"2024-05-{day:02d}", "description": f"Lunch {day}", "amount": 10 + day}
+             for day in range(1, count + 1)]
+    assert client.post("/api/transactions/batch", json={"items": items}, headers=headers).status_code == 201
+
+
+def _filter(client, headers):
+    response = client.get("/api/transactions/filter", params={"limit": 2}, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_repeat_count_is_served_from_the_cache(client, headers):
+    _save(client, headers, 5)
+    first = _filter(client, headers)
+    hits = count_cache.hits
+    second = _filter(client, headers)
+
+    assert first["total_count"] == second["total_count"] == 5
+    assert first["total_count_exact"]
+    # Another worker process may have written since it was cached
+    assert not second["total_count_exact"]
+    assert count_cache.hits == hits + 1
+
+
+def test_save_and_delete_invalidate_the_count(client, headers):
+    _save(client, headers, 5)
+    _filter(client, headers)
+
+    _save(client, headers, 7)
+    after_save = _filter(client, headers)
+    assert after_save["total_count"] == 7
+    assert after_save["total_count_exact"]
+
+    txn_id = after_save["transactions"][0]["id"]
+    assert client.delete(f"/api/transactions/{txn_id}", headers=headers).status_code == 200
+    after_delete = _filter(client, headers)
+    assert after_delete["total_count"] == 6
+    assert after_delete["total_count_exact"]
+
+
+def test_count_raced_by_a_write_is_not_served():
+    cache = CountCache(max_entries=10, ttl=60)
+    version = cache.version(1)
+    cache.invalidate(1)
+    cache.put(1, "filter", 3, version)
+    assert cache.get(1, "filter") is None
@@ -0,0 +1,87 @@
+import datetime
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.models import User
+from app.services.duplicates import find_duplicates, similarity
+from app.services.transaction_store import insert_transactions
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine("sqlite:///" + str(tmp_path / "duplicates.db"))
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _store(db, *rows):
+    user = User(email=f"dup-{uuid.uuid4().hex}@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    stored = insert_transactions(db, [
+        {"date": datetime.date.fromisoformat(d), "description": description, "amount": amount,
+         "category": "Food", "source": "test", "user_id": user.id}
+        for d, description, amount in rows
+    ])
+    db.commit()
+    return user.id, [row.id for row in stored]
+
+
+def test_similarity_is_trigram_overlap():
+    assert similarity("Starbucks Coffee", "starbucks coffee") == 1.0
+    assert similarity("STARBUCKS COFFEE #1234", "Starbucks Coffee") >= 0.5
+    assert similarity("Starbucks Coffee", "Shell gas station") < 0.3
+    assert similarity("", "Starbucks") == 0.0
+
+
+def test_same_amount_nearby_and_similar_is_a_duplicate(db):
+    user_id, (coffee, _) = _store(db, ("2024-03-10", "Starbucks Coffee", 5.75), ("2024-03-10", "Shell", 40.0))
+    parsed = [
+        {"date": "2024-03-12", "description": "STARBUCKS COFFEE 0042", "amount": 5.75},
+        {"date": "2024-03-10", "description": "Starbucks Coffee", "amount": 5.76},
+        {"date": "2024-03-14", "description": "Starbucks Coffee", "amount": 5.75},
+        {"date": "2024-03-10", "description": "Bakery", "amount": 5.75},
+        {"date": "not a date", "description": "Starbucks Coffee", "amount": 5.75},
+    ]
+
+    # Matched; another amount; 4 days away (window is 3); dissimilar; unusable date
+    assert find_duplicates(db, user_id, parsed) == [coffee, None, None, None, None]
+
+
+def test_window_edges_and_custom_window(db):
+    user_id, (rent,) = _store(db, ("2024-04-01", "Monthly rent", 900.0))
+    parsed = [
+        {"date": "2024-03-29", "description": "Monthly rent", "amount": 900.0},
+        {"date": "2024-04-04", "description": "Monthly rent", "amount": 900.0},
+        {"date": "2024-04-05", "description": "Monthly rent", "amount": 900.0},
+    ]
+
+    assert find_duplicates(db, user_id, parsed) == [rent, rent, None]
+    assert find_duplicates(db, user_id, parsed, window_days=0) == [None, None, None]
+
+
+def test_most_similar_candidate_wins(db):
+    user_id, (_, exact, _) = _store(
+        db,
+        ("2024-05-01", "Corner store", 12.0),
+        ("2024-05-02", "Corner store groceries", 12.0),
+        ("2024-05-02", "Groceries", 12.0),
+    )
+    parsed = [{"date": "2024-05-02", "description": "corner store groceries", "amount": 12.0}]
+
+    assert find_duplicates(db, user_id, parsed) == [exact]
+
+
+def test_other_users_rows_are_ignored(db):
+    _store(db, ("2024-06-01", "Cinema tickets", 24.0))
+    user_id, _ = _store(db, ("2024-06-01", "Parking", 3.0), ("2024-06-01", "Tolls", 6.0))
+
+    parsed = [{"date": "2024-06-01", "description": "Cinema tickets", "amount": 24.0}]
+    assert find_duplicates(db, user_id, parsed) == [None]
@@ -0,0 +1,75 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from app.routes import transactions as transactions_routes
+from app.services import export
+
+ROWS = [
+    ("2024-01-05", "Rent, January", 950.0, "Bills"),
+    ("2024-01-07", "Coffee \"to go\"", 3.5, "Food"),
+    ("2024-02-01", "Train pass", 60.25, "Transport"),
+    ("2024-02-14", "Dinner", 48.1, "Food"),
+    ("2024-03-02", "Café crème", 4.2, "Food"),
+]
+
+
+@pytest.fixture
+def saved(client, headers, monkeypatch):
+    # Several database batches and output chunks per export
+    monkeypatch.setattr(transactions_routes, "EXPORT_BATCH_SIZE", 2)
+    monkeypatch.setattr(export, "EXPORT_CHUNK_BYTES", 40)
+    items = [{"date": d, "description": desc, "amount": amount, "category": category}
+             for d, desc, amount, category in ROWS]
+    response = client.post("/api/transactions/batch", json={"items": items}, headers=headers)
+    assert response.status_code == 201
+    return response.json()
+
+
+def _export(client, headers, **params):
+    response = client.get("/api/transactions/export", params=params, headers=headers)
+    assert response.status_code == 200
+    body = response.content
+    return gzip.decompress(body).decode() if params.get("gzip") else body.decode()
+
+
+def _expected(saved, keep=lambda row: True):
+    rows = [row for row in saved if keep(row)]
+    return sorted(rows, key=lambda row: (row["date"], row["id"]), reverse=True)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_csv_round_trips_the_rows(client, headers, saved, compress):
+    rows = list(csv.DictReader(io.StringIO(_export(client, headers, format="csv", gzip=compress))))
+
+    expected = _expected(saved)
+    assert [int(r["id"]) for r in rows] == [t["id"] for t in expected]
+    assert [(r["date"], r["description"], float(r["amount"]), r["category"]) for r in rows] == [
+        (t["date"], t["description"], t["amount"], t["category"]) for t in expected
+    ]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_ndjson_round_trips_the_rows(client, headers, saved, compress):
+    text = _export(client, headers, format="ndjson", gzip=compress)
+    rows = [json.loads(line) for line in text.splitlines()]
+
+    assert [(r["id"], r["date"], r["description"], r["amount"]) for r in rows] == [
+        (t["id"], t["date"], t["description"], t["amount"]) for t in _expected(saved)
+    ]
+
+
+def test_filters_apply_to_the_batched_export(client, headers, saved):
+    text = _export(client, headers, format="ndjson", category="Food", start_date="2024-01-06",
+                   end_date="2024-02-28", min_amount=4)
+    rows = [json.loads(line) for line in text.splitlines()]
+
+    assert [r["description"] for r in rows] == ["Dinner"]
+
+
+def test_invalid_date_is_rejected(client, headers):
+    response = client.get("/api/transactions/export", params={"start_date": "05/01/2024"}, headers=headers)
+    assert response.status_code == 400
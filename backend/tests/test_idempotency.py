@@ -0,0 +1,28 @@
+import uuid
+
+
+def _post_twice(client, headers, path, body):
+    key = {"Idempotency-Key": uuid.uuid4().hex}
+    first = client.post(path, json=body, headers={**headers, **key})
+    replay = client.post(path, json=body, headers={**headers, **key})
+    return first, replay
+
+
+def test_replay_matches_first_response(client, headers):
+    body = {"date": "2024-03-01", "description": "Coffee", "amount": 4.5, "category": "Food"}
+    first, replay = _post_twice(client, headers, "/api/transactions/", body)
+    assert first.status_code == replay.status_code == 201
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.content == first.content
+
+
+def test_batch_replay_matches_first_response(client, headers):
+    body = {"items": [
+        {"date": "2024-03-02", "description": "Bus ticket", "amount": 2.75},
+        {"date": "2024-03-02", "description": "Groceries", "amount": 31.2, "category": "Groceries"},
+    ]}
+    first, replay = _post_twice(client, headers, "/api/transactions/batch", body)
+    assert first.status_code == replay.status_code == 201
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json() == first.json()
+    assert list(replay.json()[0]) == list(first.json()[0])
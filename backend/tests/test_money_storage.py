@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, insert, select, text
+
+from app import db as db_module
+from app.db import Base, ensure_money_storage
+from app.models import Cents
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine("sqlite:///" + str(tmp_path / "money.db"))
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("value, cents", [
+    (Decimal("12.34"), 1234),
+    (Decimal("-0.01"), -1),
+    (Decimal("99999999.99"), 9999999999),
+    (Decimal("2.345"), 235),
+    (4.5, 450),
+    # The float 1.005 is just below 1.005, so it rounds down, as NUMERIC(12, 2) does
+    (1.005, 100),
+])
+def test_cents_binds_to_integer_cents(value, cents):
+    assert Cents().process_bind_param(value, None) == cents
+
+
+def test_cents_round_trips_through_the_database(engine):
+    amounts = Table("amounts", MetaData(), Column("id", Integer, primary_key=True), Column("amount", Cents()))
+    amounts.metadata.create_all(engine)
+    values = [Decimal("12.34"), Decimal("-7.10"), Decimal("0.00"), Decimal("99999999.99"), None]
+    with engine.begin() as conn:
+        conn.execute(insert(amounts), [{"amount": value} for value in values])
+        stored = conn.execute(text("SELECT amount FROM amounts ORDER BY id")).scalars().all()
+        loaded = conn.execute(select(amounts.c.amount).order_by(amounts.c.id)).scalars().all()
+
+    assert stored == [1234, -710, 0, 9999999999, None]
+    assert loaded == values
+    assert all(value.as_tuple().exponent == -2 for value in loaded if value is not None)
+
+
+def test_decimal_table_is_accepted_in_decimal_mode(engine):
+    Base.metadata.create_all(engine)
+    assert ensure_money_storage(bind=engine) is False
+
+
+def test_decimal_table_in_cents_mode_refuses_to_start(engine, monkeypatch):
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(db_module, "MONEY_STORAGE", "cents")
+    with pytest.raises(RuntimeError, match="migrate-money"):
+        ensure_money_storage(bind=engine)
+
+
+def test_cents_table_in_decimal_mode_refuses_to_start(engine):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE transactions (id INTEGER PRIMARY KEY, amount BIGINT NOT NULL)"))
+    with pytest.raises(RuntimeError, match="stored as cents"):
+        ensure_money_storage(bind=engine)
@@ -0,0 +1,31 @@
+import uuid
+
+from app.services import ocr_jobs as ocr_jobs_module
+from app.services import receipt_parser
+from app.services.ocr_jobs import process_document
+
+
+def _process_on(monkeypatch, day, text, digest):
+    monkeypatch.setattr(receipt_parser, "today", lambda: day)
+    monkeypatch.setattr(ocr_jobs_module.ocr_service, "extract_text_from_image", lambda *args: text)
+    return process_document(b"receipt", ".jpg", digest)
+
+
+def test_cached_undated_receipt_is_dated_on_upload_day(monkeypatch):
+    digest = uuid.uuid4().hex
+    first = _process_on(monkeypatch, "2024-03-01", "Latte 4.50\nMuffin 3.25", digest)
+    second = _process_on(monkeypatch, "2024-03-02", "Latte 4.50\nMuffin 3.25", digest)
+
+    assert not first["cached"]
+    assert second["cached"]
+    assert [t["date"] for t in first["transactions"]] == ["2024-03-01", "2024-03-01"]
+    assert [t["date"] for t in second["transactions"]] == ["2024-03-02", "2024-03-02"]
+
+
+def test_cached_dated_receipt_keeps_its_date(monkeypatch):
+    digest = uuid.uuid4().hex
+    _process_on(monkeypatch, "2024-03-01", "Latte 4.50\nMuffin 3.25\n2024-01-15", digest)
+    second = _process_on(monkeypatch, "2024-03-02", "Latte 4.50\nMuffin 3.25\n2024-01-15", digest)
+
+    assert second["cached"]
+    assert [t["date"] for t in second["transactions"]] == ["2024-01-15", "2024-01-15"]
@@ -0,0 +1,112 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from app.services import ocr_jobs as ocr_jobs_module
+from app.services.ocr_jobs import OCRJob, OCRJobQueue
+
+
+def _worker_result():
+    now = time.time()
+    return {
+        "text": "Coffee 4.50",
+        "transactions": [{"date": "2024-01-02", "description": "Coffee", "amount": 4.5}],
+        "cached": False,
+        "stage_timings": {},
+        "started_at": now,
+        "finished_at": now,
+    }
+
+
+def _finish_from_worker(queue, job):
+    future = Future()
+    future.set_result(_worker_result())
+    queue._on_done(job, future, "/nonexistent")
+    deadline = time.time() + 5
+    while not job.is_finished and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_job_is_finished_off_the_callback():
+    queue = OCRJobQueue(max_workers=1)
+    job = OCRJob("receipt.jpg", ".jpg", 10)
+    _finish_from_worker(queue, job)
+    assert job.status == "done"
+    assert job.result["transactions"][0]["possible_duplicate_of"] is None
+    queue.shutdown()
+
+
+def test_failing_post_processing_fails_the_job(monkeypatch):
+    def broken(user_id, transactions):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(ocr_jobs_module, "mark_duplicates", broken)
+    queue = OCRJobQueue(max_workers=1)
+    job = OCRJob("receipt.jpg", ".jpg", 10)
+    _finish_from_worker(queue, job)
+    assert job.status == "failed"
+    assert "database is locked" in job.error
+    assert job.finished_at is not None
+    queue.shutdown()
+
+
+def _page_workers():
+    return ocr_jobs_module.ocr_service.page_workers
+
+
+def test_workers_split_the_cpus_between_them(monkeypatch):
+    monkeypatch.delenv("OCR_PAGE_WORKERS", raising=False)
+    monkeypatch.setattr(ocr_jobs_module.os, "cpu_count", lambda: 8)
+    queue = OCRJobQueue(max_workers=2)
+    try:
+        assert queue.page_workers == 4
+        assert queue._get_executor().submit(_page_workers).result(timeout=60) == 4
+    finally:
+        queue.shutdown()
+
+
+def test_cached_job_is_finished_off_the_submitting_thread(monkeypatch):
+    threads = []
+
+    def record_thread(user_id, transactions):
+        threads.append(threading.current_thread())
+
+    cached = {key: _worker_result()[key] for key in ("text", "transactions")}
+    monkeypatch.setattr(ocr_jobs_module.ocr_cache, "get", lambda digest, tier=None: cached)
+    monkeypatch.setattr(ocr_jobs_module, "mark_duplicates", record_thread)
+    queue = OCRJobQueue(max_workers=1)
+    try:
+        job = queue.submit(None, 10, "digest", "receipt.jpg", ".jpg")
+        job.future.result(timeout=5)
+        assert job.status == "done"
+        assert job.result["cached"]
+        assert threads and threads[0] is not threading.current_thread()
+    finally:
+        queue.shutdown()
+
+
+def test_jobs_are_only_visible_to_their_owner(client, headers, monkeypatch):
+    cached = {key: _worker_result()[key] for key in ("text", "transactions")}
+    monkeypatch.setattr(ocr_jobs_module.ocr_cache, "get", lambda digest, tier=None: cached)
+    files = {"file": ("receipt.jpg", b"not really a jpeg", "image/jpeg")}
+    job_id = client.post("/api/upload/jobs", files=files, headers=headers).json()["job_id"]
+    other = client.post("/api/auth/signup", json={"email": f"other-{job_id[:12]}@example.com", "password": "x"})
+    other_headers = {"Authorization": "Bearer " + other.json()["access_token"]}
+
+    assert client.get(f"/api/upload/jobs/{job_id}", headers=other_headers).status_code == 404
+    assert client.get(f"/api/upload/jobs/{job_id}").status_code == 404
+    assert client.delete(f"/api/upload/jobs/{job_id}", headers=other_headers).status_code == 404
+    assert client.get(f"/api/upload/jobs/{job_id}", headers=headers).status_code == 200
+
+
+
+def test_server_shutdown_stops_the_workers(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    calls = []
+    monkeypatch.setattr(ocr_jobs_module.ocr_jobs, "shutdown", lambda: calls.append("jobs"))
+    monkeypatch.setattr(ocr_jobs_module.ocr_service, "shutdown", lambda: calls.append("text layer"))
+    with TestClient(app):
+        assert calls == []
+    assert calls == ["jobs", "text layer"]
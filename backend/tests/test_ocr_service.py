@@ -0,0 +1,34 @@
+import io
+
+import pytest
+from PIL import Image
+
+from app.services import ocr_service as ocr_service_module
+from app.services.ocr_service import ocr_service
+
+
+def _scan(size, dpi):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "white").save(buffer, format="JPEG", dpi=(dpi, dpi))
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("tier, expected", [("fast", (1236, 1600)), ("balanced", (1854, 2400))])
+def test_high_dpi_jpeg_is_downscaled_once(tier, expected):
+    # 600 DPI letter page: the target DPI halves it, then the tier's cap applies
+    ocr_service.ensure_ready()
+    settings = ocr_service._tier_settings(tier)
+    image = ocr_service._load_image(_scan((5100, 6600), 600), settings)
+    assert image.size != (5100, 6600)  # the JPEG decoder did part of the work
+    assert ocr_service._preprocess_image(image, tier).size == expected
+
+
+
+def test_shutdown_stops_the_text_layer_pool():
+    pool = ocr_service_module._get_text_layer_pool(1)
+    assert pool.submit(abs, -3).result(timeout=60) == 3
+    ocr_service.shutdown()
+    assert ocr_service_module._text_layer_pool is None
+    # The next large PDF starts a fresh pool
+    assert ocr_service_module._get_text_layer_pool(1) is not pool
+    ocr_service.shutdown()
@@ -0,0 +1,95 @@
+import datetime
+import random
+
+import pytest
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.models import Transaction, User
+from app.routes.transactions import _category_label, _encode_cursor, _keyset_page, _month_filter
+from app.services.transaction_store import insert_transactions
+
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    engine = create_engine("sqlite:///" + str(tmp_path_factory.mktemp("plans") / "plans.db"))
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    rnd = random.Random(0)
+    for n in range(2):
+        user = User(email=f"plans-{n}@example.com", password_hash="x")
+        session.add(user)
+        session.commit()
+        insert_transactions(session, [
+            {"date": datetime.date(2022, 1, 1) + datetime.timedelta(days=rnd.randint(0, 1000)),
+             "description": f"MERCHANT {i}", "amount": round(rnd.uniform(1, 500), 2),
+             "category": rnd.choice(["Food", "Groceries", "Transport"]), "source": "test", "user_id": user.id}
+            for i in range(2000)
+        ], 500)
+        session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _plan(db, run):
+    """EXPLAIN QUERY PLAN of the last statement executed by run()"""
+    engine = db.get_bind()
+    captured = []
+
+    def capture(conn, cursor, statement, params, context, executemany):
+        captured.append((statement, params))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        run()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    statement, params = captured[-1]
+    with engine.connect() as conn:
+        return "\n".join(str(row[-1]) for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, params))
+
+
+def _user_id(db):
+    return db.query(func.min(User.id)).scalar()
+
+
+def _listing(db, category=None):
+    query = db.query(Transaction).filter(Transaction.user_id == _user_id(db))
+    return query.filter(Transaction.category == category) if category else query
+
+
+@pytest.mark.parametrize("category, index", [
+    (None, "ix_transactions_user_date_id"),
+    ("Food", "ix_transactions_user_category_date_id"),
+])
+@pytest.mark.parametrize("with_cursor", [False, True])
+def test_listing_pages_walk_the_index_without_sorting(db, category, index, with_cursor):
+    cursor = None
+    if with_cursor:
+        newest = _listing(db).order_by(Transaction.date.desc(), Transaction.id.desc()).offset(50).first()
+        cursor = _encode_cursor(newest)
+
+    plan = _plan(db, lambda: _keyset_page(_listing(db, category), cursor, 0, 20))
+
+    assert f"USING INDEX {index}" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.parametrize("year", [2023, None])
+@pytest.mark.parametrize("grouped", [False, True])
+def test_month_filter_uses_the_year_month_index(db, year, grouped):
+    user_id = _user_id(db)
+    columns = (func.sum(Transaction.amount), func.count(Transaction.id))
+    if grouped:
+        columns = (_category_label, *columns)
+
+    def run():
+        query = db.query(*columns).filter(Transaction.user_id == user_id)
+        query = _month_filter(query, db, user_id, 6, year)
+        if grouped:
+            query = query.group_by(_category_label)
+        return query.all()
+
+    assert "ix_transactions_user_year_month" in _plan(db, run)
@@ -0,0 +1,67 @@
+import pytest
+
+from app.services import receipt_parser
+
+# Output of the parser before it was compiled into receipt_parser, captured
+# once from that implementation; it must keep producing exactly this.
+# TODAY marks transactions dated with the fallback for documents without a date.
+TODAY = "2000-01-01"
+
+GOLDEN = [
+    ("dated receipt", "CORNER CAFE\n2024-03-15\nLatte 4.50\nBlueberry Muffin 3.25\nSubtotal 7.75\nTax 0.62\nTotal 8.37", "2024-03-15",
+     [("2024-03-15", "Latte", 4.5), ("2024-03-15", "Blueberry Muffin", 3.25)]),
+    ("undated lines", "Latte 4.50\nMuffin 3.25\nSandwich $8.99", None,
+     [(TODAY, "Latte", 4.5), (TODAY, "Muffin", 3.25), (TODAY, "Sandwich", 8.99)]),
+    ("two-digit year", "Store 42\n03/15/24\nBread 2.99\nMilk 1.49", "2024-03-15",
+     [("2024-03-15", "Bread", 2.99), ("2024-03-15", "Milk", 1.49)]),
+    ("day first", "25/12/2023\nTurkey 45.00\nCranberries 3.10", "2023-12-25",
+     [("2023-12-25", "Turkey", 45.0), ("2023-12-25", "Cranberries", 3.1)]),
+    ("short day month", "3-7-2024\nParking 6.00", None,
+     [(TODAY, "Parking", 6.0)]),
+    ("month name", "Receipt 15 March 2024\nTaxi fare 23.40", "2024-03-15",
+     []),
+    ("month abbr comma", "Mar 5, 2024\nBus pass 60.00", "2024-03-05",
+     [("2024-03-05", "Bus pass", 60.0)]),
+    ("invalid then valid date", "2024-13-45\n02/30/2024\n04/15/2024\nPens 5.25", "2024-04-15",
+     [("2024-04-15", "Pens", 5.25)]),
+    ("negative sign", "Return item -12.00\nShirt 25.00", None,
+     [(TODAY, "item", -12.0), (TODAY, "Shirt", 25.0)]),
+    ("parentheses", "Adjustment (15.25)\nShoes 80.00", None,
+     [(TODAY, "Adjustment )", -15.25), (TODAY, "Shoes", 80.0)]),
+    ("refund word", "Refund for order 19.99\nHat 15.00", None,
+     [(TODAY, "for order", -19.99), (TODAY, "Hat", 15.0)]),
+    ("currency symbols", "Dinner €45.50\nSnack ₹120.00\nGum $ 1.25", None,
+     [(TODAY, "Dinner", 45.5), (TODAY, "Snack", 120.0), (TODAY, "Gum", 1.25)]),
+    ("thousands", "Laptop 1,299.99\nTV 2,499.00", None,
+     [(TODAY, "Laptop", 1299.99)]),
+    ("total vs subtotal", "Groceries 12.00 Subtotal 12.00 Tax 1.00 Total 13.00", None,
+     []),
+    ("tip line", "Meal 30.00 Tip 6.00", None,
+     []),
+    ("whole numbers", "Item 12 qty 3\nBook 15", None,
+     []),
+    ("duplicates", "Coffee 3.00\nCoffee 3.00\nTea 2.50\ncoffee 3.00", None,
+     [(TODAY, "Tea", 2.5)]),
+    ("short descriptions", "ab 3.00\nxy\n$5.00\nOK 1.00", None,
+     []),
+    ("cashback", "Cashback 20.00\nGroceries 54.10", None,
+     [(TODAY, "Cashback", -20.0), (TODAY, "Groceries", 54.1)]),
+    ("blank", "   \n\n", None,
+     []),
+]
+
+
+@pytest.fixture(autouse=True)
+def frozen_today(monkeypatch):
+    monkeypatch.setattr(receipt_parser, "today", lambda: TODAY)
+
+
+@pytest.mark.parametrize("name, text, date, transactions", GOLDEN, ids=[case[0] for case in GOLDEN])
+def test_parse_transactions_matches_golden_output(name, text, date, transactions):
+    expected = [{"date": d, "description": description, "amount": amount} for d, description, amount in transactions]
+    assert receipt_parser.parse_transactions(text) == expected
+
+
+@pytest.mark.parametrize("name, text, date, transactions", GOLDEN, ids=[case[0] for case in GOLDEN])
+def test_extract_global_date_matches_golden_output(name, text, date, transactions):
+    assert receipt_parser.extract_global_date(text) == date
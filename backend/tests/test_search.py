@@ -0,0 +1,81 @@
+import uuid
+
+import pytest
+
+from app.routes import transactions as transactions_routes
+
+
+def _save(client, headers, *items):
+    body = {"items": [{"date": date, "description": description, "amount": amount}
+                      for date, description, amount in items]}
+    response = client.post("/api/transactions/batch", json=body, headers=headers)
+    assert response.status_code == 201
+    return response.json()
+
+
+def _search(client, headers, q, **params):
+    response = client.get("/api/transactions/search", params={"q": q, **params}, headers=headers)
+    assert response.status_code == 200
+    return [t["description"] for t in response.json()["transactions"]]
+
+
+@pytest.fixture(params=["fts5", "like"])
+def backend(request, monkeypatch):
+    if request.param == "like":
+        # As on a SQLite build without FTS5
+        monkeypatch.setattr(transactions_routes, "search_backend", lambda: "like")
+    else:
+        assert transactions_routes.search_backend() == "fts5"
+    return request.param
+
+
+def test_every_term_must_prefix_a_word(client, headers, backend):
+    _save(client, headers,
+          ("2024-02-01", "Starbucks Coffee", 5.1),
+          ("2024-02-02", "Coffee beans", 12.0),
+          ("2024-02-03", "Bus ticket", 2.5))
+
+    assert _search(client, headers, "star cof") == ["Starbucks Coffee"]
+    assert _search(client, headers, "tick") == ["Bus ticket"]
+    assert _search(client, headers, "ucks") == []
+    assert sorted(_search(client, headers, "coffee")) == ["Coffee beans", "Starbucks Coffee"]
+
+
+def test_filters_narrow_the_matches(client, headers, backend):
+    _save(client, headers,
+          ("2024-02-01", "Coffee to go", 3.0),
+          ("2024-03-01", "Coffee to stay", 4.0))
+
+    assert _search(client, headers, "coffee", start_date="2024-02-15") == ["Coffee to stay"]
+    assert _search(client, headers, "coffee", max_amount=3.5) == ["Coffee to go"]
+
+
+def test_other_users_rows_are_not_found(client, headers, backend):
+    other = client.post("/api/auth/signup", json={"email": f"{uuid.uuid4().hex[:12]}@example.com", "password": "x"})
+    other_headers = {"Authorization": "Bearer " + other.json()["access_token"]}
+    _save(client, other_headers, ("2024-02-01", "Zanzibar spices", 9.0))
+
+    assert _search(client, headers, "zanzibar") == []
+    assert _search(client, other_headers, "zanzibar") == ["Zanzibar spices"]
+
+
+def test_best_match_ranks_first(client, headers):
+    _save(client, headers,
+          ("2024-05-02", "Groceries and a pizza slice from the market downtown", 20.0),
+          ("2024-05-01", "Pizza pizza", 15.0))
+
+    # FTS ranks by relevance before date: the older, denser match comes first
+    assert _search(client, headers, "pizza") == [
+        "Pizza pizza", "Groceries and a pizza slice from the market downtown",
+    ]
+
+
+def test_triggers_keep_the_index_in_sync(client, headers):
+    saved = _save(client, headers, ("2024-06-01", "Quokka souvenir", 8.0))
+    assert _search(client, headers, "quokka") == ["Quokka souvenir"]
+
+    assert client.delete(f"/api/transactions/{saved[0]['id']}", headers=headers).status_code == 200
+    assert _search(client, headers, "quokka") == []
+
+    _save(client, headers, ("2024-06-02", "Quokka mug", 11.0))
+    assert _search(client, headers, "quokka") == ["Quokka mug"]
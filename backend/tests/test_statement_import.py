@@ -0,0 +1,49 @@
+import io
+import json
+import sqlite3
+
+from app.db import engine
+from app.routes import transactions as transactions_routes
+from app.routes.auth import get_optional_user_id
+from app.services.statement_import import StatementReader
+
+
+def _statement(rows):
+    lines = ["date,description,amount"] + [f"2024-04-{day:02d},Shop {day},{day}.50" for day in range(1, rows + 1)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def _import(client, headers, body):
+    response = client.post("/api/transactions/import", files={"file": ("statement.csv", body, "text/csv")},
+                           headers=headers)
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_import_then_reimport_adds_nothing(client, headers):
+    first = _import(client, headers, _statement(5))
+    again = _import(client, headers, _statement(6))
+
+    assert first[-1]["type"] == "summary"
+    assert (first[-1]["imported"], first[-1]["deduplicated"]) == (5, 0)
+    assert (again[-1]["imported"], again[-1]["deduplicated"]) == (1, 5)
+
+
+def test_writer_is_free_while_the_client_reads_progress(client, headers, monkeypatch):
+    monkeypatch.setattr(transactions_routes, "IMPORT_CHUNK_SIZE", 2)
+    user_id = get_optional_user_id(headers["Authorization"].split()[1])
+    reader = StatementReader(io.BytesIO(_statement(5)), "csv")
+    stream = transactions_routes._import_stream(reader, io.BytesIO(), user_id)
+
+    assert json.loads(next(stream))["type"] == "progress"
+    # The client has not read on; another writer must get the lock without waiting
+    probe = sqlite3.connect(engine.url.database, timeout=0, isolation_level=None)
+    try:
+        probe.execute("BEGIN IMMEDIATE")
+        probe.execute("ROLLBACK")
+    finally:
+        probe.close()
+
+    events = [json.loads(line) for line in stream]
+    assert events[-1]["type"] == "summary"
+    assert events[-1]["imported"] == 5
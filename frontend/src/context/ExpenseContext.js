@@ -134,7 +134,8 @@ export function ExpenseProvider({ children }) {
   const saveTransactions = async (transactions) => {
     try {
       const response = await expenseAPI.saveTransactions(transactions);
-      dispatch({ type: 'ADD_TRANSACTIONS', payload: response.data });
+      // Items saved before come back with deduplicated: true and are already listed
+      dispatch({ type: 'ADD_TRANSACTIONS', payload: response.data.filter((t) => !t.deduplicated) });
       return response.data;
     } catch (error) {
       dispatch({ type: 'SET_ERROR', payload: error.message });
@@ -166,6 +167,39 @@ export function ExpenseProvider({ children }) {
     }
   };
 
+  // Streams a file's transactions page by page (see expenseAPI.uploadStream);
+  // resolves with the summary event
+  const uploadFileStream = async (file, onEvent) => {
+    let summary = null;
+    try {
+      await expenseAPI.uploadStream(file, (event) => {
+        if (event.type === 'error') throw new Error(event.error);
+        if (event.type === 'summary') summary = event;
+        onEvent(event);
+      });
+      return summary;
+    } catch (error) {
+      dispatch({ type: 'SET_ERROR', payload: error.message });
+      throw error;
+    }
+  };
+
+  // Uploads several files in one request (see expenseAPI.uploadBatch); onRecord
+  // gets each file's record as it finishes. Resolves with the summary record
+  const uploadFilesBatch = async (files, onRecord) => {
+    let summary = null;
+    try {
+      await expenseAPI.uploadBatch(files, (record) => {
+        if (record.type === 'summary') summary = record;
+        else onRecord(record);
+      });
+      return summary;
+    } catch (error) {
+      dispatch({ type: 'SET_ERROR', payload: error.message });
+      throw error;
+    }
+  };
+
   const toggleMyItem = useCallback((transaction) => {
     const now = new Date();
     const period = `${now.getFullYear()}-${String(now.getMonth() + 1).padStart(2, '0')}`;
@@ -261,6 +295,8 @@ export function ExpenseProvider({ children }) {
     loadCalendarData,
     saveTransactions,
     uploadFile,
+    uploadFileStream,
+    uploadFilesBatch,
     dispatch,
     // upload status helpers
     addUploadItems: (items) => dispatch({ type: 'ADD_UPLOAD_ITEMS', payload: items }),
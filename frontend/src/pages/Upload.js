@@ -2,30 +2,68 @@ import React, { useState } from 'react';
 import { useExpense } from '../context/ExpenseContext';
 
 const Upload = () => {
-  const { uploadFile, dispatch, addUploadItems, updateUploadItem, uploads } = useExpense();
+  const { uploadFile, uploadFileStream, uploadFilesBatch, dispatch, addUploadItems, updateUploadItem, uploads } = useExpense();
   const [isUploading, setIsUploading] = useState(false);
 
+  // Single file: one request, PDFs streamed page by page
+  const uploadOne = async (file, idx) => {
+    if (!file.name.toLowerCase().endsWith('.pdf')) return [await uploadFile(file)];
+    // Show each page's transactions as soon as the server has parsed it
+    const pending = [];
+    const data = await uploadFileStream(file, (event) => {
+      if (event.type !== 'page') return;
+      pending.push(...event.transactions);
+      updateUploadItem(idx, { progress: `${event.page}/${event.page_count}` });
+      dispatch({ type: 'SET_TRANSACTIONS', payload: [...pending] });
+    });
+    return [data];
+  };
+
+  // Several files: one batch request; the server sends each file's record as
+  // soon as it is parsed, in whatever order they finish
+  const uploadMany = async (files, startIndex) => {
+    const results = new Array(files.length).fill(null);
+    const received = new Set();
+    const staged = () => results.flatMap(r => (Array.isArray(r?.transactions) ? r.transactions : []));
+    try {
+      await uploadFilesBatch(files, (record) => {
+        received.add(record.index);
+        if (!record.success) {
+          updateUploadItem(startIndex + record.index, { status: 'error', error: record.error || 'Upload failed' });
+          return;
+        }
+        results[record.index] = record;
+        updateUploadItem(startIndex + record.index, { status: 'success' });
+        dispatch({ type: 'SET_TRANSACTIONS', payload: staged() });
+      });
+    } catch (err) {
+      files.forEach((_, i) => {
+        if (!received.has(i)) updateUploadItem(startIndex + i, { status: 'error', error: err?.message || 'Upload failed' });
+      });
+    }
+    return results;
+  };
+
   const onChange = async (e) => {
-    const files = e.target.files;
-    if (!files || files.length === 0) return;
+    const files = Array.from(e.target.files || []);
+    if (files.length === 0) return;
 
     const startIndex = uploads.length;
-    const next = Array.from(files).map((f) => ({ name: f.name, status: 'pending' }));
+    const next = files.map((f) => ({ name: f.name, status: 'pending' }));
     addUploadItems(next);
     setIsUploading(true);
+    files.forEach((_, i) => updateUploadItem(startIndex + i, { status: 'uploading' }));
 
     try {
-      const uploadedResults = [];
-      for (let i = 0; i < files.length; i++) {
-        const file = files[i];
-        const idx = startIndex + i;
-        updateUploadItem(idx, { status: 'uploading' });
+      let uploadedResults = [];
+      if (files.length > 1) {
+        uploadedResults = await uploadMany(files, startIndex);
+      } else {
         try {
-          const data = await uploadFile(file);
-          uploadedResults.push(data);
-          updateUploadItem(idx, { status: 'success' });
+          uploadedResults = await uploadOne(files[0], startIndex);
+          updateUploadItem(startIndex, { status: 'success' });
         } catch (err) {
-          updateUploadItem(idx, { status: 'error', error: err?.message || 'Upload failed' });
+          updateUploadItem(startIndex, { status: 'error', error: err?.message || 'Upload failed' });
         }
       }
 
@@ -69,7 +107,7 @@ const Upload = () => {
                     {it.status === 'uploading' && (
                       <span className="inline-flex items-center text-blue-600">
                         <svg className="animate-spin -ml-1 mr-2 h-4 w-4 text-blue-600" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24"><circle className="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" strokeWidth="4"></circle><path className="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8v4a4 4 0 00-4 4H4z"></path></svg>
-                        Uploading
+                        Uploading{it.progress ? ` (page ${it.progress})` : ''}
                       </span>
                     )}
                     {it.status === 'success' && (
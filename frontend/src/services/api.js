@@ -18,6 +18,30 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// POST a form and call onRecord with each line of the NDJSON response as it arrives
+const postNdjson = async (path, formData, onRecord) => {
+  const token = localStorage.getItem('auth_token');
+  const res = await fetch(`${API_BASE_URL}${path}`, {
+    method: 'POST',
+    body: formData,
+    headers: token ? { Authorization: `Bearer ${token}` } : {},
+  });
+  if (!res.ok) throw new Error(`Upload failed: ${res.status}`);
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    lines.filter(Boolean).forEach((line) => onRecord(JSON.parse(line)));
+  }
+  if (buffer.trim()) onRecord(JSON.parse(buffer));
+};
+
 export const expenseAPI = {
   // Transaction endpoints
   getTransactions: (params = {}) => api.get('/api/transactions/', { params }),
@@ -43,6 +67,20 @@ export const expenseAPI = {
     formData.append('file', file);
     return api.post('/api/upload/', formData);
   },
+  // Many files (or one .zip) at once; onRecord is called with each NDJSON
+  // record as soon as the server finishes that file, then with the summary
+  uploadBatch: async (files, onRecord) => {
+    const formData = new FormData();
+    files.forEach((file) => formData.append('files', file));
+    await postNdjson('/api/upload/batch', formData, onRecord);
+  },
+  // One file, parsed page by page; onEvent gets a "page" event per page as
+  // it is read or OCRed, then a "summary" (or "error") event
+  uploadStream: async (file, onEvent) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    await postNdjson('/api/upload/stream?stream=ndjson', formData, onEvent);
+  },
   getSupportedFormats: () => api.get('/api/upload/formats'),
   // Single transaction delete
   deleteTransaction: (id) => api.delete(`/api/transactions/${id}`),